@@ -0,0 +1,3 @@
+from whisper_flow.benchmark.runner import main
+
+main()
@@ -0,0 +1,320 @@
+"""Simulated hardware and services for running the real event flow headless."""
+import enum
+import sys
+import threading
+import time
+import types
+import wave
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from whisper_flow.services.output.text_inserter import TextInsertionStrategy
+
+# --- Audio ---
+
+def synthetic_speech(seconds: float, samplerate: int, seed: int = 0) -> np.ndarray:
+    """Speech-like int16 signal: ~4 Hz syllable bursts of shaped noise with short pauses."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * samplerate)
+    t = np.arange(n) / samplerate
+    envelope = np.clip(np.sin(2 * np.pi * 4.0 * t), 0, None) ** 2
+    # Pause for 0.3 s every 2.5 s, like breathing between phrases
+    envelope[(t % 2.5) > 2.2] = 0.0
+    carrier = rng.standard_normal(n) * 0.3 + np.sin(2 * np.pi * 180.0 * t) * 0.5
+    return (carrier * envelope * 12000).astype(np.int16)
+
+
+def load_wav(path: str, samplerate: int) -> np.ndarray:
+    """Reads a 16-bit mono WAV recorded at the configured sample rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2 or f.getnchannels() != 1 or f.getframerate() != samplerate:
+            raise ValueError(f"{path}: expected 16-bit mono WAV at {samplerate} Hz")
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+
+class FakeInputStream:
+    """Drop-in for sounddevice.InputStream that plays a signal through the callback in real time."""
+    blocksize = 512
+
+    def __init__(self, samplerate: int, channels: int = 1, dtype: str = "int16", callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.dtype = dtype
+        self._callback = callback
+        self._thread: threading.Thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="fake-audio", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        source = FakeSoundDevice.source
+        if self.samplerate != FakeSoundDevice.source_rate:
+            # The device runs at its own rate: resample the source to it
+            n = int(len(source) * self.samplerate / FakeSoundDevice.source_rate)
+            times = np.arange(n) * (FakeSoundDevice.source_rate / self.samplerate)
+            source = np.interp(times, np.arange(len(source)), source).astype(np.int16)
+        if self.dtype == "float32":
+            source = source.astype(np.float32) / 32768.0
+        position = 0
+        interval = self.blocksize / self.samplerate / FakeSoundDevice.speed
+        next_at = time.monotonic() + interval
+        while self._running:
+            # Block until the audio "arrives", as a real device would
+            time.sleep(max(next_at - time.monotonic(), 0))
+            next_at += interval
+            block = np.take(source, range(position, position + self.blocksize), mode="wrap")
+            position += self.blocksize
+            self._callback(np.repeat(block.reshape(-1, 1), self.channels, axis=1), self.blocksize, None, None)
+
+
+class FakeSoundDevice(types.ModuleType):
+    """Module object installed as `sounddevice`; the recorder imports it lazily."""
+    source: np.ndarray = np.zeros(1, dtype=np.int16)
+    source_rate: int = 16000
+    # Reported as the input device's default rate
+    native_rate: int = 16000
+    native_channels: int = 1
+    speed: float = 1.0
+
+    def __init__(self):
+        super().__init__("sounddevice")
+        self.InputStream = FakeInputStream
+
+    def query_devices(self, device=None, kind=None):
+        return {"name": "fake input", "default_samplerate": float(FakeSoundDevice.native_rate),
+                "max_input_channels": FakeSoundDevice.native_channels}
+
+    def sleep(self, ms: int):
+        time.sleep(ms / 1000 / FakeSoundDevice.speed)
+
+
+# --- Keyboard ---
+
+class _FakeKeyCode:
+    """Mirrors pynput's KeyCode, including its repr-based hash, so lookups cost what they do live."""
+    def __init__(self, vk: Optional[int] = None, char: Optional[str] = None):
+        self.vk = vk
+        self.char = char
+
+    @classmethod
+    def from_char(cls, char: str):
+        return cls(char=char)
+
+    def __repr__(self):
+        return repr(self.char) if self.char is not None else f"<{self.vk}>"
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        if self.char is not None and other.char is not None:
+            return self.char == other.char
+        return self.vk == other.vk
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+# Same members as pynput's Key enum (without platform aliases)
+_KEY_NAMES = (
+    "alt alt_l alt_r alt_gr backspace caps_lock cmd cmd_l cmd_r ctrl ctrl_l ctrl_r delete down end enter "
+    "esc home left page_down page_up right shift shift_l shift_r space tab up insert menu num_lock pause "
+    "print_screen scroll_lock media_play_pause media_volume_mute media_volume_down media_volume_up "
+    "media_previous media_next " + " ".join(f"f{i}" for i in range(1, 21))
+).split()
+_FakeKey = enum.Enum("Key", {name: _FakeKeyCode(vk=0xff00 + i) for i, name in enumerate(_KEY_NAMES)})
+
+
+class _FakeListener:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def join(self):
+        pass
+
+
+def install_fake_modules():
+    """Replaces sounddevice, and pynput when no display is available, with fakes."""
+    sys.modules["sounddevice"] = FakeSoundDevice()
+    try:
+        import pynput.keyboard  # noqa: F401
+    except Exception:
+        keyboard = types.ModuleType("pynput.keyboard")
+        keyboard.Key = _FakeKey
+        keyboard.KeyCode = _FakeKeyCode
+        keyboard.Listener = _FakeListener
+        pynput = types.ModuleType("pynput")
+        pynput.keyboard = keyboard
+        sys.modules["pynput"] = pynput
+        sys.modules["pynput.keyboard"] = keyboard
+
+
+# --- Model ---
+
+@dataclass
+class FakeWord:
+    word: str
+    start: float
+    end: float
+
+
+@dataclass
+class FakeSegment:
+    text: str
+    start: float
+    end: float
+    words: List[FakeWord] = field(default_factory=list)
+    avg_logprob: float = -0.2
+
+
+@dataclass
+class FakeInfo:
+    language: str
+    language_probability: float = 1.0
+    duration: float = 0.0
+
+
+class FakeWhisperModel:
+    """
+    Stands in for faster_whisper.WhisperModel with a fixed real-time factor.
+
+    Segments are produced lazily, like the real model, one per 5 s of audio.
+    Concurrent decodes run one at a time, as on a model with one worker.
+    """
+    def __init__(self, rtf: float = 0.05, overhead: float = 0.05, samplerate: int = 16000):
+        self.rtf = rtf
+        self.overhead = overhead
+        self.samplerate = samplerate
+        self.busy = threading.Lock()
+
+    def transcribe(self, audio, language: Optional[str] = None, **kwargs):
+        duration = len(audio) / self.samplerate
+        info = FakeInfo(language=language or "en", duration=duration)
+        return self._segments(duration), info
+
+    def _segments(self, duration: float):
+        with self.busy:
+            time.sleep(self.overhead)
+        start = 0.0
+        while start < duration:
+            end = min(start + 5.0, duration)
+            with self.busy:
+                time.sleep((end - start) * self.rtf)
+            yield self.segment(start, end)
+            start = end
+
+    @staticmethod
+    def segment(start: float, end: float) -> FakeSegment:
+        words = [
+            FakeWord(f" w{int(t * 10)}", t, t + 0.4)
+            for t in np.arange(start, end - 0.2, 0.5)
+        ]
+        return FakeSegment("".join(w.word for w in words), start, end, words)
+
+
+class FakeBatchedPipeline:
+    """
+    Stands in for faster_whisper.BatchedInferencePipeline.
+
+    The clips of one batch decode in parallel, so a batch costs the model's
+    overhead plus its longest clip at the model's real-time factor.
+    """
+    def __init__(self, model: FakeWhisperModel):
+        self.model = model
+
+    def transcribe(self, audio, clip_timestamps: List[dict], batch_size: int = 8,
+                   language: Optional[str] = None, **kwargs):
+        info = FakeInfo(language=language or "en", duration=len(audio) / self.model.samplerate)
+        return self._segments(clip_timestamps, batch_size), info
+
+    def _segments(self, clips: List[dict], batch_size: int):
+        for i in range(0, len(clips), batch_size):
+            batch = clips[i:i + batch_size]
+            with self.model.busy:
+                time.sleep(self.model.overhead + max(c["end"] - c["start"] for c in batch) * self.model.rtf)
+            for clip in batch:
+                yield self.model.segment(clip["start"], clip["end"])
+
+
+# --- Services ---
+
+class FakeMediaControl:
+    """Stands in for MprisControl with one always-playing player."""
+    def __init__(self, *args, **kwargs):
+        self.calls: List[str] = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def playing_players(self) -> List[str]:
+        return ["org.mpris.MediaPlayer2.fake"]
+
+    def is_playing(self) -> bool:
+        return True
+
+    def pause(self, players: List[str]):
+        self.calls.append("pause")
+
+    def play(self, players: List[str]):
+        self.calls.append("play")
+
+
+class RecordingInserter(TextInsertionStrategy):
+    """Text inserter that records what was inserted and when."""
+    name = "benchmark"
+
+    def __init__(self):
+        self.inserted: List[str] = []
+        self.inserted_at: Optional[float] = None
+        # First insertion since `done` was last cleared
+        self.first_inserted_at: Optional[float] = None
+        self.done = threading.Event()
+        self._changed = threading.Condition()
+
+    def insert(self, text: str) -> bool:
+        with self._changed:
+            self.inserted.append(text)
+            self.inserted_at = time.monotonic()
+            if not self.done.is_set():
+                self.first_inserted_at = self.inserted_at
+            self.done.set()
+            self._changed.notify_all()
+        return True
+
+    def delete_chars(self, count: int) -> bool:
+        with self._changed:
+            self.inserted.append(f"<delete {count}>")
+        return True
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """Waits until `count` insertions have happened in total."""
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.inserted) >= count, timeout)
@@ -0,0 +1,83 @@
+"""
+Per-keystroke cost of the global hotkey listener.
+
+Replays key events through HotkeyManager's press and release callbacks, as
+the pynput listener thread would, and reports the cost per event for
+ordinary typing, for hotkey keys used in other shortcuts, and for full
+chords. Nothing else is running, so this is the listener's own overhead.
+
+    python -m whisper_flow.benchmark.keystrokes --events 200000
+"""
+import argparse
+import statistics
+import time
+
+from whisper_flow.benchmark import fakes
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the hotkey listener's cost per key event")
+    parser.add_argument("--events", type=int, default=200000, help="Key events per scenario")
+    return parser.parse_args(argv)
+
+
+def _measure(manager, events, count: int) -> dict:
+    """Mean (batched) and p50/p99 (per call) cost of replaying `events` round-robin."""
+    press, release = manager._on_press, manager._on_release
+    calls = [(press if pressed else release, key) for key, pressed in events]
+    n = len(calls)
+
+    start = time.perf_counter_ns()
+    for i in range(count):
+        handler, key = calls[i % n]
+        handler(key)
+    elapsed = time.perf_counter_ns() - start
+    start = time.perf_counter_ns()
+    for i in range(count):
+        handler, key = calls[i % n]
+    loop = time.perf_counter_ns() - start
+
+    clock = time.perf_counter_ns
+    overhead = min(-(clock() - clock()) for _ in range(1000))
+    samples = []
+    for i in range(min(count, 50000)):
+        handler, key = calls[i % n]
+        t0 = clock()
+        handler(key)
+        samples.append(clock() - t0 - overhead)
+    samples.sort()
+    return {
+        "mean_ns": max(elapsed - loop, 0) / count,
+        "p50_ns": statistics.median(samples),
+        "p99_ns": samples[int(len(samples) * 0.99)],
+    }
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    fakes.install_fake_modules()
+    from pynput import keyboard
+    from whisper_flow.config.settings import settings
+    from whisper_flow.services.input.hotkey_manager import HotkeyManager
+
+    settings.draft.model = None
+    manager = HotkeyManager()
+    letters = [keyboard.KeyCode.from_char(c) for c in "the quick brown fox jumps over the lazy dog"]
+    ctrl, shift, cmd = keyboard.Key.ctrl, keyboard.Key.shift, keyboard.Key.cmd
+    scenarios = {
+        "typing": [e for key in letters for e in ((key, True), (key, False))],
+        # Ctrl+C style shortcuts: a hotkey key that completes no chord
+        "shortcut": [(ctrl, True), (letters[0], True), (letters[0], False), (ctrl, False)],
+        "chord": [(ctrl, True), (cmd, True), (cmd, False), (ctrl, False),
+                  (shift, True), (ctrl, True), (cmd, True), (cmd, False), (ctrl, False), (shift, False)],
+    }
+    backend = "fake keys (no display)" if keyboard.Listener is fakes._FakeListener else "pynput keys"
+    print(f"{args.events} key events per scenario, {backend}:")
+    for name, events in scenarios.items():
+        result = _measure(manager, events, args.events)
+        print(f"  {name:<10} mean={result['mean_ns']:7.0f} ns  p50={result['p50_ns']:7.0f} ns  "
+              f"p99={result['p99_ns']:7.0f} ns per key event")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+End-to-end latency benchmark with simulated hardware.
+
+Drives the real Application event flow: a synthetic audio source replaces
+sounddevice, hotkey events are published directly, and media control and
+text insertion are stubbed. Reports per-stage percentiles for each utterance
+length and writes them as JSON so versions can be compared.
+
+    python -m whisper_flow.benchmark --model fake --lengths 2,5,10 --runs 5
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+from whisper_flow.benchmark import fakes
+
+STAGES = ["hotkey_to_record", "release_to_text", "text_to_inserted", "release_to_inserted",
+          "release_to_first_inserted"]
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WhisperFlow end-to-end latency benchmark")
+    parser.add_argument("--model", default="fake",
+                        help="'fake' for a simulated model, or a faster-whisper model name (e.g. 'tiny')")
+    parser.add_argument("--fake-rtf", type=float, default=0.05, help="Real-time factor of the fake model")
+    parser.add_argument("--lengths", default="2,5,10,20", help="Comma-separated utterance lengths in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Utterances per length")
+    parser.add_argument("--speed", type=float, default=1.0, help="Play the synthetic audio this many times faster")
+    parser.add_argument("--wav", help="16-bit mono WAV to use instead of synthetic speech")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--streaming", action="store_true", help="Enable incremental transcription")
+    parser.add_argument("--persistent-stream", action="store_true", help="Keep the input stream open")
+    parser.add_argument("--sync-events", action="store_true", help="Use synchronous event dispatch")
+    parser.add_argument("--burst", type=int, default=0,
+                        help="Also dictate this many utterances back to back per length and report throughput")
+    parser.add_argument("--draft-rtf", type=float, default=0.0,
+                        help="Enable two-pass mode with a fake draft model of this real-time factor")
+    parser.add_argument("--long-form", action="store_true",
+                        help="Decode chunks while recording; release_to_inserted is then measured to the last chunk")
+    parser.add_argument("--device-rate", type=int, default=16000,
+                        help="Native rate of the simulated microphone; other rates exercise preprocessing")
+    parser.add_argument("--device-channels", type=int, default=1,
+                        help="Channels of the simulated microphone; more than one exercises the down-mix")
+    parser.add_argument("--no-preprocess", action="store_true",
+                        help="Capture at the model rate without resampling, DC removal or gain")
+    parser.add_argument("--stream-segments", action="store_true",
+                        help="Insert segments as they are decoded; also reports release_to_first_inserted")
+    parser.add_argument("--on-new-utterance", choices=["queue", "supersede", "preempt"], default="queue",
+                        help="What a released utterance does to older ones still transcribing (see --burst)")
+    parser.add_argument("--deadline", type=float, default=0.0,
+                        help="Drop text not ready this many seconds after release")
+    parser.add_argument("--no-batching", action="store_true", help="Decode queued utterances one by one")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Max seconds to wait for each result")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    return parser.parse_args(argv)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0}
+    data = np.asarray(values) * 1000
+    p50, p90, p95, p99 = np.percentile(data, [50, 90, 95, 99])
+    return {
+        "n": len(values),
+        "mean_ms": float(data.mean()),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(data.max()),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+class Benchmark:
+    """Builds the application against the fakes and measures each utterance."""
+    def __init__(self, args):
+        self.args = args
+        fakes.install_fake_modules()
+
+        # Imported only now so the services pick up the fake modules
+        from whisper_flow.config.settings import settings
+        from whisper_flow.core.event_bus import event_bus
+        from whisper_flow.core.events import TranscriptionReady, TranscriptionSegment
+        from whisper_flow.services.integration import media_service
+        from whisper_flow.services.output import output_service
+        from whisper_flow.services.transcription.language import layout_tracker
+        from whisper_flow.services.transcription.model_manager import model_manager
+
+        self.settings = settings
+        self.event_bus = event_bus
+        settings.audio.streaming = args.streaming
+        settings.audio.persistent_stream = args.persistent_stream
+        settings.app.async_events = not args.sync_events
+        settings.performance.model_reload_after_uses = sys.maxsize
+        settings.performance.batching = not args.no_batching
+        settings.long_form.enabled = args.long_form
+        settings.output.stream_segments = args.stream_segments
+        settings.jobs.on_new_utterance = args.on_new_utterance
+        settings.jobs.deadline_seconds = args.deadline
+        layout_tracker.pin(args.language)
+
+        settings.audio.preprocess = not args.no_preprocess
+        fakes.FakeSoundDevice.speed = args.speed
+        fakes.FakeSoundDevice.native_rate = args.device_rate
+        fakes.FakeSoundDevice.native_channels = args.device_channels
+        fakes.FakeSoundDevice.source_rate = settings.audio.samplerate
+        if args.wav:
+            fakes.FakeSoundDevice.source = fakes.load_wav(args.wav, settings.audio.samplerate)
+        else:
+            fakes.FakeSoundDevice.source = fakes.synthetic_speech(60.0, settings.audio.samplerate)
+
+        if args.model == "fake":
+            model_manager._model = fakes.FakeWhisperModel(rtf=args.fake_rtf, samplerate=settings.audio.samplerate)
+            model_manager._pipeline = fakes.FakeBatchedPipeline(model_manager._model)
+            model_manager._pipeline_model = model_manager._model
+            if args.draft_rtf:
+                settings.draft.model = "fake-draft"
+                model_manager._draft_model = fakes.FakeWhisperModel(rtf=args.draft_rtf,
+                                                                    samplerate=settings.audio.samplerate)
+        else:
+            settings.performance.model_size = args.model
+            settings.performance.device = "cpu"
+            settings.performance.compute_type = "int8"
+            model_manager.get_model()
+
+        self.inserter = fakes.RecordingInserter()
+        media_service.MprisControl = fakes.FakeMediaControl
+        output_service.get_text_inserter = lambda: self.inserter
+
+        from whisper_flow.core.application import Application
+        self.app = Application()
+
+        # Probes: first captured sample and transcription arrival
+        self._first_sample_at = None
+        self._text_at = None
+        # Long-form and segment streaming: insertions expected once the last text is out
+        self._texts_published = 0
+        self._last_text = threading.Event()
+        self._expected_insertions = 0
+
+        recorder = self.app.audio_recorder
+        new_buffer = recorder._new_buffer
+
+        def probed_buffer():
+            buffer = new_buffer()
+            append = buffer.append
+
+            def probed_append(block):
+                if self._first_sample_at is None:
+                    self._first_sample_at = time.monotonic()
+                append(block)
+            buffer.append = probed_append
+            return buffer
+        recorder._new_buffer = probed_buffer
+        # Timestamp TranscriptionReady when it is published, not when a worker picks it up
+        publish = event_bus.publish
+
+        def probed_publish(event):
+            if isinstance(event, TranscriptionSegment):
+                self._texts_published += 1
+            if isinstance(event, TranscriptionReady):
+                # A streamed text is complete once its segments are inserted
+                self._texts_published += bool(event.text) and not event.streamed
+                if self._text_at is None and not event.partial:
+                    self._text_at = time.monotonic()
+                if not event.partial:
+                    self._expected_insertions = self._texts_published
+                    self._last_text.set()
+            publish(event)
+        event_bus.publish = probed_publish
+
+    def run_utterance(self, seconds: float) -> Dict[str, float]:
+        from whisper_flow.core.events import RecordingStartRequested, RecordingStopRequested
+
+        self._first_sample_at = None
+        self._text_at = None
+        self.inserter.done.clear()
+        self._last_text.clear()
+
+        pressed_at = time.monotonic()
+        self.event_bus.publish(RecordingStartRequested(language=self.args.language))
+        time.sleep(seconds / self.args.speed)
+        released_at = time.monotonic()
+        self.event_bus.publish(RecordingStopRequested(language="any"))
+
+        if self.args.long_form or self.args.stream_segments:
+            # Chunk or segment texts are inserted piece by piece; wait for the last one
+            if not (self._last_text.wait(self.args.timeout)
+                    and self.inserter.wait_for(self._expected_insertions, self.args.timeout)):
+                print(f"  {seconds:.0f}s utterance: last chunk not inserted within {self.args.timeout:.0f}s")
+                return {}
+        elif not self.inserter.done.wait(self.args.timeout):
+            print(f"  {seconds:.0f}s utterance: no text inserted within {self.args.timeout:.0f}s")
+            return {}
+        inserted_at = self.inserter.inserted_at
+        result = {
+            "release_to_inserted": inserted_at - released_at,
+        }
+        if self.args.stream_segments:
+            result["release_to_first_inserted"] = self.inserter.first_inserted_at - released_at
+        if self._first_sample_at is not None:
+            result["hotkey_to_record"] = max(self._first_sample_at - pressed_at, 0.0)
+        if self._text_at is not None:
+            result["release_to_text"] = self._text_at - released_at
+            if not self.args.stream_segments:
+                # Streamed text is inserted before the final event announces it
+                result["text_to_inserted"] = inserted_at - self._text_at
+        return result
+
+    def run_burst(self, seconds: float, count: int) -> Dict[str, float]:
+        """Dictates `count` utterances back to back, without waiting for their text."""
+        from whisper_flow.core.events import RecordingStartRequested, RecordingStopRequested
+
+        expected = len(self.inserter.inserted) + count
+        first_release = None
+        for _ in range(count):
+            self.event_bus.publish(RecordingStartRequested(language=self.args.language))
+            time.sleep(seconds / self.args.speed)
+            self.event_bus.publish(RecordingStopRequested(language="any"))
+            first_release = first_release or time.monotonic()
+            # A short gap between utterances, like re-pressing the hotkey
+            time.sleep(0.05)
+
+        if self.args.on_new_utterance != "queue" or self.args.deadline:
+            # Some utterances are dropped: wait until every one is inserted or dropped
+            from whisper_flow.core.metrics import metrics
+            give_up = time.monotonic() + self.args.timeout
+            while metrics.open_traces() and time.monotonic() < give_up:
+                time.sleep(0.01)
+            inserted = count - (expected - len(self.inserter.inserted))
+            if not inserted:
+                print(f"  {seconds:g}s burst: nothing inserted")
+                return {}
+            return {
+                "utterances": count,
+                "inserted": inserted,
+                "first_release_to_last_inserted_s": self.inserter.inserted_at - first_release,
+                "audio_seconds_per_second": None,
+            }
+        if not self.inserter.wait_for(expected, self.args.timeout):
+            done = count - (expected - len(self.inserter.inserted))
+            print(f"  {seconds:g}s burst: only {done}/{count} inserted within {self.args.timeout:.0f}s")
+            return {}
+        elapsed = self.inserter.inserted_at - first_release
+        return {
+            "utterances": count,
+            "inserted": count,
+            "first_release_to_last_inserted_s": elapsed,
+            "audio_seconds_per_second": count * seconds / elapsed,
+        }
+
+    def run(self) -> dict:
+        lengths = [float(x) for x in self.args.lengths.split(",") if x]
+        samples: Dict[str, Dict[str, List[float]]] = {}
+        bursts: Dict[str, Dict[str, float]] = {}
+        for seconds in lengths:
+            per_stage = defaultdict(list)
+            for _ in range(self.args.runs):
+                for stage, value in self.run_utterance(seconds).items():
+                    per_stage[stage].append(value)
+                # Let media resume and queues drain between utterances
+                time.sleep(0.2)
+            samples[f"{seconds:g}"] = dict(per_stage)
+            self._print_row(seconds, per_stage)
+            if self.args.burst:
+                bursts[f"{seconds:g}"] = burst = self.run_burst(seconds, self.args.burst)
+                if burst and burst["audio_seconds_per_second"] is None:
+                    print(f"  burst of {self.args.burst}: {burst['inserted']} inserted, last text "
+                          f"{burst['first_release_to_last_inserted_s']:.2f}s after the first release")
+                elif burst:
+                    print(f"  burst of {self.args.burst}: last text {burst['first_release_to_last_inserted_s']:.2f}s "
+                          f"after the first release ({burst['audio_seconds_per_second']:.1f}x real time)")
+                time.sleep(0.2)
+
+        self.app.shutdown()
+        from whisper_flow.core.metrics import metrics
+        return {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "revision": _git_revision(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "model": self.args.model,
+                "fake_rtf": self.args.fake_rtf if self.args.model == "fake" else None,
+                "speed": self.args.speed,
+                "streaming": self.args.streaming,
+                "persistent_stream": self.args.persistent_stream,
+                "async_events": not self.args.sync_events,
+                "batching": not self.args.no_batching,
+                "draft_rtf": self.args.draft_rtf or None,
+                "long_form": self.args.long_form,
+                "stream_segments": self.args.stream_segments,
+                "on_new_utterance": self.args.on_new_utterance,
+                "deadline": self.args.deadline or None,
+                "device_rate": self.args.device_rate,
+                "device_channels": self.args.device_channels,
+                "preprocess": not self.args.no_preprocess,
+                "runs": self.args.runs,
+            },
+            "results": {
+                length: {stage: _percentiles(values.get(stage, [])) for stage in STAGES}
+                for length, values in samples.items()
+            },
+            "samples": samples,
+            "bursts": bursts,
+            # Per-stage means from the app's own instrumentation, over all lengths
+            "stage_timings": metrics.summary(),
+        }
+
+    @staticmethod
+    def _print_row(seconds: float, per_stage: Dict[str, List[float]]):
+        print(f"--- {seconds:g}s utterances ---")
+        for stage in STAGES:
+            stats = _percentiles(per_stage.get(stage, []))
+            if stats["n"]:
+                print(f"  {stage:<25} p50={stats['p50_ms']:8.1f} ms  p90={stats['p90_ms']:8.1f} ms  "
+                      f"max={stats['max_ms']:8.1f} ms  (n={stats['n']})")
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    results = Benchmark(args).run()
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,67 +1,244 @@
+import json
+import os
+import re
 import yaml
-from pydantic import BaseModel, Field
-import torch
-from typing import List, Dict
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import List, Dict, Literal, Optional, Union
+from whisper_flow.utils.lazy_import import timed_import
 
 # --- Pydantic Models for Configuration ---
 
 class AppSettings(BaseModel):
     lock_file: str = "/tmp/whisper_flow.lock"
+    async_events: bool = True
+    # How often the config file is checked for changes (seconds); 0 disables live reload
+    config_poll_interval: float = 1.0
 
 class AudioSettings(BaseModel):
     samplerate: int = 16000
-    temp_filename: str = "/tmp/recorded_audio.wav"
+    debug_dump_path: Optional[str] = None
+    streaming: bool = False
+    partial_interval: float = 1.0
+    buffer_seconds: float = 60.0
+    spill_after_mb: float = 64.0
+    spill_dir: Optional[str] = None
+    persistent_stream: bool = False
+    preroll_ms: int = 300
+    vad_enabled: bool = True
+    vad_frame_ms: int = 30
+    vad_threshold_db: float = -50.0
+    vad_noise_margin_db: float = 8.0
+    vad_padding_ms: int = 210
+    vad_max_pause_ms: int = 750
+    vad_min_speech_ms: int = 240
+    # Capture at the device's native rate and resample/clean up in-process
+    preprocess: bool = True
+    capture_rate: int = 0
+    # 0 opens the device's own channel count (at most 2), down-mixed in-process
+    capture_channels: int = 0
+    dc_removal: bool = True
+    gain_normalization: bool = True
+    target_level_db: float = -20.0
+    max_gain_db: float = 20.0
 
-class HotkeySettings(BaseModel):
-    ru: List[str] = Field(default_factory=lambda: ["Key.ctrl", "Key.cmd"])
-    en: List[str] = Field(default_factory=lambda: ["Key.shift", "Key.ctrl", "Key.cmd"])
+class HotkeyBinding(BaseModel):
+    # pynput key names ("Key.ctrl") or single characters, all held together
+    keys: List[str]
+    # Dictation language; defaults to the binding's name
+    language: Optional[str] = None
+    # "dictate" records while the chord is held; "cancel" aborts the recording and pending transcriptions
+    action: Literal["dictate", "cancel"] = "dictate"
+
+# Binding name -> keys (a dictation chord in the language of that name) or a full binding
+HotkeySettings = Dict[str, Union[List[str], HotkeyBinding]]
+
+def default_hotkeys() -> HotkeySettings:
+    return {"ru": ["Key.ctrl", "Key.cmd"], "en": ["Key.shift", "Key.ctrl", "Key.cmd"]}
+
+def hotkey_bindings(hotkeys: HotkeySettings) -> Dict[str, HotkeyBinding]:
+    """Normalizes the hotkeys section to full bindings, filling in default languages."""
+    bindings = {}
+    for name, value in hotkeys.items():
+        binding = HotkeyBinding(keys=value) if isinstance(value, list) else value
+        if binding.action == "dictate" and binding.language is None:
+            binding = HotkeyBinding(keys=binding.keys, language=name, action=binding.action)
+        bindings[name] = binding
+    return bindings
+
+def detect_device() -> str:
+    """Detects CUDA through the CTranslate2 runtime, without importing torch."""
+    try:
+        ctranslate2 = timed_import("ctranslate2")
+        return "cuda" if ctranslate2.get_cuda_device_count() > 0 else "cpu"
+    except Exception:
+        return "cpu"
 
 class PerformanceSettings(BaseModel):
     device: str = "auto"
     compute_type: str = "auto"
     model_size: str = "large-v3"
     beam_size: int = 1
+    # Segments above this no-speech probability and below log_prob_threshold are dropped as silence
+    no_speech_threshold: float = 0.6
+    log_prob_threshold: float = -1.0
     model_reload_after_uses: int = 30
     force_gpu_cleanup: bool = True
+    preload_model: bool = True
+    warmup: bool = True
+    # Decode utterances queued behind a running decode as one batch
+    batching: bool = True
+    batch_window_ms: int = 0
+    batch_max_size: int = 8
+    # CPU inference; cpu_threads 0 uses the tuned profile, else CTranslate2's default
+    cpu_threads: int = 0
+    num_workers: int = 1
+    cpu_affinity: List[int] = Field(default_factory=list)
+    tuning_file: str = "~/.cache/whisper_flow/cpu_tuning.json"
+    # What "auto" resolved to; None when compute_type was set explicitly
+    _auto_compute_type: Optional[str] = PrivateAttr(default=None)
 
     def __init__(self, **data):
         super().__init__(**data)
         if self.device == "auto":
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.device = detect_device()
         if self.compute_type == "auto":
             self.compute_type = "float16" if self.device == "cuda" else "int8"
+            self._auto_compute_type = self.compute_type
+
+    @property
+    def compute_type_is_auto(self) -> bool:
+        """Whether compute_type is still the "auto" choice, which a tuned CPU profile may replace."""
+        return self._auto_compute_type is not None and self.compute_type == self._auto_compute_type
 
 class TranscriptionSettings(BaseModel):
     prompts: Dict[str, str]
+    streaming_max_window: float = 15.0
+
+class DraftSettings(BaseModel):
+    # Small model for a fast first draft (e.g. "base"); None disables two-pass mode
+    model: Optional[str] = None
+    compute_type: str = "int8"
+    # Re-transcribe with the main model and replace the draft when it differs
+    refine: bool = True
+    # Utterances shorter than this (seconds, after VAD) use the draft model only
+    short_utterance_seconds: float = 0.0
+    # Keep drafts whose mean segment log probability is at least this; None refines all
+    good_enough_logprob: Optional[float] = None
+    # A refinement arriving later than this after the draft is not applied in place
+    replace_timeout: float = 15.0
+
+class LongFormSettings(BaseModel):
+    # Decode long dictations in chunks while recording instead of all at once on release
+    enabled: bool = False
+    # Target chunk length; the cut is placed at the quietest point of the last search_seconds
+    chunk_seconds: float = 20.0
+    search_seconds: float = 5.0
+    # Audio shared by neighbouring chunks on each side of a cut
+    overlap_seconds: float = 1.0
+    # Chunks decoded at the same time; set performance.num_workers to match
+    parallel_chunks: int = 2
+
+class JobSettings(BaseModel):
+    # What a released utterance does to older ones still transcribing:
+    # "queue" keeps them, "supersede" drops those not started yet, "preempt" also stops the running one
+    on_new_utterance: Literal["queue", "supersede", "preempt"] = "queue"
+    # Text not ready this many seconds after release is dropped and its decode stopped; 0 disables
+    deadline_seconds: float = 0.0
 
 class OutputSettings(BaseModel):
     paste_tool_timeout: int = 2
+    # "auto" picks paste or typing per window by measured latency
+    insert_method: str = "auto"
+    type_chunk_chars: int = 200
+    type_delay_ms: int = 4
+    type_seconds_per_char: float = 0.02
+    # Put the user's clipboard text back after pasting, once pastes have stopped for this long
+    restore_clipboard: bool = True
+    clipboard_restore_delay: float = 0.5
+    # Insert each decoded segment as soon as it is ready instead of the whole text at the end
+    stream_segments: bool = False
+    # Windows that paste with Ctrl+Shift+V
+    terminal_classes: List[str] = Field(default_factory=lambda: [
+        "gnome-terminal-server", "XTerm", "URxvt", "konsole", "Alacritty",
+        "kitty", "Tilix", "Terminator", "org.wezfurlong.wezterm", "Xfce4-terminal"
+    ])
+
+class LayoutSettings(BaseModel):
+    # XKB layout name -> language code; unlisted layouts use their own name (e.g. "de")
+    languages: Dict[str, str] = Field(default_factory=lambda: {"us": "en", "gb": "en", "ru": "ru"})
+    default_language: str = "ru"
+    # Polling interval when XKB events are unavailable (seconds)
+    poll_interval: float = 1.0
+
+class MediaSettings(BaseModel):
+    enabled: bool = True
+    # MPRIS player names to control (e.g. "spotify"); empty means every player
+    players: List[str] = Field(default_factory=list)
+    # Alternative DBus address, e.g. a private session bus for testing
+    bus_address: Optional[str] = None
+
+class MetricsSettings(BaseModel):
+    enabled: bool = True
+    # Prometheus text endpoint on 127.0.0.1 (e.g. 9464); None disables it
+    http_port: Optional[int] = None
+    # Unix socket that returns the same text on connect; None disables it
+    unix_socket: Optional[str] = None
+    # JSONL file receiving one record per utterance with its stage timestamps
+    trace_file: Optional[str] = None
+
+class DaemonSettings(BaseModel):
+    socket_path: str = "/tmp/whisper_flow.sock"
+    # Send dictations to a running daemon instead of loading the model in-process
+    use_daemon: bool = False
+    # Threads decoding queued requests in the daemon
+    workers: int = 1
+    connect_timeout: float = 2.0
 
 class Settings(BaseModel):
     app: AppSettings
     audio: AudioSettings
-    hotkeys: HotkeySettings
+    hotkeys: HotkeySettings = Field(default_factory=default_hotkeys)
     performance: PerformanceSettings
     transcription: TranscriptionSettings
     output: OutputSettings
+    media: MediaSettings = Field(default_factory=MediaSettings)
+    layout: LayoutSettings = Field(default_factory=LayoutSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    daemon: DaemonSettings = Field(default_factory=DaemonSettings)
+    draft: DraftSettings = Field(default_factory=DraftSettings)
+    long_form: LongFormSettings = Field(default_factory=LongFormSettings)
+    jobs: JobSettings = Field(default_factory=JobSettings)
 
 # --- Configuration Loading ---
 
-def load_settings(path: str = "config.yaml") -> Settings:
+# Resolved once, so reloads do not depend on the working directory
+CONFIG_PATH = os.path.abspath(os.environ.get("WHISPER_FLOW_CONFIG", "config.yaml"))
+
+def read_settings(path: str = CONFIG_PATH) -> Settings:
+    """Reads and validates a YAML config file, raising on any error."""
+    with open(path, 'r') as f:
+        config_data = yaml.safe_load(f)
+    return Settings(**config_data)
+
+def load_settings(path: str = CONFIG_PATH) -> Settings:
     """Loads settings from a YAML file and validates them using Pydantic."""
     try:
-        with open(path, 'r') as f:
-            config_data = yaml.safe_load(f)
-        return Settings(**config_data)
+        return read_settings(path)
     except FileNotFoundError:
         print(f"Warning: Configuration file not found at '{path}'. Using default settings.")
         return Settings(
             app=AppSettings(),
             audio=AudioSettings(),
-            hotkeys=HotkeySettings(),
             performance=PerformanceSettings(),
             transcription=TranscriptionSettings(prompts={}),
-            output=OutputSettings()
+            output=OutputSettings(),
+            media=MediaSettings(),
+            layout=LayoutSettings(),
+            metrics=MetricsSettings(),
+            daemon=DaemonSettings(),
+            draft=DraftSettings(),
+            long_form=LongFormSettings(),
+            jobs=JobSettings()
         )
     except Exception as e:
         print(f"Error loading or validating configuration: {e}")
@@ -70,12 +247,71 @@ def load_settings(path: str = "config.yaml") -> Settings:
         return Settings(
             app=AppSettings(),
             audio=AudioSettings(),
-            hotkeys=HotkeySettings(),
             performance=PerformanceSettings(),
             transcription=TranscriptionSettings(prompts={}),
-            output=OutputSettings()
+            output=OutputSettings(),
+            media=MediaSettings(),
+            layout=LayoutSettings(),
+            metrics=MetricsSettings(),
+            daemon=DaemonSettings(),
+            draft=DraftSettings(),
+            long_form=LongFormSettings(),
+            jobs=JobSettings()
         )
 
+def _yaml_scalar(value) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)  # Double-quoted, as in config.yaml
+    return repr(value)
+
+def update_config(section: str, values: Dict[str, object], path: str = CONFIG_PATH):
+    """
+    Sets `section.key` values in the YAML file in place, keeping its comments and layout.
+
+    Keys missing from the section are appended to it. The result is validated
+    before it replaces the file, and the replace is atomic, so a running app
+    reloads either the old or the complete new file.
+    """
+    with open(path, 'r') as f:
+        lines = f.read().splitlines()
+    header = re.compile(rf"^{re.escape(section)}:\s*(#.*)?$")
+    start = next((i for i, line in enumerate(lines) if header.match(line)), None)
+    if start is None:
+        lines += ["", f"{section}:"]
+        start = len(lines) - 1
+    end = start + 1
+    while end < len(lines) and (not lines[end].strip() or lines[end][0] in " #"):
+        end += 1
+    while end > start + 1 and not lines[end - 1].strip():
+        end -= 1  # Trailing blank lines and comments stay with the next section
+
+    for key, value in values.items():
+        entry = re.compile(rf"^(\s+){re.escape(key)}:(\s*)[^#]*?(\s*#.*)?$")
+        for i in range(start + 1, end):
+            match = entry.match(lines[i])
+            if match:
+                indent, gap, comment = match.group(1), match.group(2) or " ", match.group(3) or ""
+                lines[i] = f"{indent}{key}:{gap}{_yaml_scalar(value)}{comment}"
+                break
+        else:
+            lines.insert(end, f"  {key}: {_yaml_scalar(value)}")
+            end += 1
+
+    text = "\n".join(lines) + "\n"
+    temp = f"{path}.tmp"
+    with open(temp, 'w') as f:
+        f.write(text)
+    try:
+        read_settings(temp)
+        os.replace(temp, path)
+    except Exception:
+        os.remove(temp)
+        raise
+
 # --- Singleton Instance ---
 # Load settings once and provide a single instance for the application.
 settings = load_settings()
@@ -87,8 +323,8 @@ if __name__ == '__main__':
     print(f"  Device: {settings.performance.device}")
     print(f"  Compute Type: {settings.performance.compute_type}")
     print("\n--- Hotkey Settings ---")
-    print(f"  Russian Hotkey: {' + '.join(settings.hotkeys.ru)}")
-    print(f"  English Hotkey: {' + '.join(settings.hotkeys.en)}")
+    for name, binding in hotkey_bindings(settings.hotkeys).items():
+        print(f"  {name}: {' + '.join(binding.keys)} ({binding.action} {binding.language or ''})")
     print("\n--- Transcription Prompts ---")
     print(f"  RU Prompt available: {'yes' if 'ru' in settings.transcription.prompts else 'no'}")
     print(f"  EN Prompt available: {'yes' if 'en' in settings.transcription.prompts else 'no'}") 
\ No newline at end of file
@@ -0,0 +1,105 @@
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from whisper_flow.config.settings import CONFIG_PATH, Settings, read_settings, settings
+from whisper_flow.core.event_bus import event_bus
+from whisper_flow.core.events import SettingsChanged
+
+# Read once at startup; changing them takes a restart
+RESTART_REQUIRED = {
+    "app.lock_file", "app.async_events", "app.config_poll_interval",
+    "audio.samplerate", "audio.persistent_stream", "audio.preprocess", "audio.capture_rate",
+    "audio.capture_channels", "audio.dc_removal", "audio.gain_normalization", "audio.target_level_db",
+    "audio.max_gain_db",
+    "performance.batching", "performance.batch_window_ms", "performance.batch_max_size",
+    "performance.preload_model", "performance.warmup",
+    "output.insert_method",
+    "layout.poll_interval",
+    "media.enabled", "media.bus_address",
+    "metrics.enabled", "metrics.http_port", "metrics.unix_socket", "metrics.trace_file",
+    "long_form.parallel_chunks",
+}
+
+
+def diff_settings(old: Settings, new: Settings) -> List[str]:
+    """Dotted names of the fields that differ, e.g. ["performance.beam_size"]."""
+    changed = []
+    for section, old_values in vars(old).items():
+        new_values = getattr(new, section)
+        # Sections are models, except mappings such as hotkeys (compared per key)
+        if not isinstance(old_values, dict):
+            old_values, new_values = vars(old_values), vars(new_values)
+        for field in old_values.keys() | new_values.keys():
+            if old_values.get(field) != new_values.get(field):
+                changed.append(f"{section}.{field}")
+    return sorted(changed)
+
+
+class ConfigWatcher:
+    """
+    Polls the config file and applies valid edits to the live settings.
+
+    The whole file is validated before anything changes; an invalid edit is
+    reported and the running configuration kept. Changed sections are
+    replaced on the shared settings object, which services read at use time,
+    and a SettingsChanged event lets services holding derived state (hotkeys,
+    loaded models) rebuild it without blocking dictation.
+    """
+    def __init__(self, path: str = CONFIG_PATH, interval: Optional[float] = None):
+        self.path = path
+        self.interval = settings.app.config_poll_interval if interval is None else interval
+        self._stamp = self._file_stamp()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    def start(self):
+        if self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        print(f"Watching {self.path} for configuration changes.")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._stamp:
+                continue
+            self._stamp = stamp
+            self.reload()
+
+    def reload(self) -> List[str]:
+        """Reads the file and applies it; returns the changed fields."""
+        try:
+            new = read_settings(self.path)
+        except Exception as e:
+            print(f"⚠️ Configuration change in {self.path} ignored: {e}")
+            return []
+        changed = diff_settings(settings, new)
+        pending = sorted(RESTART_REQUIRED.intersection(changed))
+        if pending:
+            print(f"Configuration change takes effect after a restart: {', '.join(pending)}")
+            # Running services were built with the old values; keep them consistent
+            for name in pending:
+                section, field = name.split(".")
+                setattr(getattr(new, section), field, getattr(getattr(settings, section), field))
+                changed.remove(name)
+        if not changed:
+            return []
+        for section in {name.split(".")[0] for name in changed}:
+            setattr(settings, section, getattr(new, section))
+        print(f"🔧 Configuration reloaded: {', '.join(changed)}")
+        event_bus.publish(SettingsChanged(changed=changed))
+        return changed
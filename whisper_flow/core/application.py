@@ -1,30 +1,56 @@
 import concurrent.futures
+import time
 from whisper_flow.config.settings import settings
+from whisper_flow.config.watcher import ConfigWatcher
 from whisper_flow.core.event_bus import event_bus
-from whisper_flow.core.events import AppShutdown
+from whisper_flow.core.events import AppShutdown, SettingsChanged
+from whisper_flow.core.metrics import metrics
 from whisper_flow.services.input.hotkey_manager import HotkeyManager
 from whisper_flow.services.audio.recorder import AudioRecorder
 from whisper_flow.services.transcription.transcriber import Transcriber
 from whisper_flow.services.output.output_service import OutputService
-from whisper_flow.services.integration.spotify_service import SpotifyService
+from whisper_flow.services.integration.media_service import MediaService
+from whisper_flow.services.transcription.model_manager import model_manager
+from whisper_flow.services.transcription.language import layout_tracker
 
 class Application:
     def __init__(self):
         print("Initializing WhisperFlow...")
         self.settings = settings
+        # Handlers run on per-subscriber worker threads so the hotkey listener never blocks
+        event_bus.set_async(settings.app.async_events)
+        metrics.enabled = settings.metrics.enabled
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
         
         # Initialize all services
-        self.hotkey_manager = HotkeyManager()
-        self.audio_recorder = AudioRecorder()
-        self.transcriber = Transcriber(self.executor)
-        self.output_service = OutputService()
-        self.spotify_service = SpotifyService()
+        self.hotkey_manager = self._timed("hotkey manager", HotkeyManager)
+        self.audio_recorder = self._timed("audio recorder", AudioRecorder)
+        self.transcriber = self._timed("transcriber", lambda: Transcriber(self.executor))
+        self.output_service = self._timed("output service", OutputService)
+        self.media_service = self._timed("media service", MediaService)
+        # Config edits swap the model in the background while dictation goes on
+        event_bus.subscribe(SettingsChanged, model_manager.on_settings_changed)
+        self.config_watcher = ConfigWatcher()
+
+    @staticmethod
+    def _timed(name: str, factory):
+        """Builds a service and logs how long its initialization took."""
+        start = time.monotonic()
+        service = factory()
+        print(f"⏱️ Startup: {name} initialized in {(time.monotonic() - start) * 1000:.0f} ms")
+        return service
 
     def run(self):
         print("WhisperFlow is running.")
         print(f"Using device: {self.settings.performance.device}")
         
+        # Model loads in the background; recordings made meanwhile wait for it
+        if self.settings.performance.preload_model:
+            model_manager.preload()
+        if self.settings.metrics.enabled:
+            self._start_metrics()
+        layout_tracker.start()
+        self.config_watcher.start()
         self.hotkey_manager.start()
         
         # The listener's join() method will block the main thread,
@@ -34,11 +60,31 @@ class Application:
         except KeyboardInterrupt:
             self.shutdown()
 
+    def _start_metrics(self):
+        """Starts the configured local metrics exporters."""
+        config = self.settings.metrics
+        try:
+            metrics.start_exporters(config.http_port, config.unix_socket, config.trace_file)
+        except OSError as e:
+            print(f"Error starting metrics export: {e}")
+
     def shutdown(self):
         print("Shutting down WhisperFlow...")
         event_bus.publish(AppShutdown())
+        self.config_watcher.stop()
         self.hotkey_manager.stop()
+        layout_tracker.stop()
+        # Drain queued events before the executor stops accepting transcriptions.
+        # The bus is closed then, so text of transcriptions still running is
+        # delivered on the executor's threads while we wait for them.
+        event_bus.shutdown()
         self.executor.shutdown(wait=True)
+        print("Event dispatch statistics:")
+        event_bus.print_stats()
+        if metrics.enabled:
+            print("Stage timings:")
+            metrics.print_summary()
+        metrics.stop_exporters()
         print("Shutdown complete.")
         # Graceful shutdown logic will be here
         # e.g., self.hotkey_manager.stop() 
\ No newline at end of file
@@ -1,13 +1,87 @@
+import queue
 import threading
+import time
 from collections import defaultdict
-from typing import Callable, Any
+from dataclasses import dataclass, field
+from typing import Callable, Any, Dict
 
 class Event:
     """Base class for all events."""
     pass
 
+@dataclass
+class HandlerStats:
+    """Dispatch metrics of one subscriber; updated from its worker and from publishing threads."""
+    handled: int = 0
+    errors: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    max_queue_depth: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record(self, wait: float, latency: float, error: bool = False):
+        with self._lock:
+            self.handled += 1
+            self.errors += int(error)
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_depth(self, depth: int):
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+class _SubscriberWorker:
+    """Worker thread with a FIFO queue, delivering events to one subscriber in publish order."""
+    def __init__(self, name: str, stats: HandlerStats):
+        self.name = name
+        self.stats = stats
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"event-{name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, handler: Callable, event: Any):
+        self._queue.put((handler, event, time.monotonic()))
+        self.stats.record_depth(self._queue.qsize())
+
+    def stop(self, timeout: float = None):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            handler, event, enqueued_at = item
+            EventBus._invoke(handler, event, self.stats, enqueued_at)
+        # Submitted while the bus was closing, behind the stop marker
+        while not self._queue.empty():
+            handler, event, enqueued_at = self._queue.get()
+            EventBus._invoke(handler, event, self.stats, enqueued_at)
+
 class EventBus:
-    """A simple, thread-safe event bus using the Pub/Sub pattern."""
+    """
+    A simple, thread-safe event bus using the Pub/Sub pattern.
+
+    In synchronous mode (the default, used by tests) handlers run on the
+    publisher's thread. In asynchronous mode every subscriber object gets its
+    own worker thread and queue: publish() only enqueues, a slow subscriber
+    cannot delay the others, and each subscriber still sees events in the
+    order they were published.
+
+    After shutdown() the bus is closed: events published from then on (e.g. by
+    a transcription finishing while the app waits for it) are dispatched
+    synchronously on the publisher's thread rather than to new workers that
+    nobody would wait for.
+    """
     _instance = None
     _lock = threading.Lock()
 
@@ -17,8 +91,28 @@ class EventBus:
                 if cls._instance is None:
                     cls._instance = super(EventBus, cls).__new__(cls)
                     cls._instance._subscribers = defaultdict(list)
+                    cls._instance._workers = {}
+                    cls._instance._stats = defaultdict(HandlerStats)
+                    cls._instance._async = False
+                    cls._instance._closed = False
         return cls._instance
 
+    @staticmethod
+    def _subscriber_name(handler: Callable) -> str:
+        """Groups bound methods by their owner so one service keeps its event order."""
+        owner = getattr(handler, "__self__", None)
+        if owner is not None:
+            return f"{type(owner).__name__}@{id(owner):x}"
+        return getattr(handler, "__qualname__", repr(handler))
+
+    def set_async(self, enabled: bool):
+        """Switches between synchronous and asynchronous dispatch."""
+        with self._lock:
+            self._async = enabled
+            self._closed = False
+        if not enabled:
+            self.shutdown()
+
     def subscribe(self, event_type: type, handler: Callable):
         """Subscribe a handler to an event type."""
         with self._lock:
@@ -30,15 +124,79 @@ class EventBus:
         handlers = []
         with self._lock:
             # Copy handlers to allow modification during iteration
-            handlers = self._subscribers[event_type][:]
-        
-        for handler in handlers:
-            try:
-                # Handlers are called in separate threads or via a thread pool
-                # to avoid blocking the event bus. For now, calling directly.
-                handler(event)
-            except Exception as e:
-                print(f"Error in event handler for {event_type.__name__}: {e}")
+            handlers = [
+                (handler, self._subscriber_name(handler))
+                for handler in self._subscribers[event_type]
+            ]
+            use_async = self._async and not self._closed
+
+        for handler, name in handlers:
+            worker = self._worker(name) if use_async else None
+            if worker is not None:
+                worker.submit(handler, event)
+            else:
+                with self._lock:
+                    stats = self._stats[name]
+                self._invoke(handler, event, stats, time.monotonic())
+
+    def _worker(self, name: str) -> _SubscriberWorker:
+        """Returns the worker of a subscriber, starting it on first use; None once the bus is closed."""
+        with self._lock:
+            if self._closed:
+                return None
+            worker = self._workers.get(name)
+            if worker is None:
+                worker = _SubscriberWorker(name, self._stats[name])
+                self._workers[name] = worker
+            return worker
+
+    @staticmethod
+    def _invoke(handler: Callable, event: Event, stats: HandlerStats, enqueued_at: float):
+        """Runs one handler, recording its queue wait and latency."""
+        started_at = time.monotonic()
+        error = False
+        try:
+            handler(event)
+        except Exception as e:
+            error = True
+            print(f"Error in event handler for {type(event).__name__}: {e}")
+        stats.record(started_at - enqueued_at, time.monotonic() - started_at, error)
+
+    def stats(self) -> Dict[str, dict]:
+        """Returns dispatch metrics per subscriber, including current queue depth."""
+        with self._lock:
+            workers = dict(self._workers)
+            stats = dict(self._stats)
+        result = {}
+        for name, s in stats.items():
+            worker = workers.get(name)
+            result[name] = {
+                "handled": s.handled,
+                "errors": s.errors,
+                "queue_depth": worker.queue_depth if worker else 0,
+                "max_queue_depth": s.max_queue_depth,
+                "avg_latency_ms": s.total_latency / s.handled * 1000 if s.handled else 0.0,
+                "max_latency_ms": s.max_latency * 1000,
+                "avg_wait_ms": s.total_wait / s.handled * 1000 if s.handled else 0.0,
+                "max_wait_ms": s.max_wait * 1000,
+            }
+        return result
+
+    def print_stats(self):
+        """Prints the dispatch metrics of every subscriber."""
+        for name, s in self.stats().items():
+            print(f"  {name:<32} handled={s['handled']:<5} depth={s['queue_depth']}/{s['max_queue_depth']} "
+                  f"latency avg={s['avg_latency_ms']:.1f}ms max={s['max_latency_ms']:.1f}ms "
+                  f"wait max={s['max_wait_ms']:.1f}ms")
+
+    def shutdown(self, timeout: float = 5.0):
+        """Drains the asynchronous workers, stops their threads and closes the bus."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.stop(timeout)
 
 # Singleton instance
-event_bus = EventBus() 
\ No newline at end of file
+event_bus = EventBus()
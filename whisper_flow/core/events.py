@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import List
 import numpy as np
 from whisper_flow.core.event_bus import Event
 
@@ -11,10 +12,17 @@ class AppStart(Event):
 class AppShutdown(Event):
     pass
 
+@dataclass
+class SettingsChanged(Event):
+    """The config file was reloaded; lists the changed fields, e.g. "performance.model_size"."""
+    changed: List[str]
+
 # --- Hotkey Events ---
 @dataclass
 class HotkeyEvent(Event):
     language: str
+    # Identifies one utterance across events for per-stage timing
+    trace_id: str = ""
 
 @dataclass
 class RecordingStartRequested(HotkeyEvent):
@@ -24,17 +32,69 @@ class RecordingStartRequested(HotkeyEvent):
 class RecordingStopRequested(HotkeyEvent):
     pass
 
+@dataclass
+class CancelRequested(Event):
+    """The abort hotkey: drops the recording in progress and every pending transcription."""
+    pass
+
 # --- Audio Events ---
 @dataclass
 class AudioChunkReady(Event):
     audio_data: np.ndarray
+    trace_id: str = ""
+    # Dictation language of the recording; the next one may already have started
+    language: str = ""
+
+@dataclass
+class AudioPartialReady(Event):
+    """Audio recorded so far, published periodically while the hotkey is held."""
+    audio_data: np.ndarray
+    trace_id: str = ""
+    language: str = ""
+
+@dataclass
+class LongFormChunkReady(Event):
+    """A chunk of a long-form recording, cut at a pause, with overlap on both sides."""
+    audio_data: np.ndarray
+    index: int
+    # Recording time (seconds) of the first sample
+    start: float
+    # Words centred in [keep_from, keep_until) belong to this chunk; the rest is overlap
+    keep_from: float
+    keep_until: float
+    # The chunk cut on key release
+    final: bool = False
+    trace_id: str = ""
+    language: str = ""
 
 # --- Transcription Events ---
 @dataclass
 class TranscriptionReady(Event):
     text: str
+    trace_id: str = ""
+    # False for a draft that a TranscriptionRefined event will follow
+    final: bool = True
+    # More text of the same utterance follows (long-form dictation)
+    partial: bool = False
+    # The text was already delivered segment by segment (TranscriptionSegment)
+    streamed: bool = False
+
+@dataclass
+class TranscriptionSegment(Event):
+    """
+    One decoded segment, published as soon as the model yields it.
+
+    `text` is ready to insert after the previous segments: it carries the
+    separating space, if any. A TranscriptionReady with streamed=True and
+    the whole text follows the last one.
+    """
+    text: str
+    index: int
+    trace_id: str = ""
 
-# --- Spotify Events ---
 @dataclass
-class SpotifyStatus(Event):
-    is_playing: bool 
\ No newline at end of file
+class TranscriptionRefined(Event):
+    """Main-model text for an utterance whose draft was already published."""
+    draft: str
+    text: str
+    trace_id: str = ""
@@ -0,0 +1,241 @@
+import bisect
+import json
+import os
+import socketserver
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+
+def new_trace_id() -> str:
+    """Returns a short id identifying one utterance across events."""
+    return uuid.uuid4().hex[:12]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Trace:
+    def __init__(self, trace_id: str, origin: float):
+        self.trace_id = trace_id
+        self.origin = origin
+        self.wall_start = time.time()
+        # stage -> [start, end] in monotonic seconds
+        self.stages: Dict[str, List[Optional[float]]] = {}
+        self.attributes: Dict[str, object] = {}
+
+
+class Metrics:
+    """
+    Collects per-stage timings of each utterance, keyed by trace id.
+
+    Stage durations feed one histogram per stage, exported in the Prometheus
+    text format over a local HTTP port or a Unix socket. Finished traces can
+    also be appended to a JSONL file with their monotonic timestamps.
+    """
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._traces: Dict[str, _Trace] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._finished = 0
+        self._trace_file: Optional[str] = None
+        self._servers: List[socketserver.BaseServer] = []
+
+    # --- Recording ---
+
+    def start(self, trace_id: str, at: float = None):
+        """Opens a trace; stages of unknown or finished traces are ignored."""
+        if not self.enabled or not trace_id:
+            return
+        with self._lock:
+            self._traces[trace_id] = _Trace(trace_id, at if at is not None else time.monotonic())
+
+    def begin(self, trace_id: str, stage: str, at: float = None):
+        """Marks the start of a stage."""
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                return
+            trace.stages[stage] = [at if at is not None else time.monotonic(), None]
+
+    def end(self, trace_id: str, stage: str, at: float = None):
+        """Marks the end of a stage and records its duration."""
+        if not trace_id:
+            return
+        at = at if at is not None else time.monotonic()
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is None or stage not in trace.stages:
+                return
+            span = trace.stages[stage]
+            if span[1] is not None:
+                return  # Already ended
+            span[1] = at
+            self._histograms.setdefault(stage, Histogram()).observe(at - span[0])
+
+    @contextmanager
+    def stage(self, trace_id: str, stage: str):
+        """Times the enclosed block as one stage."""
+        self.begin(trace_id, stage)
+        try:
+            yield
+        finally:
+            self.end(trace_id, stage)
+
+    def annotate(self, trace_id: str, **attributes):
+        """Attaches attributes (audio length, text size, ...) to a trace."""
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace is not None:
+                trace.attributes.update(attributes)
+
+    def open_traces(self) -> int:
+        """Number of traces started and not finished yet."""
+        with self._lock:
+            return len(self._traces)
+
+    def finish(self, trace_id: str):
+        """Closes a trace, recording its end-to-end time and writing it to the trace file."""
+        if not trace_id:
+            return
+        with self._lock:
+            trace = self._traces.pop(trace_id, None)
+            if trace is None:
+                return
+            total = time.monotonic() - trace.origin
+            self._histograms.setdefault("total", Histogram()).observe(total)
+            self._finished += 1
+            trace_file = self._trace_file
+        if trace_file:
+            self._write_trace(trace_file, trace, total)
+
+    def _write_trace(self, path: str, trace: _Trace, total: float):
+        record = {
+            "trace_id": trace.trace_id,
+            "started_at": trace.wall_start,
+            "total": total,
+            "stages": {
+                name: {
+                    "start": start - trace.origin,
+                    "end": end - trace.origin if end is not None else None,
+                    "duration": end - start if end is not None else None,
+                }
+                for name, (start, end) in trace.stages.items()
+            },
+            "attributes": trace.attributes,
+        }
+        try:
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Error writing trace to {path}: {e}")
+
+    def summary(self) -> Dict[str, dict]:
+        """Returns the count and mean duration of every stage."""
+        with self._lock:
+            return {
+                stage: {"n": histogram.count, "mean_ms": histogram.sum / histogram.count * 1000}
+                for stage, histogram in sorted(self._histograms.items())
+            }
+
+    def print_summary(self):
+        for stage, row in self.summary().items():
+            print(f"  {stage:<20} n={row['n']:<5} mean={row['mean_ms']:8.1f} ms")
+
+    # --- Export ---
+
+    def render(self) -> str:
+        """Renders all histograms in the Prometheus text exposition format."""
+        lines = [
+            "# HELP whisper_flow_stage_seconds Duration of each utterance processing stage.",
+            "# TYPE whisper_flow_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + [float("inf")], histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'whisper_flow_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'whisper_flow_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'whisper_flow_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+            lines += [
+                "# HELP whisper_flow_utterances_total Utterances that completed processing.",
+                "# TYPE whisper_flow_utterances_total counter",
+                f"whisper_flow_utterances_total {self._finished}",
+                "# HELP whisper_flow_utterances_in_flight Utterances currently being processed.",
+                "# TYPE whisper_flow_utterances_in_flight gauge",
+                f"whisper_flow_utterances_in_flight {len(self._traces)}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def start_exporters(self, http_port: Optional[int] = None, unix_socket: Optional[str] = None,
+                        trace_file: Optional[str] = None):
+        """Starts the configured local exporters on background threads."""
+        self._trace_file = trace_file
+        metrics = self
+
+        if http_port:
+            class HttpHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    body = metrics.render().encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format, *args):
+                    pass
+
+            self._serve(ThreadingHTTPServer(("127.0.0.1", http_port), HttpHandler))
+            print(f"Metrics available at http://127.0.0.1:{http_port}/metrics")
+
+        if unix_socket:
+            class SocketHandler(socketserver.StreamRequestHandler):
+                def handle(self):
+                    self.wfile.write(metrics.render().encode())
+
+            if os.path.exists(unix_socket):
+                os.remove(unix_socket)
+            self._serve(socketserver.ThreadingUnixStreamServer(unix_socket, SocketHandler))
+            print(f"Metrics available on unix socket {unix_socket}")
+
+    def _serve(self, server: socketserver.BaseServer):
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        self._servers.append(server)
+
+    def stop_exporters(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            address = server.server_address
+            if isinstance(address, str) and os.path.exists(address):
+                os.remove(address)
+        self._servers = []
+
+
+# Singleton instance
+metrics = Metrics()
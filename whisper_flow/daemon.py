@@ -0,0 +1,240 @@
+"""
+Transcription daemon: one loaded model shared by every local client.
+
+Clients connect to a Unix socket and send framed messages (see
+services/transcription/remote.py): a 4-byte length, a JSON header and, for
+"transcribe", raw float32 samples at the configured rate. Requests wait in one
+queue and are decoded in arrival order. Per-client throughput and queue wait
+are kept and can be queried at any time.
+
+    python -m whisper_flow.daemon            # serve
+    python -m whisper_flow.daemon --stats    # print per-client statistics
+"""
+import argparse
+import functools
+import gc
+import os
+import queue
+import signal
+import socketserver
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict
+
+import numpy as np
+
+print = functools.partial(print, flush=True)
+
+
+@dataclass
+class ClientStats:
+    """Counters for one client name."""
+    requests: int = 0
+    errors: int = 0
+    audio_seconds: float = 0.0
+    decode_seconds: float = 0.0
+    queue_wait_total: float = 0.0
+    queue_wait_max: float = 0.0
+
+
+@dataclass
+class _Request:
+    client: str
+    options: dict
+    audio: np.ndarray
+    enqueued_at: float = field(default_factory=time.monotonic)
+    done: threading.Event = field(default_factory=threading.Event)
+    response: dict = None
+
+
+class TranscriptionDaemon:
+    """Owns the model and serves transcription requests from a queue."""
+    def __init__(self, socket_path: str, workers: int = 1):
+        from whisper_flow.config.settings import settings
+        self.settings = settings
+        self.socket_path = socket_path
+        self.workers = max(1, workers)
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._stats: Dict[str, ClientStats] = {}
+        self._stats_lock = threading.Lock()
+        self._server: socketserver.ThreadingUnixStreamServer = None
+
+    def start(self):
+        from whisper_flow.services.transcription.model_manager import model_manager
+        from whisper_flow.services.transcription.remote import RemoteModel
+
+        if RemoteModel.connect(self.socket_path, "daemon-probe", timeout=1.0) is not None:
+            print(f"A transcription daemon is already serving {self.socket_path}. Exiting.")
+            sys.exit(1)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)  # Stale socket from a crashed daemon
+
+        # The daemon is the one process that loads the model
+        self.settings.daemon.use_daemon = False
+        model_manager.preload()
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"daemon-worker-{i}", daemon=True).start()
+
+        daemon = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon._handle(self.request)
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        # Only the owner may send audio to the model
+        os.chmod(self.socket_path, 0o600)
+        print(f"Transcription daemon listening on {self.socket_path} "
+              f"({self.settings.performance.model_size} on {self.settings.performance.device}, "
+              f"{self.workers} worker(s)).")
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            print("Per-client statistics:")
+            self.print_stats()
+
+    def shutdown(self):
+        """Stops serving; safe to call from a signal handler."""
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def _handle(self, sock):
+        from whisper_flow.services.transcription.remote import recv_message, send_message
+        try:
+            header, payload = recv_message(sock)
+        except (ConnectionError, ValueError) as e:
+            print(f"Dropped malformed request: {e}")
+            return
+
+        kind = header.get("type")
+        if kind == "ping":
+            send_message(sock, {"ok": True, "queue_depth": self._queue.qsize(),
+                                "model": self.settings.performance.model_size})
+        elif kind == "stats":
+            send_message(sock, {"clients": self.stats()})
+        elif kind == "transcribe":
+            try:
+                audio = np.frombuffer(payload, dtype=header.get("dtype", "float32")).astype(np.float32, copy=False)
+            except (TypeError, ValueError) as e:
+                send_message(sock, {"error": f"bad audio payload: {e}"})
+                return
+            job = _Request(client=str(header.get("client", "unknown")), options=header.get("options") or {},
+                           audio=audio)
+            self._queue.put(job)
+            job.done.wait()
+            send_message(sock, job.response)
+        else:
+            send_message(sock, {"error": f"unknown request type '{kind}'"})
+
+    def _worker(self):
+        from whisper_flow.services.transcription.model_manager import model_manager
+        while True:
+            job = self._queue.get()
+            wait = time.monotonic() - job.enqueued_at
+            start = time.monotonic()
+            duration = job.audio.size / self.settings.audio.samplerate
+            try:
+                model = model_manager.get_model()
+                segments, info = model.transcribe(job.audio, **job.options)
+                segments = [self._segment_to_dict(s) for s in segments]
+                decode = time.monotonic() - start
+                job.response = {
+                    "segments": segments,
+                    "info": {"language": info.language, "language_probability": info.language_probability,
+                             "duration": duration, "queue_seconds": wait, "decode_seconds": decode},
+                }
+                self._record(job.client, duration, decode, wait, error=False)
+                print(f"{job.client}: {duration:.1f}s audio, waited {wait * 1000:.0f} ms, "
+                      f"decoded in {decode * 1000:.0f} ms")
+            except Exception as e:
+                job.response = {"error": str(e)}
+                self._record(job.client, duration, time.monotonic() - start, wait, error=True)
+                print(f"{job.client}: transcription failed: {e}")
+            finally:
+                model_manager.release_gpu_memory()
+                gc.collect()
+                job.done.set()
+
+    @staticmethod
+    def _segment_to_dict(segment) -> dict:
+        words = getattr(segment, "words", None)
+        return {
+            "text": segment.text,
+            "start": segment.start,
+            "end": segment.end,
+            "avg_logprob": getattr(segment, "avg_logprob", 0.0),
+            "no_speech_prob": getattr(segment, "no_speech_prob", 0.0),
+            "words": [
+                {"word": w.word, "start": w.start, "end": w.end, "probability": getattr(w, "probability", 0.0)}
+                for w in words
+            ] if words is not None else None,
+        }
+
+    def _record(self, client: str, audio: float, decode: float, wait: float, error: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(client, ClientStats())
+            stats.requests += 1
+            stats.errors += int(error)
+            stats.audio_seconds += audio
+            stats.decode_seconds += decode
+            stats.queue_wait_total += wait
+            stats.queue_wait_max = max(stats.queue_wait_max, wait)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._stats_lock:
+            return {client: asdict(stats) for client, stats in self._stats.items()}
+
+    def print_stats(self):
+        print_client_stats(self.stats())
+
+
+def print_client_stats(clients: Dict[str, dict]):
+    """Prints one line of throughput and queue wait per client."""
+    if not clients:
+        print("  no requests yet")
+    for client, s in sorted(clients.items()):
+        speed = s["audio_seconds"] / s["decode_seconds"] if s["decode_seconds"] else 0.0
+        wait_avg = s["queue_wait_total"] / s["requests"] * 1000 if s["requests"] else 0.0
+        print(f"  {client:<24} requests={s['requests']:<5} errors={s['errors']:<3} "
+              f"audio={s['audio_seconds']:8.1f}s ({speed:5.1f}x real time) "
+              f"wait avg={wait_avg:.0f}ms max={s['queue_wait_max'] * 1000:.0f}ms")
+
+
+def main(argv=None):
+    from whisper_flow.config.settings import settings
+
+    parser = argparse.ArgumentParser(description="WhisperFlow shared transcription daemon")
+    parser.add_argument("--socket", default=settings.daemon.socket_path, help="Unix socket path")
+    parser.add_argument("--workers", type=int, default=settings.daemon.workers, help="Decode threads")
+    parser.add_argument("--stats", action="store_true", help="Print a running daemon's per-client statistics")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        from whisper_flow.services.transcription.remote import request
+        try:
+            response = request(args.socket, {"type": "stats", "client": "stats"},
+                               timeout=settings.daemon.connect_timeout)
+        except OSError as e:
+            print(f"No daemon reachable at {args.socket}: {e}")
+            sys.exit(1)
+        print_client_stats(response["clients"])
+        return
+
+    daemon = TranscriptionDaemon(args.socket, args.workers)
+    daemon.start()
+    signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("\nCaught interrupt, shutting down...")
+
+
+if __name__ == "__main__":
+    main()
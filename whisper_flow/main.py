@@ -1,8 +1,7 @@
 import sys
 import os
 import atexit
-from whisper_flow.core.application import Application
-from whisper_flow.config.settings import settings
+from whisper_flow.utils.lazy_import import timed_import, print_import_summary
 
 # Force unbuffered output for better logging
 import functools
@@ -11,6 +10,10 @@ print = functools.partial(print, flush=True)
 def main():
     """Main entry point for the application."""
     print("🚀 WhisperFlow starting up...")
+    # Imported here so the startup breakdown shows what each stage costs
+    settings = timed_import("whisper_flow.config.settings").settings
+    Application = timed_import("whisper_flow.core.application").Application
+    print_import_summary()
     print(f"📋 Configuration: beam_size={settings.performance.beam_size}, model={settings.performance.model_size}")
     
     # --- Single Instance Lock ---
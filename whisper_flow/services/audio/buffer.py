@@ -0,0 +1,230 @@
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from whisper_flow.services.audio.vad import quietest_point
+
+
+class RecordingBuffer:
+    """
+    Preallocated, growable int16 buffer for one recording.
+
+    Blocks from the audio callback are written in place. Once the buffer would
+    grow past `spill_bytes` its storage moves to a memory-mapped temp file, so
+    resident memory stays flat for long dictations. `view()` returns the
+    recorded samples without copying.
+
+    Growing allocates (possibly a file) and copies the whole recording, which
+    must not happen in the real-time callback: another thread calls
+    `reserve()` to keep headroom ahead of it, and `append()` only grows by
+    itself if that falls behind.
+    """
+    def __init__(
+        self,
+        samplerate: int,
+        initial_seconds: float = 60.0,
+        spill_bytes: int = 64 * 1024 * 1024,
+        spill_dir: Optional[str] = None
+    ):
+        # np.empty only reserves address space; pages are touched as they are written.
+        self._data = np.empty(max(int(samplerate * initial_seconds), 1), dtype=np.int16)
+        self._size = 0
+        self._spill_bytes = spill_bytes
+        self._spill_dir = spill_dir
+        self._spilled = False
+        # Held by append() and for the swap to grown storage; never during the bulk copy
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the storage has moved to a memory-mapped file."""
+        return self._spilled
+
+    def append(self, block: np.ndarray):
+        """Copies an int16 block (frames x 1 or 1-D) into the buffer."""
+        with self._lock:
+            frames = block.shape[0]
+            end = self._size + frames
+            if end > self._data.shape[0]:
+                # reserve() fell behind; grow here rather than lose audio
+                new_data = self._allocate(max(self._data.shape[0] * 2, end))
+                new_data[:self._size] = self._data[:self._size]
+                self._data = new_data
+            self._data[self._size:end] = block.reshape(-1)
+            self._size = end
+
+    def view(self) -> np.ndarray:
+        """Returns a zero-copy view of the samples recorded so far."""
+        return self._data[:self._size]
+
+    def reserve(self, headroom: int):
+        """
+        Grows the buffer, if needed, so at least `headroom` more samples fit.
+
+        Called off the audio thread while recording continues: samples already
+        written never change, so they are copied without the lock, which is
+        only taken to copy the few blocks appended meanwhile and swap storage.
+        """
+        with self._lock:
+            data, size = self._data, self._size
+        if size + headroom <= data.shape[0]:
+            return
+        new_data = self._allocate(max(data.shape[0] * 2, size + headroom))
+        new_data[:size] = data[:size]
+        with self._lock:
+            if self._data is not data or self._size > new_data.shape[0]:
+                return  # append() had to grow meanwhile
+            new_data[size:self._size] = self._data[size:self._size]
+            self._data = new_data
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        """New storage of `capacity` samples, memory-mapped past the spill size."""
+        if self._spilled or capacity * self._data.itemsize > self._spill_bytes:
+            # The file is unlinked immediately; the mapping keeps it alive.
+            spill_file = tempfile.TemporaryFile(prefix="whisper_flow_", dir=self._spill_dir)
+            new_data = np.memmap(spill_file, dtype=np.int16, mode="w+", shape=(capacity,))
+            spill_file.close()
+            if not self._spilled:
+                print(f"Recording buffer spilled to disk ({self._size / 1e6:.1f}M samples).")
+            self._spilled = True
+        else:
+            new_data = np.empty(capacity, dtype=np.int16)
+        return new_data
+
+
+class RingBuffer:
+    """Fixed-size int16 ring holding the most recent samples (pre-roll)."""
+    def __init__(self, capacity: int):
+        self._data = np.zeros(max(capacity, 1), dtype=np.int16)
+        self._pos = 0
+        self._filled = 0
+
+    def write(self, block: np.ndarray):
+        """Writes a block, overwriting the oldest samples."""
+        block = block.reshape(-1)
+        capacity = self._data.shape[0]
+        frames = block.shape[0]
+        if frames >= capacity:
+            self._data[:] = block[-capacity:]
+            self._pos = 0
+            self._filled = capacity
+            return
+
+        end = self._pos + frames
+        if end <= capacity:
+            self._data[self._pos:end] = block
+        else:
+            first = capacity - self._pos
+            self._data[self._pos:] = block[:first]
+            self._data[:frames - first] = block[first:]
+        self._pos = end % capacity
+        self._filled = min(self._filled + frames, capacity)
+
+    def latest(self, frames: int) -> np.ndarray:
+        """Returns a copy of the last `frames` samples in chronological order."""
+        frames = min(frames, self._filled)
+        capacity = self._data.shape[0]
+        start = (self._pos - frames) % capacity
+        if start + frames <= capacity:
+            return self._data[start:start + frames].copy()
+        return np.concatenate((self._data[start:], self._data[:self._pos]))
+
+
+@dataclass
+class Chunk:
+    """A long-form chunk and the span of recording time (seconds) it is responsible for."""
+    audio: np.ndarray
+    index: int
+    start: float
+    keep_from: float
+    keep_until: float
+    final: bool = False
+
+
+class ChunkedRecording:
+    """
+    Bounded int16 buffer for long-form dictation.
+
+    Only the audio after the last cut, plus the overlap before it, is kept, so
+    memory does not grow with the length of the recording. Once
+    `chunk_seconds` past the last cut are recorded, `next_chunk()` cuts at the
+    quietest point of the final `search_seconds` and returns the chunk with
+    `overlap_seconds` of audio on both sides of its span.
+    """
+    def __init__(self, samplerate: int, chunk_seconds: float, search_seconds: float,
+                 overlap_seconds: float, frame_ms: int = 30):
+        self._samplerate = samplerate
+        self._frame_ms = frame_ms
+        self._chunk = int(samplerate * chunk_seconds)
+        self._search = min(int(samplerate * search_seconds), self._chunk - samplerate)
+        self._overlap = int(samplerate * overlap_seconds)
+        self._data = np.empty(self._chunk + 2 * self._overlap + 5 * samplerate, dtype=np.int16)
+        self._lock = threading.Lock()
+        self._offset = 0    # Recording sample index of self._data[0]
+        self._size = 0
+        self._cut = 0       # Recording sample index of the last cut
+        self._index = 0
+
+    def __len__(self) -> int:
+        """Samples recorded so far, including those already handed out."""
+        return self._offset + self._size
+
+    @property
+    def spilled(self) -> bool:
+        return False
+
+    def append(self, block: np.ndarray):
+        """Copies an int16 block (frames x 1 or 1-D) into the buffer."""
+        with self._lock:
+            frames = block.shape[0]
+            end = self._size + frames
+            if end > self._data.shape[0]:
+                # Only when chunks are not taken in time
+                grown = np.empty(max(self._data.shape[0] * 2, end), dtype=np.int16)
+                grown[:self._size] = self._data[:self._size]
+                self._data = grown
+            self._data[self._size:end] = block.reshape(-1)
+            self._size = end
+
+    def next_chunk(self) -> Optional[Chunk]:
+        """Cuts and returns the next chunk once enough audio is recorded, else None."""
+        with self._lock:
+            if len(self) < self._cut + self._chunk + self._overlap:
+                return None
+            low = self._cut + self._chunk - max(self._search, 0) - self._offset
+            high = self._cut + self._chunk - self._offset
+            cut = self._offset + low + quietest_point(self._data[low:high], self._samplerate, self._frame_ms)
+            chunk = self._take(cut + self._overlap, keep_until=cut / self._samplerate)
+            # Keep the overlap before the cut for the next chunk
+            keep_from = cut - self._overlap - self._offset
+            self._size -= keep_from
+            self._data[:self._size] = self._data[keep_from:keep_from + self._size]
+            self._offset += keep_from
+            self._cut = cut
+            return chunk
+
+    def flush(self) -> Optional[Chunk]:
+        """Returns the rest of the recording as the final chunk."""
+        with self._lock:
+            if len(self) <= self._cut:
+                return None
+            return self._take(len(self), keep_until=float("inf"), final=True)
+
+    def _take(self, end: int, keep_until: float, final: bool = False) -> Chunk:
+        start = max(self._cut - self._overlap, self._offset)
+        chunk = Chunk(
+            audio=self._data[start - self._offset:end - self._offset].copy(),
+            index=self._index,
+            start=start / self._samplerate,
+            keep_from=self._cut / self._samplerate,
+            keep_until=keep_until,
+            final=final
+        )
+        self._index += 1
+        return chunk
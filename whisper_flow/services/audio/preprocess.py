@@ -0,0 +1,138 @@
+import math
+import time
+from typing import Optional
+
+import numpy as np
+
+# Low-pass length in samples of the lower of the two rates; the prototype has about TAPS * max(up, down) taps
+TAPS = 32
+# Cutoff as a fraction of the lower rate, below its Nyquist frequency (0.5) so the transition band does not fold back
+CUTOFF = 0.45
+# Time constant of the DC estimate (seconds)
+DC_TAU = 0.5
+# Blocks quieter than this (dBFS) do not move the gain, so silence is not pumped up
+GAIN_GATE_DB = -45.0
+
+
+def _design_filter(up: int, down: int) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass for the up-sampled rate, split into `up` polyphase branches."""
+    taps = -(-TAPS * max(up, down) // up)  # Per branch
+    length = up * taps
+    cutoff = CUTOFF / max(up, down)  # Cycles per up-sampled sample
+    n = np.arange(length) - (length - 1) / 2
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    prototype *= up / prototype.sum()  # Unity DC gain after zero stuffing
+    # Branch p holds taps p, p + up, p + 2*up, ...; reversed so a window
+    # of input samples in time order multiplies it directly
+    return prototype.reshape(taps, up).T[:, ::-1].astype(np.float32)
+
+
+class Preprocessor:
+    """
+    Turns captured blocks at the device's native rate and format into the
+    mono 16-bit blocks at the model rate that the rest of the app uses.
+
+    Each block is down-mixed, resampled by a polyphase FIR filter, has its DC
+    offset removed and is gain-normalized, all in one vectorized pass: the
+    input is read once by the filter's gather, and DC removal and gain are
+    applied to the (smaller) output. Filter history, DC estimate and gain
+    carry over between blocks, so blocks can be processed one by one as they
+    are captured, with the same result as processing the whole recording.
+    """
+    def __init__(self, in_rate: int, out_rate: int, dc_removal: bool = True, gain_normalization: bool = True,
+                 target_level_db: float = -20.0, max_gain_db: float = 20.0):
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        common = math.gcd(in_rate, out_rate)
+        self._up, self._down = out_rate // common, in_rate // common
+        self._resample = (self._up, self._down) != (1, 1)
+        if self._resample:
+            self._branches = _design_filter(self._up, self._down)
+            self._branch_gain = self._branches.sum(axis=1)
+            taps = self._branches.shape[1]
+            # Offsets of each output's window from its newest input sample
+            self._taps = np.arange(-(taps - 1), 1)
+            self._history = np.zeros(taps - 1, dtype=np.float32)
+            # Next output's position in up-sampled samples, relative to the history start
+            self._position = (taps - 1) * self._up
+        self.dc_removal = dc_removal
+        self._dc: Optional[float] = None
+        self.gain_normalization = gain_normalization
+        self._target = 10 ** (target_level_db / 20)
+        self._max_gain = 10 ** (max_gain_db / 20)
+        self._level: Optional[float] = None
+        self._gain = 1.0
+        # Processing cost, for reporting
+        self.busy_seconds = 0.0
+        self.audio_seconds = 0.0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Processes one captured block (frames x channels, int16 or float32); returns int16 at out_rate."""
+        start = time.perf_counter()
+        x = block.astype(np.float32, copy=False)
+        if block.dtype == np.int16:
+            x = x / 32768.0
+        x = x.mean(axis=1, dtype=np.float32) if x.ndim == 2 and x.shape[1] > 1 else x.reshape(-1)
+
+        dc = 0.0
+        if self.dc_removal and x.size:
+            mean = float(np.add.reduce(x, dtype=np.float64)) / x.size
+            alpha = math.exp(-x.size / self.in_rate / DC_TAU)
+            self._dc = mean if self._dc is None else alpha * self._dc + (1 - alpha) * mean
+            dc = self._dc
+
+        if self._resample:
+            y, gain = self._polyphase(x)
+            y -= dc * gain
+        else:
+            y = x - dc if dc else x.copy()
+
+        if self.gain_normalization and y.size:
+            self._apply_gain(y)
+        out = (np.clip(y, -1.0, 32767 / 32768) * 32768).astype(np.int16)
+
+        self.busy_seconds += time.perf_counter() - start
+        self.audio_seconds += block.shape[0] / self.in_rate
+        return out
+
+    def _polyphase(self, x: np.ndarray) -> tuple:
+        """Resamples one block; returns the output and each output's branch DC gain."""
+        signal = np.concatenate((self._history, x))
+        end = signal.size * self._up
+        count = max(-(-(end - self._position) // self._down), 0)
+        positions = self._position + self._down * np.arange(count)
+        newest = positions // self._up   # Input sample aligned with each output
+        branch = positions % self._up
+        windows = signal[newest[:, None] + self._taps]
+        if self._up == 1:
+            # Pure decimation (48 kHz -> 16 kHz): a single branch, one matrix-vector product
+            y = windows @ self._branches[0]
+        else:
+            y = np.einsum("ij,ij->i", windows, self._branches[branch])
+
+        consumed = signal.size - self._history.size
+        self._history = signal[consumed:].copy()
+        self._position += self._down * count - consumed * self._up
+        return y, self._branch_gain[branch]
+
+    def _apply_gain(self, y: np.ndarray):
+        """Moves the gain toward the target speech level, ramping across the block to avoid clicks."""
+        level = math.sqrt(float(np.dot(y, y)) / y.size)
+        if level > 10 ** (GAIN_GATE_DB / 20):
+            # Rise quickly on louder speech, fall back slowly
+            weight = 0.5 if self._level is None or level > self._level else 0.1
+            self._level = level if self._level is None else (1 - weight) * self._level + weight * level
+        if self._level is None:
+            return
+        target = min(max(self._target / self._level, 1 / self._max_gain), self._max_gain)
+        if target != self._gain:
+            y *= np.linspace(self._gain, target, y.size, dtype=np.float32)
+        else:
+            y *= np.float32(target)
+        self._gain = target
+
+    def take_cost(self) -> tuple:
+        """Returns (processing seconds, audio seconds) since the last call and resets them."""
+        cost = (self.busy_seconds, self.audio_seconds)
+        self.busy_seconds = self.audio_seconds = 0.0
+        return cost
@@ -1,41 +1,142 @@
-import sounddevice as sd
-import numpy as np
 import threading
+import time
 
 from whisper_flow.config.settings import settings
 from whisper_flow.core.event_bus import event_bus
 from whisper_flow.core.events import (
-    RecordingStartRequested, 
-    RecordingStopRequested, 
+    RecordingStartRequested,
+    RecordingStopRequested,
+    CancelRequested,
     AudioChunkReady,
+    AudioPartialReady,
+    LongFormChunkReady,
     AppShutdown
 )
+from whisper_flow.core.metrics import metrics, new_trace_id
+from whisper_flow.services.audio.buffer import Chunk, ChunkedRecording, RecordingBuffer, RingBuffer
+from whisper_flow.services.audio.preprocess import Preprocessor
+from whisper_flow.utils.lazy_import import timed_import
+
+# Audio the recording buffer is kept ahead of capture by, so the callback never grows it
+RESERVE_SECONDS = 10.0
 
 class AudioRecorder:
     """Handles audio recording."""
     def __init__(self):
         self._is_recording = False
         self._recording_thread: threading.Thread = None
-        self._recorded_audio: list[np.ndarray] = []
+        self._buffer: RecordingBuffer = None
         self._input_language: str = None
+        self._lock = threading.Lock()
+        self._stream = None
+        self._preroll: RingBuffer = None
+        # Turns native-rate capture into model-rate int16; None when capturing at the model rate
+        self._preprocessor: Preprocessor = None
+        self._start_requested_at: float = None
+        self._trace_id = ""
+        if settings.audio.persistent_stream:
+            self._open_persistent_stream()
         self._setup_subscriptions()
 
     def _setup_subscriptions(self):
         """Subscribes to relevant events."""
         event_bus.subscribe(RecordingStartRequested, self._handle_start_recording)
         event_bus.subscribe(RecordingStopRequested, self._handle_stop_recording)
+        event_bus.subscribe(CancelRequested, self._handle_cancel)
         event_bus.subscribe(AppShutdown, self.stop)
 
+    def _open_persistent_stream(self):
+        """Opens one input stream for the app lifetime, feeding the pre-roll ring."""
+        try:
+            sd = timed_import("sounddevice")
+            self._preroll = RingBuffer(self._preroll_samples())
+            samplerate, channels, dtype, self._preprocessor = self._capture_format(sd)
+            self._stream = sd.InputStream(
+                samplerate=samplerate,
+                channels=channels,
+                dtype=dtype,
+                callback=self._persistent_callback
+            )
+            self._stream.start()
+            print(f"Persistent audio stream opened at {samplerate} Hz, {channels} channel(s) "
+                  f"({settings.audio.preroll_ms} ms pre-roll).")
+        except Exception as e:
+            print(f"Error opening persistent audio stream: {e}. Falling back to per-recording streams.")
+            self._stream = None
+            self._preroll = None
+            self._preprocessor = None
+
+    def _capture_format(self, sd) -> tuple:
+        """
+        Returns the stream's sample rate, channel count and dtype, and the
+        preprocessor converting its blocks (or None).
+        """
+        config = settings.audio
+        if not config.preprocess:
+            # The driver (PortAudio, PulseAudio) converts to the model rate and mono, if the device allows it
+            return config.samplerate, 1, "int16", None
+        samplerate, channels = config.capture_rate, config.capture_channels
+        if not samplerate or not channels:
+            try:
+                device = sd.query_devices(kind="input")
+                samplerate = samplerate or int(device["default_samplerate"])
+                # Sound servers offer dozens of (up-mixed) channels on their default device
+                channels = channels or max(min(int(device["max_input_channels"]), 2), 1)
+            except Exception as e:
+                print(f"Could not query the input device ({e}). Capturing at {config.samplerate} Hz, mono.")
+                samplerate, channels = samplerate or config.samplerate, channels or 1
+        preprocessor = Preprocessor(
+            samplerate,
+            config.samplerate,
+            dc_removal=config.dc_removal,
+            gain_normalization=config.gain_normalization,
+            target_level_db=config.target_level_db,
+            max_gain_db=config.max_gain_db
+        )
+        return samplerate, channels, "float32", preprocessor
+
+    def _persistent_callback(self, indata, frames, time_info, status):
+        """Audio callback of the persistent stream."""
+        if status:
+            print(f"Audio callback status: {status}")
+        # Outside the lock: the hotkey thread only waits for the copy below
+        block = indata if self._preprocessor is None else self._preprocessor.process(indata)
+        with self._lock:
+            self._preroll.write(block)
+            if self._is_recording:
+                self._buffer.append(block)
+
     def _handle_start_recording(self, event: RecordingStartRequested):
         """Event handler to start a new recording."""
         if self._is_recording:
             return
-        
+
         print(f"Starting recording for language: {event.language}")
-        self._is_recording = True
+        self._start_requested_at = time.monotonic()
         self._input_language = event.language
-        self._recorded_audio = []
-        
+        self._trace_id = event.trace_id
+        if not self._trace_id:
+            # Started without a hotkey (e.g. the benchmark): the trace begins here
+            self._trace_id = new_trace_id()
+            metrics.start(self._trace_id, at=self._start_requested_at)
+            metrics.begin(self._trace_id, "capture_start", at=self._start_requested_at)
+        metrics.begin(self._trace_id, "recording", at=self._start_requested_at)
+        buffer = self._new_buffer()
+
+        if self._stream is not None:
+            # Capture is already running: seed the recording with the pre-roll
+            # under the callback lock so no block is lost or duplicated.
+            with self._lock:
+                buffer.append(self._preroll.latest(self._preroll_samples()))
+                self._buffer = buffer
+                self._is_recording = True
+            self._report_capture_latency("persistent stream")
+            self._recording_thread = threading.Thread(target=self._partials_loop)
+            self._recording_thread.start()
+            return
+
+        self._buffer = buffer
+        self._is_recording = True
         self._recording_thread = threading.Thread(target=self._record_audio_loop)
         self._recording_thread.start()
 
@@ -43,41 +144,177 @@ class AudioRecorder:
         """Event handler to stop the current recording."""
         if not self._is_recording:
             return
-        
+
         print("Stopping recording...")
-        self._is_recording = False # Signal the thread to stop
-        self._recording_thread.join() # Wait for the thread to finish
-        print("Recording thread finished.")
+        metrics.end(self._trace_id, "recording")
+        metrics.begin(self._trace_id, "buffering")
+        # Closed by the output service once the text is inserted
+        metrics.begin(self._trace_id, "release_to_output")
+        with self._lock:
+            self._is_recording = False # Signal the thread to stop
+        if self._recording_thread is not None:
+            self._recording_thread.join() # Wait for the thread to finish
+            self._recording_thread = None
+            print("Recording thread finished.")
+        self._report_preprocessing()
+
+        metrics.annotate(self._trace_id, audio_seconds=len(self._buffer) / settings.audio.samplerate,
+                         spilled=self._buffer.spilled)
+        metrics.end(self._trace_id, "buffering")
+        if isinstance(self._buffer, ChunkedRecording):
+            self._publish_final_chunk()
+        elif len(self._buffer):
+            # Zero-copy view; a new buffer is allocated for the next recording
+            metrics.begin(self._trace_id, "dispatch")
+            event_bus.publish(AudioChunkReady(audio_data=self._buffer.view(), trace_id=self._trace_id,
+                                              language=self._input_language))
+        else:
+            metrics.finish(self._trace_id)
+
+        self._buffer = None
 
-        if self._recorded_audio:
-            audio_data = np.concatenate(self._recorded_audio, axis=0)
-            event_bus.publish(AudioChunkReady(audio_data=audio_data))
-        
-        self._recorded_audio = []
+    def _handle_cancel(self, event: CancelRequested):
+        """Stops the current recording and discards its audio."""
+        if not self._is_recording:
+            return
+
+        print("Recording cancelled.")
+        with self._lock:
+            self._is_recording = False
+        if self._recording_thread is not None:
+            self._recording_thread.join()
+            self._recording_thread = None
+        self._report_preprocessing()
+        self._buffer = None
+        metrics.annotate(self._trace_id, cancelled="abort hotkey")
+        metrics.finish(self._trace_id)
+
+    def _new_buffer(self):
+        """Creates the int16 buffer for a new recording."""
+        if settings.long_form.enabled:
+            config = settings.long_form
+            return ChunkedRecording(
+                settings.audio.samplerate,
+                chunk_seconds=config.chunk_seconds,
+                search_seconds=config.search_seconds,
+                overlap_seconds=config.overlap_seconds,
+                frame_ms=settings.audio.vad_frame_ms
+            )
+        return RecordingBuffer(
+            settings.audio.samplerate,
+            initial_seconds=settings.audio.buffer_seconds,
+            spill_bytes=int(settings.audio.spill_after_mb * 1024 * 1024),
+            spill_dir=settings.audio.spill_dir
+        )
+
+    def _preroll_samples(self) -> int:
+        return int(settings.audio.samplerate * settings.audio.preroll_ms / 1000)
+
+    def _report_capture_latency(self, mode: str):
+        """Logs the time from the start request to the first captured audio."""
+        metrics.end(self._trace_id, "capture_start")
+        latency_ms = (time.monotonic() - self._start_requested_at) * 1000
+        print(f"Capture start latency: {latency_ms:.1f} ms ({mode})")
+
+    def _report_preprocessing(self):
+        """Logs the preprocessing cost per second of captured audio since the last report."""
+        preprocessor = self._preprocessor
+        if preprocessor is None:
+            return
+        busy, audio = preprocessor.take_cost()
+        if audio <= 0:
+            return
+        cost_ms = busy / audio * 1000
+        metrics.annotate(self._trace_id, preprocess_ms_per_s=round(cost_ms, 3))
+        print(f"Preprocessing: {cost_ms:.2f} ms per second of audio "
+              f"({preprocessor.in_rate} Hz → {preprocessor.out_rate} Hz)")
 
     def _record_audio_loop(self):
         """The main loop for the recording thread."""
-        def callback(indata, frames, time, status):
+        first_block = True
+        preprocessor = None
+
+        def callback(indata, frames, time_info, status):
+            nonlocal first_block
             if status:
                 print(f"Audio callback status: {status}")
             if self._is_recording:
-                self._recorded_audio.append(indata.copy())
+                if first_block:
+                    first_block = False
+                    self._report_capture_latency("per-recording stream")
+                self._buffer.append(indata if preprocessor is None else preprocessor.process(indata))
 
         try:
+            sd = timed_import("sounddevice")
+            # A fresh preprocessor per recording: no filter state carries over from the last one
+            samplerate, channels, dtype, preprocessor = self._capture_format(sd)
+            self._preprocessor = preprocessor
             with sd.InputStream(
-                samplerate=settings.audio.samplerate, 
-                channels=1, 
+                samplerate=samplerate,
+                channels=channels,
+                dtype=dtype,
                 callback=callback
             ):
-                while self._is_recording:
-                    sd.sleep(100)
+                self._partials_loop()
         except Exception as e:
             print(f"Error during audio recording: {e}")
 
+    def _partials_loop(self):
+        """
+        Waits while recording, growing the buffer ahead of capture and
+        publishing long-form chunks or streaming partial windows.
+        """
+        last_partial = time.monotonic()
+        headroom = int(settings.audio.samplerate * RESERVE_SECONDS)
+        while self._is_recording:
+            time.sleep(0.1)
+            if isinstance(self._buffer, ChunkedRecording):
+                chunk = self._buffer.next_chunk()
+                if chunk is not None:
+                    print(f"Long-form: chunk {chunk.index} cut at {chunk.keep_until:.1f}s")
+                    self._publish_chunk(chunk)
+                continue
+            self._buffer.reserve(headroom)
+            if settings.audio.streaming and time.monotonic() - last_partial >= settings.audio.partial_interval:
+                last_partial = time.monotonic()
+                self._publish_partial()
+
+    def _publish_partial(self):
+        """Publishes the audio recorded so far for incremental transcription."""
+        buffer = self._buffer
+        if buffer is not None and len(buffer) and self._is_recording:
+            event_bus.publish(AudioPartialReady(audio_data=buffer.view(), trace_id=self._trace_id,
+                                                language=self._input_language))
+
+    def _publish_final_chunk(self):
+        """Publishes what was recorded after the last long-form cut."""
+        chunk = self._buffer.flush()
+        if chunk is None:
+            metrics.finish(self._trace_id)
+            return
+        metrics.begin(self._trace_id, "dispatch")
+        self._publish_chunk(chunk)
+
+    def _publish_chunk(self, chunk: Chunk):
+        event_bus.publish(LongFormChunkReady(
+            audio_data=chunk.audio,
+            index=chunk.index,
+            start=chunk.start,
+            keep_from=chunk.keep_from,
+            keep_until=chunk.keep_until,
+            final=chunk.final,
+            trace_id=self._trace_id,
+            language=self._input_language
+        ))
+
     def stop(self, event: AppShutdown = None):
         """Stops the recording service."""
         if self._is_recording:
             self._is_recording = False
             if self._recording_thread and self._recording_thread.is_alive():
                 self._recording_thread.join()
-        print("Audio recorder shut down.") 
\ No newline at end of file
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        print("Audio recorder shut down.")
@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from whisper_flow.config.settings import AudioSettings
+
+
+@dataclass
+class VadResult:
+    """Outcome of trimming one recording."""
+    audio: np.ndarray
+    has_speech: bool
+    seconds_saved: float
+
+
+def _frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS energy in dBFS of consecutive frames, computed in one vectorized pass."""
+    n_frames = audio.shape[0] // frame
+    frames = audio[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    if audio.dtype == np.int16:
+        frames /= 32768.0
+    power = np.einsum("ij,ij->i", frames, frames) / frame
+    return 10.0 * np.log10(power + 1e-12)
+
+
+def _squeeze_pauses(speech: np.ndarray, max_pause: int) -> np.ndarray:
+    """Frame mask that keeps speech and at most `max_pause` frames of every pause."""
+    # Label runs of equal values and find each frame's position inside its run
+    change = np.flatnonzero(np.diff(speech.astype(np.int8))) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [speech.shape[0]])))
+    run_id = np.repeat(np.arange(starts.shape[0]), lengths)
+    position = np.arange(speech.shape[0]) - starts[run_id]
+    run_length = lengths[run_id]
+
+    head = max_pause // 2
+    tail = max_pause - head
+    return (
+        speech
+        | (run_length <= max_pause)
+        | (position < head)
+        | (position >= run_length - tail)
+    )
+
+
+def trim_silence(audio: np.ndarray, samplerate: int, config: AudioSettings) -> VadResult:
+    """
+    Cuts leading/trailing silence and shortens long internal pauses.
+
+    Frames are classified as speech when their energy is above both the absolute
+    threshold and, if the recording has any dynamic range, its noise floor plus a
+    margin. Returns the input unchanged when it is shorter than one frame, and
+    an empty array when no speech is found.
+    """
+    audio = audio.reshape(-1)
+    frame = max(int(samplerate * config.vad_frame_ms / 1000), 1)
+    energy = _frame_energy_db(audio, frame)
+    if energy.shape[0] == 0:
+        return VadResult(audio=audio, has_speech=True, seconds_saved=0.0)
+
+    noise_floor, loud = np.percentile(energy, [10, 90])
+    threshold = config.vad_threshold_db
+    if loud - noise_floor >= config.vad_noise_margin_db:
+        threshold = max(threshold, noise_floor + config.vad_noise_margin_db)
+    # Otherwise the level is uniform (all speech or all silence): absolute threshold only
+    speech = energy > threshold
+
+    min_speech = int(config.vad_min_speech_ms / config.vad_frame_ms)
+    if np.count_nonzero(speech) < max(min_speech, 1):
+        return VadResult(audio=audio[:0], has_speech=False, seconds_saved=audio.shape[0] / samplerate)
+
+    # Pad speech regions so word onsets and endings are not clipped
+    pad = int(config.vad_padding_ms / config.vad_frame_ms)
+    if pad > 0:
+        speech = np.convolve(speech, np.ones(2 * pad + 1, dtype=bool), mode="same") > 0
+
+    voiced = np.flatnonzero(speech)
+    first, last = voiced[0], voiced[-1] + 1
+    start = first * frame
+    # The partial frame at the end belongs to the last frame's decision
+    end = audio.shape[0] if last == speech.shape[0] else last * frame
+
+    keep = _squeeze_pauses(speech[first:last], int(config.vad_max_pause_ms / config.vad_frame_ms))
+    if keep.all():
+        # Only the edges were cut: a view is enough
+        trimmed = audio[start:end]
+    else:
+        sample_keep = np.repeat(keep, frame)
+        trimmed = audio[start:start + sample_keep.shape[0]][sample_keep]
+        if end > start + sample_keep.shape[0]:
+            trimmed = np.concatenate((trimmed, audio[start + sample_keep.shape[0]:end]))
+
+    return VadResult(
+        audio=trimmed,
+        has_speech=True,
+        seconds_saved=(audio.shape[0] - trimmed.shape[0]) / samplerate
+    )
+
+
+def quietest_point(audio: np.ndarray, samplerate: int, frame_ms: int, span_ms: int = 150) -> int:
+    """
+    Sample index in the middle of the quietest `span_ms` stretch of `audio`.
+
+    Energy is averaged over the span so a sustained pause wins over a single
+    quiet frame between syllables. Returns the midpoint when `audio` is
+    shorter than the span.
+    """
+    audio = audio.reshape(-1)
+    frame = max(int(samplerate * frame_ms / 1000), 1)
+    energy = _frame_energy_db(audio, frame)
+    span = max(span_ms // frame_ms, 1)
+    if energy.shape[0] < span:
+        return audio.shape[0] // 2
+    smoothed = np.convolve(energy, np.ones(span) / span, mode="valid")
+    best = int(np.argmin(smoothed))
+    return (best * frame) + (span * frame) // 2
@@ -0,0 +1,13 @@
+class KeyActivityClock:
+    """
+    When a key was last pressed anywhere on the system.
+
+    The hotkey listener stores a timestamp on every keystroke; readers (the
+    output service, before editing a draft in place) only compare it. A
+    float attribute is written and read atomically, so there is no lock and
+    no event per keystroke.
+    """
+    def __init__(self):
+        self.last_key_at = 0.0
+
+key_activity = KeyActivityClock()
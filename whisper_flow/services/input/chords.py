@@ -0,0 +1,52 @@
+from typing import Dict, Hashable, Iterable, Optional
+
+
+class ChordMatcher:
+    """
+    Matches held keys against named chords compiled to integer bitmasks.
+
+    Every key used by some chord gets one bit and the held keys are one
+    integer. A key outside all chords costs a single dict miss, or only a type
+    check when no chord uses a key of its type (pynput hashes character keys
+    through repr(), so plain typing skips that entirely). A chord key costs
+    one OR plus one mask test per chord. A chord fires on the press that
+    completes it, so Cmd+Esc fires while Ctrl+Cmd is already held. Larger
+    chords are tested first, so Shift+Ctrl+Cmd wins over Ctrl+Cmd when one
+    press completes both.
+    """
+    def __init__(self, chords: Dict[str, Iterable[Hashable]]):
+        self._bits: Dict[Hashable, int] = {}
+        compiled = []
+        for name, keys in chords.items():
+            mask = 0
+            for key in keys:
+                mask |= self._bits.setdefault(key, 1 << len(self._bits))
+            if mask:
+                compiled.append((mask, name))
+        compiled.sort(key=lambda chord: bin(chord[0]).count("1"), reverse=True)
+        self._chords = tuple(compiled)
+        self._types = frozenset(type(key) for key in self._bits)
+        self._held = 0
+
+    def press(self, key: Hashable) -> Optional[str]:
+        """Records a press; returns the name of the chord it completes, if any."""
+        if type(key) not in self._types:
+            return None
+        bit = self._bits.get(key)
+        if bit is None:
+            return None
+        held = self._held = self._held | bit
+        for mask, name in self._chords:
+            if mask & bit and held & mask == mask:
+                return name
+        return None
+
+    def release(self, key: Hashable) -> bool:
+        """Records a release; returns whether the key belongs to any chord."""
+        if type(key) not in self._types:
+            return False
+        bit = self._bits.get(key)
+        if bit is None:
+            return False
+        self._held &= ~bit
+        return True
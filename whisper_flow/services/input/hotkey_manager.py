@@ -1,57 +1,91 @@
+import time
 from pynput import keyboard
-from typing import Set
-from whisper_flow.config.settings import settings
+from typing import Dict, List, Optional
+from whisper_flow.config.settings import HotkeyBinding, hotkey_bindings, settings
 from whisper_flow.core.event_bus import event_bus
-from whisper_flow.core.events import RecordingStartRequested, RecordingStopRequested
+from whisper_flow.core.events import (
+    CancelRequested, RecordingStartRequested, RecordingStopRequested, SettingsChanged
+)
+from whisper_flow.core.metrics import metrics, new_trace_id
+from whisper_flow.services.input.activity import key_activity
+from whisper_flow.services.input.chords import ChordMatcher
 
 class HotkeyManager:
     """Listens for global hotkeys and publishes events."""
     def __init__(self):
-        self._pressed_keys: Set[keyboard.Key] = set()
         self._is_recording = False
+        self._trace_id = ""
         self._listener = keyboard.Listener(on_press=self._on_press, on_release=self._on_release)
-        
-        # Convert string hotkeys from config to pynput Key objects
-        self._hotkey_ru = self._parse_hotkey(settings.hotkeys.ru)
-        self._hotkey_en = self._parse_hotkey(settings.hotkeys.en)
-        self._all_hotkey_keys = self._hotkey_ru | self._hotkey_en
+        self._load_hotkeys()
+        event_bus.subscribe(SettingsChanged, self._on_settings_changed)
 
-    def _parse_hotkey(self, key_strings: list[str]) -> Set[keyboard.Key]:
-        """Converts a list of key strings from config into a set of pynput Key objects."""
-        keys = set()
+    def _load_hotkeys(self):
+        """Compiles the configured bindings into a chord matcher."""
+        bindings: Dict[str, HotkeyBinding] = {}
+        chords = {}
+        for name, binding in hotkey_bindings(settings.hotkeys).items():
+            keys = self._parse_hotkey(binding.keys)
+            if keys is None:
+                print(f"Hotkey '{name}' skipped: unknown key in {binding.keys}")
+                continue
+            bindings[name] = binding
+            chords[name] = keys
+        # Swapped in as a whole; the listener thread reads them without locking
+        self._bindings = bindings
+        self._matcher = ChordMatcher(chords)
+
+    def _on_settings_changed(self, event: SettingsChanged):
+        """Applies edited hotkeys without restarting the listener."""
+        if any(name.startswith("hotkeys.") for name in event.changed):
+            self._load_hotkeys()
+            print(f"Hotkeys updated: {', '.join(self._bindings)}.")
+
+    @staticmethod
+    def _parse_hotkey(key_strings: List[str]) -> Optional[list]:
+        """Converts key strings from config ("Key.ctrl", "v") to pynput keys; None if one is unknown."""
+        keys = []
         for key_str in key_strings:
-            try:
-                # e.g., "Key.ctrl" -> keyboard.Key.ctrl
-                keys.add(eval(f"keyboard.{key_str}"))
-            except (AttributeError, SyntaxError):
+            if key_str.startswith("Key."):
+                key = getattr(keyboard.Key, key_str[4:], None)
+            elif len(key_str) == 1:
                 # For regular character keys like 'v'
-                keys.add(keyboard.KeyCode.from_char(key_str))
+                key = keyboard.KeyCode.from_char(key_str)
+            else:
+                key = None
+            if key is None:
+                return None
+            keys.append(key)
         return keys
 
     def _on_press(self, key):
-        """Handles key press events."""
-        self._pressed_keys.add(key)
-        
-        if not self._is_recording:
-            lang = None
-            if self._hotkey_en.issubset(self._pressed_keys):
-                lang = 'en'
-            elif self._hotkey_ru.issubset(self._pressed_keys):
-                lang = 'ru'
-            
-            if lang:
-                self._is_recording = True
-                event_bus.publish(RecordingStartRequested(language=lang))
+        """Handles key press events; runs on the listener thread for every keystroke."""
+        # Lets the output service see typing that would make replacing a draft unsafe
+        key_activity.last_key_at = time.monotonic()
+        name = self._matcher.press(key)
+        if name is None:
+            return
+        binding = self._bindings[name]
+        if binding.action == "cancel":
+            # The dictation keys may still be held; their release must not stop (and send) the recording
+            self._is_recording = False
+            event_bus.publish(CancelRequested())
+            return
+        if self._is_recording:
+            return
+
+        self._is_recording = True
+        self._trace_id = new_trace_id()
+        # Timed from the key press until the first captured audio
+        metrics.start(self._trace_id)
+        metrics.begin(self._trace_id, "capture_start")
+        event_bus.publish(RecordingStartRequested(language=binding.language, trace_id=self._trace_id))
 
     def _on_release(self, key):
         """Handles key release events."""
-        if self._is_recording and key in self._all_hotkey_keys:
+        if self._matcher.release(key) and self._is_recording:
             self._is_recording = False
             # The language doesn't matter on stop, but we pass it for consistency
-            event_bus.publish(RecordingStopRequested(language='any'))
-
-        if key in self._pressed_keys:
-            self._pressed_keys.remove(key)
+            event_bus.publish(RecordingStopRequested(language='any', trace_id=self._trace_id))
 
     def start(self):
         """Starts the hotkey listener."""
@@ -62,7 +96,7 @@ class HotkeyManager:
         """Stops the hotkey listener."""
         print("Stopping hotkey listener...")
         self._listener.stop()
-        
+
     def join(self):
         """Waits for the listener thread to complete."""
-        self._listener.join() 
\ No newline at end of file
+        self._listener.join()
@@ -0,0 +1,46 @@
+from typing import List, Union
+
+from whisper_flow.config.settings import settings
+from whisper_flow.core.event_bus import event_bus
+from whisper_flow.core.events import (
+    RecordingStartRequested,
+    RecordingStopRequested,
+    CancelRequested,
+    AppShutdown
+)
+from whisper_flow.services.integration.mpris import MprisControl
+
+class MediaService:
+    """Pauses playing media players while recording and resumes them afterwards."""
+    def __init__(self):
+        self._control = MprisControl(
+            players=settings.media.players,
+            bus_address=settings.media.bus_address
+        )
+        self._paused_players: List[str] = []
+        if settings.media.enabled:
+            self._control.start()
+            self._setup_subscriptions()
+
+    def _setup_subscriptions(self):
+        event_bus.subscribe(RecordingStartRequested, self._on_recording_start)
+        event_bus.subscribe(RecordingStopRequested, self._on_recording_stop)
+        event_bus.subscribe(CancelRequested, self._on_recording_stop)
+        event_bus.subscribe(AppShutdown, self._on_shutdown)
+
+    def _on_recording_start(self, event: RecordingStartRequested):
+        """Pauses every player that is currently playing (cached state, no DBus round-trip)."""
+        self._paused_players = self._control.playing_players()
+        if self._paused_players:
+            self._control.pause(self._paused_players)
+            print(f"Paused media: {', '.join(self._paused_players)}")
+
+    def _on_recording_stop(self, event: Union[RecordingStopRequested, CancelRequested]):
+        """Resumes the players paused for this recording."""
+        if self._paused_players:
+            self._control.play(self._paused_players)
+            print(f"Resumed media: {', '.join(self._paused_players)}")
+        self._paused_players = []
+
+    def _on_shutdown(self, event: AppShutdown):
+        self._control.stop()
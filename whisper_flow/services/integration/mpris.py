@@ -0,0 +1,148 @@
+import threading
+from typing import Dict, List, Optional
+
+from whisper_flow.utils.lazy_import import timed_import
+
+MPRIS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_PATH = "/org/mpris/MediaPlayer2"
+PLAYER_INTERFACE = "org.mpris.MediaPlayer2.Player"
+
+
+class MprisControl:
+    """
+    Tracks and controls every MPRIS media player on the session bus.
+
+    A GLib main loop on its own thread keeps one cached proxy per player and
+    updates the playback state from PropertiesChanged signals, so reading the
+    state is a memory lookup. Pause/play requests are queued onto the loop
+    thread and return immediately.
+    """
+    def __init__(self, players: Optional[List[str]] = None, bus_address: Optional[str] = None):
+        # Short names like "spotify"; empty means any MPRIS player
+        self._allowed = set(players or [])
+        self._bus_address = bus_address
+        self._proxies: Dict[str, object] = {}
+        self._status: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._glib = None
+        self._bus = None
+        self._loop = None
+        self._thread: threading.Thread = None
+
+    def start(self):
+        """Starts the GLib loop thread that connects to the bus and watches players."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name="mpris", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the GLib loop thread."""
+        if self._loop is not None:
+            self._loop.quit()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Waits until the initial player scan has finished."""
+        return self._ready.wait(timeout)
+
+    def playing_players(self) -> List[str]:
+        """Returns the bus names of players currently reported as playing."""
+        with self._lock:
+            return [name for name, status in self._status.items() if status == "Playing"]
+
+    def is_playing(self) -> bool:
+        """Checks if any tracked player is playing."""
+        return bool(self.playing_players())
+
+    def pause(self, players: List[str]):
+        """Pauses the given players without waiting for the DBus calls."""
+        self._call_async(players, "Pause")
+
+    def play(self, players: List[str]):
+        """Resumes the given players without waiting for the DBus calls."""
+        self._call_async(players, "Play")
+
+    # --- Loop thread ---
+
+    def _run_loop(self):
+        try:
+            pydbus = timed_import("pydbus")
+            self._glib = timed_import("gi.repository.GLib")
+            bus = pydbus.connect(self._bus_address) if self._bus_address else pydbus.SessionBus()
+            self._bus = bus
+            dbus = bus.get(".DBus")
+            dbus.NameOwnerChanged.connect(self._on_name_owner_changed)
+            for name in dbus.ListNames():
+                self._add_player(name)
+            self._loop = self._glib.MainLoop()
+        except Exception as e:
+            print(f"Info: Media control unavailable, could not connect to DBus: {e}")
+            return
+        finally:
+            self._ready.set()
+
+        print(f"Media control watching {len(self._proxies)} MPRIS player(s).")
+        self._loop.run()
+
+    def _is_tracked(self, name: str) -> bool:
+        if not name.startswith(MPRIS_PREFIX):
+            return False
+        short = name[len(MPRIS_PREFIX):].split(".")[0]
+        return not self._allowed or short in self._allowed
+
+    def _add_player(self, name: str):
+        """Caches a proxy for a player and subscribes to its property changes."""
+        if not self._is_tracked(name) or name in self._proxies:
+            return
+        try:
+            proxy = self._bus.get(name, MPRIS_PATH)
+            proxy.PropertiesChanged.connect(
+                lambda interface, changed, invalidated: self._on_properties_changed(name, interface, changed)
+            )
+            self._proxies[name] = proxy
+            self._set_status(name, proxy.PlaybackStatus)
+        except Exception as e:
+            print(f"Could not attach to media player {name}: {e}")
+
+    def _remove_player(self, name: str):
+        self._proxies.pop(name, None)
+        with self._lock:
+            self._status.pop(name, None)
+
+    def _on_name_owner_changed(self, name: str, old_owner: str, new_owner: str):
+        if not self._is_tracked(name):
+            return
+        if new_owner:
+            self._add_player(name)
+        else:
+            self._remove_player(name)
+
+    def _on_properties_changed(self, name: str, interface: str, changed: dict):
+        if interface == PLAYER_INTERFACE and "PlaybackStatus" in changed:
+            self._set_status(name, changed["PlaybackStatus"])
+
+    def _set_status(self, name: str, status: str):
+        with self._lock:
+            self._status[name] = status
+
+    def _call_async(self, players: List[str], method: str):
+        """Queues player method calls onto the loop thread."""
+        if not players or self._glib is None or self._loop is None:
+            return
+
+        def invoke():
+            for name in players:
+                proxy = self._proxies.get(name)
+                if proxy is None:
+                    continue
+                try:
+                    getattr(proxy, method)()
+                except Exception as e:
+                    print(f"Error calling {method} on {name}: {e}")
+            return False  # Run once
+
+        self._glib.idle_add(invoke)
@@ -1,9 +1,88 @@
-import pyperclip
+import threading
+from typing import Callable, Optional
 
-def copy_to_clipboard(text: str):
-    """Copies text to the system clipboard."""
+from whisper_flow.config.settings import settings
+from whisper_flow.utils.lazy_import import timed_import
+
+def _write(text: str) -> bool:
+    pyperclip = timed_import("pyperclip")
     try:
         pyperclip.copy(text)
-        print("Text copied to clipboard.")
+        return True
+    except pyperclip.PyperclipException as e:
+        print(f"Error copying to clipboard: {e}")
+        return False
+
+def read_clipboard() -> Optional[str]:
+    """Returns the text on the clipboard ("" if it holds none); None if it cannot be read."""
+    pyperclip = timed_import("pyperclip")
+    try:
+        return pyperclip.paste()
     except pyperclip.PyperclipException as e:
-        print(f"Error copying to clipboard: {e}") 
\ No newline at end of file
+        print(f"Error reading the clipboard: {e}")
+        return None
+
+def copy_to_clipboard(text: str) -> bool:
+    """Copies text to the system clipboard, where it stays. Returns True on success."""
+    clipboard_keeper.forget()
+    if not _write(text):
+        return False
+    print("Text copied to clipboard.")
+    return True
+
+class ClipboardKeeper:
+    """
+    Lends the clipboard to paste insertion and gives it back afterwards.
+
+    The user's text is read before the first paste and written back once
+    pastes have stopped for `output.clipboard_restore_delay` seconds, giving
+    the target window time to fetch the pasted text. Pastes in quick
+    succession (segments of one utterance) share one save and one restore.
+    Nothing is restored if something else was copied in the meantime, or if
+    the clipboard held no text (an image cannot be read back through it).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._saved: Optional[str] = None
+        self._pasted: Optional[str] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def hold(self, text: str, write: Callable[[str], bool] = _write) -> bool:
+        """Saves the user's clipboard unless a restore is already pending, then puts `text` on it."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            elif settings.output.restore_clipboard:
+                self._saved = read_clipboard()
+            self._pasted = text
+            return write(text)
+
+    def release(self):
+        """The paste was sent: schedules the restore."""
+        with self._lock:
+            if not self._saved:
+                self._saved = self._pasted = None
+                return
+            self._timer = threading.Timer(settings.output.clipboard_restore_delay, self._restore)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def forget(self):
+        """Drops a pending restore, leaving whatever is on the clipboard now."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer, self._saved, self._pasted = None, None, None
+
+    def _restore(self):
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return  # Another paste took the clipboard while this restore waited for the lock
+            saved, pasted = self._saved, self._pasted
+            self._timer, self._saved, self._pasted = None, None, None
+            if saved is None or read_clipboard() != pasted:
+                return
+            _write(saved)
+
+clipboard_keeper = ClipboardKeeper()
@@ -1,27 +1,154 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from whisper_flow.config.settings import settings
 from whisper_flow.core.event_bus import event_bus
-from whisper_flow.core.events import TranscriptionReady
+from whisper_flow.core.events import TranscriptionReady, TranscriptionRefined, TranscriptionSegment
+from whisper_flow.core.metrics import metrics
+from whisper_flow.services.input.activity import key_activity
 from whisper_flow.services.output.clipboard import copy_to_clipboard
 from whisper_flow.services.output.text_inserter import get_text_inserter
 
+# Key presses this soon after an insertion are our own synthetic keystrokes
+SYNTHETIC_KEYS_GRACE = 0.3
+
+@dataclass
+class _Draft:
+    """A draft inserted while its refinement is pending."""
+    trace_id: str
+    text: str
+    window: Optional[str]
+    inserted_at: float
+
+@dataclass
+class _Stream:
+    """Segments of one utterance inserted so far."""
+    trace_id: str
+    text: str = ""
+    # A segment failed to insert: later ones are held back, the whole text goes to the clipboard
+    failed: bool = False
+
 class OutputService:
     """Handles the final output of the transcribed text."""
     def __init__(self):
         self._text_inserter = get_text_inserter()
+        self._draft: Optional[_Draft] = None
+        self._stream: Optional[_Stream] = None
         self._setup_subscriptions()
 
     def _setup_subscriptions(self):
         """Subscribes to relevant events."""
         event_bus.subscribe(TranscriptionReady, self.on_transcription_ready)
+        event_bus.subscribe(TranscriptionRefined, self.on_transcription_refined)
+        event_bus.subscribe(TranscriptionSegment, self.on_transcription_segment)
 
     def on_transcription_ready(self, event: TranscriptionReady):
         """Handles the transcribed text by pasting it or copying to clipboard as fallback."""
         if not event.text:
+            if not event.partial:
+                # End of a long-form dictation whose last chunk had no speech
+                metrics.end(event.trace_id, "release_to_output")
+                metrics.finish(event.trace_id)
+            return
+        if event.streamed and self._finish_stream(event):
             return
-        
+
         # Step 1: Try to insert text into input field first
-        success = self._text_inserter.insert(event.text)
-        
+        with metrics.stage(event.trace_id, "insertion"):
+            success = self._text_inserter.insert(event.text)
+
         # Step 2: If insertion failed, copy to clipboard as fallback
         if not success:
             print("Text insertion failed, copying to clipboard as fallback.")
-            copy_to_clipboard(event.text) 
\ No newline at end of file
+            copy_to_clipboard(event.text)
+
+        if event.partial:
+            return
+        metrics.end(event.trace_id, "release_to_output")
+        metrics.annotate(event.trace_id, chars=len(event.text), inserted=success,
+                         inserter=self._text_inserter.name)
+        if event.final:
+            metrics.finish(event.trace_id)
+            return
+        # A draft: remember where it went so the refinement can replace it
+        self._draft = _Draft(event.trace_id, event.text, self._text_inserter.target_window(),
+                             time.monotonic()) if success else None
+        if self._draft is not None:
+            metrics.begin(event.trace_id, "refinement")
+
+    def on_transcription_segment(self, event: TranscriptionSegment):
+        """Inserts one segment right after the previous segments of the same utterance."""
+        stream = self._stream
+        if stream is None or stream.trace_id != event.trace_id:
+            # A stream left unfinished by a failed decode is dropped here
+            stream = self._stream = _Stream(event.trace_id)
+        if stream.failed:
+            return
+        with metrics.stage(event.trace_id, "insertion"):
+            success = self._text_inserter.insert(event.text)
+        if not success:
+            print("Segment insertion failed; the text will be copied to the clipboard when complete.")
+            stream.failed = True
+            return
+        stream.text += event.text
+        metrics.end(event.trace_id, "first_segment")
+
+    def _finish_stream(self, event: TranscriptionReady) -> bool:
+        """Completes an utterance inserted segment by segment; False if none of it was inserted."""
+        stream, self._stream = self._stream, None
+        if stream is None or stream.trace_id != event.trace_id or not (stream.text or stream.failed):
+            return False
+        if stream.failed:
+            copy_to_clipboard(event.text)
+        elif event.text.startswith(stream.text) and len(event.text) > len(stream.text):
+            self._text_inserter.insert(event.text[len(stream.text):])
+        metrics.end(event.trace_id, "release_to_output")
+        metrics.annotate(event.trace_id, chars=len(event.text), inserted=not stream.failed,
+                         inserter=self._text_inserter.name)
+        metrics.finish(event.trace_id)
+        return True
+
+    def on_transcription_refined(self, event: TranscriptionRefined):
+        """Replaces the inserted draft with the refined text when that is still safe."""
+        draft, self._draft = self._draft, None
+        metrics.end(event.trace_id, "refinement")
+        try:
+            if not event.text or event.text == event.draft:
+                print("Refinement matches the draft.")
+                return
+            reason = self._replace_blocker(draft, event)
+            if reason:
+                print(f"Refined text not applied in place ({reason}); copied to the clipboard.")
+                copy_to_clipboard(event.text)
+                return
+            with metrics.stage(event.trace_id, "replacement"):
+                replaced = self._replace(event.draft, event.text)
+            if not replaced:
+                print("Replacing the draft failed; refined text copied to the clipboard.")
+                copy_to_clipboard(event.text)
+        finally:
+            metrics.annotate(event.trace_id, refined_changed=event.text != event.draft)
+            metrics.finish(event.trace_id)
+
+    def _replace_blocker(self, draft: Optional[_Draft], event: TranscriptionRefined) -> Optional[str]:
+        """Why the draft cannot be edited in place, or None if it can."""
+        if draft is None or draft.trace_id != event.trace_id:
+            return "the draft was not inserted"
+        if time.monotonic() - draft.inserted_at > settings.draft.replace_timeout:
+            return "too late"
+        if key_activity.last_key_at > draft.inserted_at + SYNTHETIC_KEYS_GRACE:
+            return "typing since the draft"
+        if self._text_inserter.target_window() != draft.window:
+            return "focus changed"
+        return None
+
+    def _replace(self, old: str, new: str) -> bool:
+        """Edits the text before the cursor from `old` to `new`, retyping only past their common prefix."""
+        keep = len(os.path.commonprefix([old, new]))
+        delete = len(old) - keep
+        print(f"Replacing draft: {delete} chars deleted, {len(new) - keep} inserted.")
+        if delete and not self._text_inserter.delete_chars(delete):
+            return False
+        return not new[keep:] or self._text_inserter.insert(new[keep:])
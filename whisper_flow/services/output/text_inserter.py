@@ -1,77 +1,307 @@
 from abc import ABC, abstractmethod
 import subprocess
 import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
 from whisper_flow.config.settings import settings
+from whisper_flow.services.output.clipboard import clipboard_keeper
+from whisper_flow.services.output.xtest import XTestConnection
+
+# Typing is only tried out on texts up to this long, so a long dictation is never typed just to time it
+PROBE_CHARS = 80
+# Every this many insertions into a window, the strategy measured longest ago goes first again
+REPROBE_EVERY = 20
 
 class TextInsertionStrategy(ABC):
     """Abstract base class for text insertion strategies."""
+    name = "base"
+    # Whether the latency grows with the text length (typing) or is about fixed (paste)
+    per_char = False
+
     @abstractmethod
     def insert(self, text: str) -> bool:
         pass
 
+    def delete_chars(self, count: int) -> bool:
+        """Deletes `count` characters before the cursor; False if unsupported or failed."""
+        return False
+
+    def target_window(self) -> Optional[str]:
+        """Names the window text would go to; None when it cannot be determined."""
+        return None
+
+def _chunks(text: str, size: int) -> List[str]:
+    """Splits text into chunks of about `size` characters, preferring whitespace boundaries."""
+    chunks = []
+    while len(text) > size:
+        cut = text.rfind(" ", 0, size)
+        cut = cut + 1 if cut > 0 else size
+        chunks.append(text[:cut])
+        text = text[cut:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+def _typing_timeout(chunk: str) -> float:
+    """Timeout for typing a chunk, growing with its length."""
+    return settings.output.paste_tool_timeout + len(chunk) * settings.output.type_seconds_per_char
+
+def _type_chunked(command: List[str], text: str, tool: str) -> bool:
+    """Types text in chunks, feeding each chunk to the tool's stdin."""
+    try:
+        for chunk in _chunks(text, settings.output.type_chunk_chars):
+            subprocess.run(command, input=chunk, text=True, check=True, timeout=_typing_timeout(chunk))
+        print(f"Text typed using {tool}.")
+        return True
+    except FileNotFoundError:
+        print(f"Text insertion failed: '{tool}' not found.")
+        return False
+    except subprocess.TimeoutExpired:
+        print(f"Text insertion timed out ({tool} may be unresponsive).")
+        return False
+    except Exception as e:
+        print(f"An error occurred while typing with {tool}: {e}")
+        return False
+
+def _run_tool(command: List[str], timeout: float, action: str) -> bool:
+    """Runs a key-sending tool, reporting failures like the insertion paths do."""
+    try:
+        subprocess.run(command, check=True, timeout=timeout)
+        return True
+    except FileNotFoundError:
+        print(f"{action} failed: '{command[0]}' not found.")
+    except subprocess.TimeoutExpired:
+        print(f"{action} timed out ({command[0]} may be unresponsive).")
+    except Exception as e:
+        print(f"An error occurred during {action.lower()} with {command[0]}: {e}")
+    return False
+
+def _backspace_timeout(count: int) -> float:
+    return settings.output.paste_tool_timeout + count * settings.output.type_seconds_per_char
+
 class X11TextInserter(TextInsertionStrategy):
-    """Uses xdotool to type text directly in X11."""
-    
+    """Uses xdotool to type text directly in X11, in chunks."""
+    name = "xdotool-type"
+    per_char = True
+
     def insert(self, text: str) -> bool:
-        try:
-            # Find the active window first
-            window_id_proc = subprocess.run(
-                ["xdotool", "getactivewindow"],
-                capture_output=True, text=True, check=True,
-                timeout=settings.output.paste_tool_timeout
-            )
-            window_id = window_id_proc.stdout.strip()
-
-            if window_id:
-                print(f"Found active window {window_id}. Typing text directly.")
-                # Type text directly using xdotool
-                subprocess.run(
-                    ["xdotool", "type", text],
-                    check=True,
-                    timeout=settings.output.paste_tool_timeout
-                )
-                print("Text typed successfully.")
-                return True
-            else:
-                print("No active window found to type into.")
-                return False
-        except FileNotFoundError:
-            print("Text insertion failed: 'xdotool' not found.")
+        command = ["xdotool", "type", "--delay", str(settings.output.type_delay_ms), "--file", "-"]
+        return _type_chunked(command, text, "xdotool")
+
+    def delete_chars(self, count: int) -> bool:
+        command = ["xdotool", "key", "--delay", str(settings.output.type_delay_ms),
+                   "--repeat", str(count), "BackSpace"]
+        return _run_tool(command, _backspace_timeout(count), "Deletion")
+
+class XTestPasteInserter(TextInsertionStrategy):
+    """Lends the text to the clipboard and sends one Ctrl+V through in-process XTest."""
+    name = "xtest-paste"
+
+    def __init__(self, connection):
+        self._x = connection
+
+    def insert(self, text: str) -> bool:
+        window_class = self._x.window_class(self._x.focused_window()) or ""
+        is_terminal = window_class.lower() in {c.lower() for c in settings.output.terminal_classes}
+        keys = ["Control_L", "Shift_L", "v"] if is_terminal else ["Control_L", "v"]
+        if not clipboard_keeper.hold(text):
             return False
-        except subprocess.TimeoutExpired:
-            print("Text insertion timed out (xdotool may be unresponsive).")
+        try:
+            self._x.send_chord(keys)
+            return True
+        except Exception as e:
+            print(f"An error occurred while pasting through XTest: {e}")
             return False
+        finally:
+            clipboard_keeper.release()
+
+    def delete_chars(self, count: int) -> bool:
+        try:
+            self._x.tap("BackSpace", count)
+            return True
         except Exception as e:
-            print(f"An error occurred during X11 text insertion: {e}")
+            print(f"An error occurred while deleting through XTest: {e}")
             return False
 
+    def target_window(self) -> Optional[str]:
+        return _x11_target_window(self._x)()
+
 class WaylandTextInserter(TextInsertionStrategy):
-    """Uses ydotool to type text in Wayland."""
+    """Uses ydotool to type text in Wayland, in chunks."""
+    name = "ydotool-type"
+    per_char = True
+
     def insert(self, text: str) -> bool:
+        command = ["ydotool", "type", "--key-delay", str(settings.output.type_delay_ms), "--file", "-"]
+        return _type_chunked(command, text, "ydotool")
+
+    def delete_chars(self, count: int) -> bool:
+        return _ydotool_backspace(count)
+
+def _ydotool_backspace(count: int) -> bool:
+    """Sends `count` BackSpace presses through ydotool (14 = KEY_BACKSPACE)."""
+    command = ["ydotool", "key", "--key-delay", str(settings.output.type_delay_ms)] + ["14:1", "14:0"] * count
+    return _run_tool(command, _backspace_timeout(count), "Deletion")
+
+class WaylandPasteInserter(TextInsertionStrategy):
+    """Lends the text to the clipboard with wl-copy and sends Ctrl+V through ydotool."""
+    name = "ydotool-paste"
+
+    @staticmethod
+    def _wl_copy(text: str) -> bool:
+        try:
+            subprocess.run(["wl-copy"], input=text, text=True, check=True,
+                           timeout=settings.output.paste_tool_timeout)
+            return True
+        except FileNotFoundError as e:
+            print(f"Paste failed: '{e.filename}' not found.")
+        except subprocess.TimeoutExpired:
+            print("Paste timed out (wl-copy may be unresponsive).")
+        except Exception as e:
+            print(f"An error occurred while copying with wl-copy: {e}")
+        return False
+
+    def insert(self, text: str) -> bool:
+        if not clipboard_keeper.hold(text, self._wl_copy):
+            return False
         try:
-            subprocess.run(
-                ["ydotool", "type", text],
-                check=True,
-                timeout=settings.output.paste_tool_timeout
-            )
-            print("Text typed using ydotool.")
+            # Linux input event codes: 29 = KEY_LEFTCTRL, 47 = KEY_V
+            subprocess.run(["ydotool", "key", "29:1", "47:1", "47:0", "29:0"], check=True,
+                           timeout=settings.output.paste_tool_timeout)
             return True
-        except FileNotFoundError:
-            print("Text insertion failed: 'ydotool' not found.")
+        except FileNotFoundError as e:
+            print(f"Paste failed: '{e.filename}' not found.")
             return False
         except subprocess.TimeoutExpired:
-            print("Text insertion timed out (ydotool may be unresponsive).")
+            print("Paste timed out (ydotool may be unresponsive).")
             return False
         except Exception as e:
-            print(f"An error occurred during Wayland text insertion: {e}")
+            print(f"An error occurred during Wayland paste: {e}")
+            return False
+        finally:
+            clipboard_keeper.release()
+
+    def delete_chars(self, count: int) -> bool:
+        return _ydotool_backspace(count)
+
+class AdaptiveTextInserter(TextInsertionStrategy):
+    """
+    Tries the candidate strategies in order of their expected latency for the
+    target window and text, falling back to the next one on failure.
+
+    Paste is modelled as a fixed cost and typing as a cost per character, both
+    learned per window, so short texts can still be typed where that beats the
+    clipboard round trip. A strategy not yet measured in a window goes first
+    (typing only on a short text), and every REPROBE_EVERY insertions the one
+    measured longest ago is tried again, so a window's ranking follows changes
+    instead of settling on whichever strategy happened to succeed first.
+    """
+    name = "adaptive"
+
+    def __init__(self, strategies: List[TextInsertionStrategy], target_window: Callable[[], Optional[str]]):
+        self._strategies = strategies
+        self._target_window = target_window
+        # (window, strategy) -> smoothed seconds, per character for per_char strategies; None after a failure
+        self._cost: Dict[Tuple[str, str], Optional[float]] = {}
+        # (window, strategy) -> insertion count of the window when it was last measured
+        self._measured_at: Dict[Tuple[str, str], int] = {}
+        self._insertions: Dict[str, int] = {}
+        self._last_used: Optional[TextInsertionStrategy] = None
+
+    def _expected(self, window: str, strategy: TextInsertionStrategy, chars: int) -> float:
+        cost = self._cost[(window, strategy.name)]
+        return cost * chars if strategy.per_char else cost
+
+    def _ranked(self, window: str, chars: int) -> List[TextInsertionStrategy]:
+        count = self._insertions[window] = self._insertions.get(window, 0) + 1
+        probe_allowed = lambda strategy: not strategy.per_char or chars <= PROBE_CHARS
+        probes, measured, failed, deferred = [], [], [], []
+        for strategy in self._strategies:
+            key = (window, strategy.name)
+            if key not in self._cost:
+                (probes if probe_allowed(strategy) else deferred).append(strategy)
+            elif self._cost[key] is None:
+                failed.append(strategy)
+            else:
+                measured.append(strategy)
+        measured.sort(key=lambda strategy: self._expected(window, strategy, chars))
+        ranked = probes + measured + deferred + failed
+        if not probes and count % REPROBE_EVERY == 0:
+            stale = [s for s in ranked[1:] if probe_allowed(s)]
+            if stale:
+                oldest = min(stale, key=lambda s: self._measured_at.get((window, s.name), 0))
+                ranked.remove(oldest)
+                ranked.insert(0, oldest)
+        return ranked
+
+    def _record(self, window: str, strategy: TextInsertionStrategy, chars: int, latency: Optional[float]):
+        key = (window, strategy.name)
+        cost = latency
+        if latency is not None and strategy.per_char:
+            cost = latency / max(chars, 1)
+        previous = self._cost.get(key)
+        if cost is not None and previous is not None:
+            cost = 0.7 * previous + 0.3 * cost
+        self._cost[key] = cost
+        self._measured_at[key] = self._insertions.get(window, 0)
+
+    def insert(self, text: str) -> bool:
+        window = self._target_window()
+        if window is None:
+            print("No active window found to type into.")
             return False
 
+        for strategy in self._ranked(window, len(text)):
+            start = time.monotonic()
+            success = strategy.insert(text)
+            elapsed = time.monotonic() - start
+            self._record(window, strategy, len(text), elapsed if success else None)
+            if success:
+                print(f"Inserted {len(text)} chars into '{window}' via {strategy.name} in {elapsed * 1000:.0f} ms.")
+                self._last_used = strategy
+                return True
+        return False
+
+    def delete_chars(self, count: int) -> bool:
+        # The strategy that inserted last is known to work in this window
+        ordered = [self._last_used] if self._last_used is not None else []
+        ordered += [s for s in self._strategies if s is not self._last_used]
+        return any(strategy.delete_chars(count) for strategy in ordered)
+
+    def target_window(self) -> Optional[str]:
+        return self._target_window()
+
+def _x11_target_window(connection) -> Callable[[], Optional[str]]:
+    """Returns a function naming the focused window by its WM_CLASS."""
+    def target_window() -> Optional[str]:
+        window = connection.focused_window()
+        if not window:
+            return None
+        return connection.window_class(window) or "unknown"
+    return target_window
+
 def get_text_inserter() -> TextInsertionStrategy:
     """Factory function to get the appropriate text inserter for the environment."""
+    method = settings.output.insert_method
     session_type = os.environ.get("XDG_SESSION_TYPE", "x11").lower()
     if "wayland" in session_type:
-        print("Wayland session detected. Using ydotool for text insertion.")
-        return WaylandTextInserter()
-    print("X11 session detected. Using xdotool for text insertion.")
-    return X11TextInserter() 
\ No newline at end of file
+        print(f"Wayland session detected. Text insertion method: {method}.")
+        paste, typing = WaylandPasteInserter(), WaylandTextInserter()
+        target_window = lambda: "wayland"
+    else:
+        print(f"X11 session detected. Text insertion method: {method}.")
+        typing = X11TextInserter()
+        try:
+            connection = XTestConnection()
+        except Exception as e:
+            print(f"XTest unavailable ({e}). Using xdotool typing only.")
+            return typing
+        paste = XTestPasteInserter(connection)
+        target_window = _x11_target_window(connection)
+
+    if method == "paste":
+        return paste
+    if method == "type":
+        return typing
+    return AdaptiveTextInserter([paste, typing], target_window)
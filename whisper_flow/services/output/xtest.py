@@ -0,0 +1,111 @@
+import ctypes
+import ctypes.util
+import threading
+from typing import List, Optional
+
+
+class _XClassHint(ctypes.Structure):
+    _fields_ = [("res_name", ctypes.c_void_p), ("res_class", ctypes.c_void_p)]
+
+
+class XTestConnection:
+    """
+    In-process X11 connection that fakes key events through the XTest extension.
+
+    Replaces one `xdotool` fork per insertion with direct libXtst calls on a
+    display connection opened once.
+    """
+    def __init__(self):
+        x11_path = ctypes.util.find_library("X11")
+        xtst_path = ctypes.util.find_library("Xtst")
+        if not x11_path or not xtst_path:
+            raise OSError("libX11/libXtst not found")
+        self._x11 = ctypes.cdll.LoadLibrary(x11_path)
+        self._xtst = ctypes.cdll.LoadLibrary(xtst_path)
+        self._declare_functions()
+
+        self._display = self._x11.XOpenDisplay(None)
+        if not self._display:
+            raise OSError("cannot open X display")
+        self._lock = threading.Lock()
+
+    def _declare_functions(self):
+        x11, xtst = self._x11, self._xtst
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XStringToKeysym.restype = ctypes.c_ulong
+        x11.XStringToKeysym.argtypes = [ctypes.c_char_p]
+        x11.XKeysymToKeycode.restype = ctypes.c_ubyte
+        x11.XKeysymToKeycode.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XFlush.argtypes = [ctypes.c_void_p]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XGetInputFocus.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_int)
+        ]
+        x11.XGetClassHint.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XClassHint)]
+        x11.XQueryTree.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.POINTER(ctypes.c_ulong)), ctypes.POINTER(ctypes.c_uint)
+        ]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        xtst.XTestFakeKeyEvent.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_ulong]
+
+    def focused_window(self) -> int:
+        """Returns the id of the window that has the input focus (0 if none)."""
+        with self._lock:
+            window, revert = ctypes.c_ulong(), ctypes.c_int()
+            self._x11.XGetInputFocus(self._display, ctypes.byref(window), ctypes.byref(revert))
+            # 0 = None, 1 = PointerRoot
+            return window.value if window.value > 1 else 0
+
+    def window_class(self, window: int) -> Optional[str]:
+        """Returns WM_CLASS of the window or of its closest ancestor that has one."""
+        with self._lock:
+            for _ in range(8):
+                if not window:
+                    return None
+                hint = _XClassHint()
+                if self._x11.XGetClassHint(self._display, window, ctypes.byref(hint)):
+                    name = ctypes.string_at(hint.res_class).decode(errors="replace") if hint.res_class else None
+                    for pointer in (hint.res_name, hint.res_class):
+                        if pointer:
+                            self._x11.XFree(pointer)
+                    return name
+                root, parent = ctypes.c_ulong(), ctypes.c_ulong()
+                children, count = ctypes.POINTER(ctypes.c_ulong)(), ctypes.c_uint()
+                if not self._x11.XQueryTree(self._display, window, ctypes.byref(root), ctypes.byref(parent),
+                                            ctypes.byref(children), ctypes.byref(count)):
+                    return None
+                if children:
+                    self._x11.XFree(children)
+                if parent.value == root.value:
+                    return None
+                window = parent.value
+        return None
+
+    def tap(self, key: str, count: int = 1):
+        """Presses and releases one key `count` times, e.g. tap("BackSpace", 5)."""
+        with self._lock:
+            keycode = self._x11.XKeysymToKeycode(self._display, self._x11.XStringToKeysym(key.encode()))
+            if not keycode:
+                raise ValueError(f"no keycode for keysym '{key}'")
+            for _ in range(count):
+                self._xtst.XTestFakeKeyEvent(self._display, keycode, True, 0)
+                self._xtst.XTestFakeKeyEvent(self._display, keycode, False, 0)
+            self._x11.XSync(self._display, False)
+
+    def send_chord(self, keys: List[str]):
+        """Presses the keys in order and releases them in reverse, e.g. ["Control_L", "v"]."""
+        with self._lock:
+            keycodes = []
+            for key in keys:
+                keycode = self._x11.XKeysymToKeycode(self._display, self._x11.XStringToKeysym(key.encode()))
+                if not keycode:
+                    raise ValueError(f"no keycode for keysym '{key}'")
+                keycodes.append(keycode)
+            for keycode in keycodes:
+                self._xtst.XTestFakeKeyEvent(self._display, keycode, True, 0)
+            for keycode in reversed(keycodes):
+                self._xtst.XTestFakeKeyEvent(self._display, keycode, False, 0)
+            self._x11.XSync(self._display, False)
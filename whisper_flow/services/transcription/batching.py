@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+
+class BatchScheduler:
+    """
+    Runs submitted items in batches on a single worker thread.
+
+    An item that finds the worker idle starts at once, so a lone utterance pays
+    no batching delay. Items that arrive while a batch is running, or within
+    `window` seconds of the first one, are run together as the next batch.
+    Futures are resolved in submission order.
+    """
+    def __init__(self, run_batch: Callable[[List], List], window: float = 0.0, max_size: int = 8):
+        self._run_batch = run_batch
+        self._window = window
+        self._max_size = max(1, max_size)
+        self._queue: "queue.Queue[Optional[Tuple[object, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="transcription-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self) -> Tuple[List[Tuple[object, Future]], bool]:
+        """Blocks for the first item, then gathers what else is pending; returns (batch, stopping)."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self._window
+        while len(batch) < self._max_size:
+            timeout = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if not batch:
+                continue
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+            try:
+                results = self._run_batch([item for item, _ in batch])
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+    def shutdown(self, timeout: float = None):
+        """Finishes the queued items and stops the worker."""
+        self._queue.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,101 @@
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+from whisper_flow.config.settings import settings
+
+
+@dataclass
+class CpuProfile:
+    """Best CPU configuration measured on this host for one model size."""
+    model_size: str
+    compute_type: str
+    cpu_threads: int
+    num_workers: int
+    latency: float      # seconds for one decode of the tuning clip
+    throughput: float   # audio seconds decoded per second with num_workers concurrent decodes
+    cores: int
+    tuned_at: str
+
+
+def _tuning_path() -> str:
+    return os.path.expanduser(settings.performance.tuning_file)
+
+
+def load_profile(model_size: str) -> Optional[CpuProfile]:
+    """Returns the persisted profile for the model, if it was tuned on a host with this core count."""
+    try:
+        with open(_tuning_path()) as f:
+            data = json.load(f).get(model_size)
+        profile = CpuProfile(**data) if data else None
+    except (OSError, ValueError, TypeError):
+        return None
+    if profile is not None and profile.cores != os.cpu_count():
+        print(f"Ignoring CPU tuning for {model_size}: measured on {profile.cores} cores, "
+              f"this host has {os.cpu_count()}. Re-run `python -m whisper_flow.tune_cpu`.")
+        return None
+    return profile
+
+
+def save_profile(profile: CpuProfile):
+    """Stores the profile, keeping profiles of other model sizes."""
+    path = _tuning_path()
+    data: Dict[str, dict] = {}
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        pass
+    data[profile.model_size] = asdict(profile)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def model_options(cpu_threads: int = 0) -> dict:
+    """
+    WhisperModel keyword arguments for compute type, threads and workers.
+
+    An explicit thread count (argument or setting) wins; otherwise a tuned
+    profile is used on CPU, and CTranslate2's defaults without one. The
+    profile's compute type only replaces compute_type "auto".
+    """
+    perf = settings.performance
+    options = {"compute_type": perf.compute_type, "cpu_threads": cpu_threads or perf.cpu_threads,
+               "num_workers": perf.num_workers}
+    if perf.device == "cpu" and not options["cpu_threads"] and perf.tuning_file:
+        profile = load_profile(perf.model_size)
+        if profile is not None:
+            options.update(cpu_threads=profile.cpu_threads, num_workers=profile.num_workers)
+            if perf.compute_type_is_auto:
+                options["compute_type"] = profile.compute_type
+    return options
+
+
+@contextmanager
+def pinned_to(cores: List[int]):
+    """
+    Restricts the calling thread to `cores` for the duration of the block.
+
+    Threads started inside the block (CTranslate2's workers and their OpenMP
+    pool) inherit the mask, so building the model here keeps inference off the
+    remaining cores, where audio capture and the hotkey listener run.
+    """
+    if not cores or not hasattr(os, "sched_setaffinity"):
+        yield
+        return
+    previous = os.sched_getaffinity(0)
+    try:
+        os.sched_setaffinity(0, cores)
+    except OSError as e:
+        print(f"Could not pin inference to cores {cores}: {e}")
+        yield
+        return
+    try:
+        yield
+    finally:
+        os.sched_setaffinity(0, previous)
@@ -0,0 +1,159 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from whisper_flow.config.settings import settings
+
+# Jobs are forgotten this long after they were created
+RETAIN_SECONDS = 600.0
+
+
+class JobCancelled(Exception):
+    """Raised inside a decode whose job was cancelled or ran past its deadline."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Job:
+    """The transcription work of one utterance, from its first decode until its text is published."""
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.created_at = time.monotonic()
+        self.released_at: Optional[float] = None
+        self.deadline: Optional[float] = None
+        # Set once the model starts on the released utterance
+        self.started = False
+        self.closed = False
+        self._reason: Optional[str] = None
+        self._futures: List[Future] = []
+
+    @property
+    def cancel_reason(self) -> Optional[str]:
+        """Why the job's result must not be used, or None while it is still wanted."""
+        if self._reason is None and self.deadline is not None and time.monotonic() > self.deadline:
+            self._reason = f"past the {self.deadline - self.released_at:g}s deadline"
+        return self._reason
+
+    def cancel(self, reason: str):
+        """Marks the job dead; queued work is withdrawn and running decodes stop at the next segment."""
+        if self._reason is None:
+            self._reason = reason
+        for future in self._futures:
+            future.cancel()  # Only succeeds while it is still queued
+
+    def attach(self, future: Future):
+        self._futures.append(future)
+        if self._reason is not None:
+            future.cancel()
+
+    def check(self):
+        reason = self.cancel_reason
+        if reason is not None:
+            raise JobCancelled(reason)
+
+
+class JobScheduler:
+    """
+    Tracks the transcription job of every utterance so it can be cancelled.
+
+    Jobs are keyed by trace id and created on first use. Cancelling a job
+    withdraws its queued futures, so the batch scheduler and executors skip
+    it instead of decoding it, and makes guarded segment generators stop at
+    the next segment: faster-whisper decodes lazily, so leaving the generator
+    is what stops the model. A result that arrives for a dead job is dropped.
+
+    When an utterance is released, older jobs are kept ("queue"), dropped if
+    they have not started decoding ("supersede") or dropped even while
+    decoding ("preempt"), as set in settings.jobs.
+    """
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def job(self, trace_id: str) -> Optional[Job]:
+        """Returns the job of a trace, creating it; None for untraced work, which cannot be cancelled."""
+        if not trace_id:
+            return None
+        with self._lock:
+            job = self._jobs.get(trace_id)
+            if job is None:
+                job = self._jobs[trace_id] = Job(trace_id)
+            return job
+
+    def release(self, trace_id: str) -> Optional[Job]:
+        """The utterance was released: starts its deadline and applies the policy to older jobs."""
+        job = self.job(trace_id)
+        if job is None:
+            return None
+        config = settings.jobs
+        now = time.monotonic()
+        job.released_at = now
+        if config.deadline_seconds > 0:
+            job.deadline = now + config.deadline_seconds
+        if config.on_new_utterance != "queue":
+            with self._lock:
+                older = [j for j in self._jobs.values() if j is not job and not j.closed
+                         and j.released_at is not None and j.cancel_reason is None]
+            for other in older:
+                if config.on_new_utterance == "preempt" or not other.started:
+                    other.cancel(f"{config.on_new_utterance.rstrip('e')}ed by a newer utterance")
+        return job
+
+    def cancel_all(self, reason: str) -> int:
+        """Cancels every open job; returns how many there were."""
+        with self._lock:
+            open_jobs = [j for j in self._jobs.values() if not j.closed and j.cancel_reason is None]
+        for job in open_jobs:
+            job.cancel(reason)
+        return len(open_jobs)
+
+    def close(self, trace_id: str) -> Optional[str]:
+        """Marks a job done before its text is published; returns why the text must be dropped, if it must."""
+        with self._lock:
+            job = self._jobs.get(trace_id)
+            now = time.monotonic()
+            # Forget old jobs here rather than on a timer; running decodes hold their own reference
+            for key in [k for k, j in self._jobs.items() if now - j.created_at > RETAIN_SECONDS]:
+                del self._jobs[key]
+        if job is None:
+            return None
+        job.closed = True
+        return job.cancel_reason
+
+    def guard(self, job: Optional[Job], segments: Iterable) -> Iterator:
+        """Yields the segments while the job is wanted; raises JobCancelled between segments otherwise."""
+        if job is None:
+            yield from segments
+            return
+        yield from self._guarded(job.check, segments)
+
+    def guard_group(self, jobs: List[Optional[Job]], segments: Iterable) -> Iterator:
+        """Like guard() for one decode shared by several jobs: stops once none of them is wanted."""
+        if not jobs or any(job is None for job in jobs):
+            yield from segments
+            return
+
+        def check():
+            reasons = [job.cancel_reason for job in jobs]
+            if all(reasons):
+                raise JobCancelled(reasons[0])
+        yield from self._guarded(check, segments)
+
+    @staticmethod
+    def _guarded(check, segments: Iterable) -> Iterator:
+        iterator = iter(segments)
+        try:
+            while True:
+                check()  # Before the model decodes the next segment
+                try:
+                    segment = next(iterator)
+                except StopIteration:
+                    return
+                check()  # Decoded while it was cancelled: do not pass it on
+                yield segment
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
@@ -1,29 +1,198 @@
-import subprocess
+import ctypes
+import ctypes.util
 import re
+import shutil
+import subprocess
+import threading
+from typing import List, Optional
 
-def get_keyboard_layout() -> str:
-    """Detects the current keyboard layout ('en' or 'ru') on X11."""
+from whisper_flow.config.settings import settings
+
+# XKBlib constants
+XKB_USE_CORE_KBD = 0x0100
+XKB_STATE_NOTIFY = 2
+XKB_GROUP_STATE_MASK = 1 << 4
+
+
+class _XkbStateNotifyEvent(ctypes.Structure):
+    """Leading fields of XkbStateNotifyEvent (XKBlib.h)."""
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("serial", ctypes.c_ulong),
+        ("send_event", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("time", ctypes.c_ulong),
+        ("xkb_type", ctypes.c_int),
+        ("device", ctypes.c_int),
+        ("changed", ctypes.c_uint),
+        ("group", ctypes.c_int),
+    ]
+
+
+class _XEvent(ctypes.Union):
+    _fields_ = [("state", _XkbStateNotifyEvent), ("pad", ctypes.c_long * 24)]
+
+
+def _query_layout_names() -> List[str]:
+    """Returns the configured XKB layouts in group order, e.g. ['us', 'ru']."""
     try:
-        result = subprocess.check_output(
-            ["xset", "-q"],
-            stderr=subprocess.STDOUT,
-            text=True
-        )
-        
-        # Primary Method: Check for "Group 2: on/off"
-        indicator_match = re.search(r"Group 2:\s+(on|off)", result)
-        if indicator_match:
-            return "ru" if indicator_match.group(1) == "on" else "en"
-
-        # Fallback Method: Check for "effective" group index
-        group_match = re.search(r"group\s(\d+):\s+.*\(effective\)", result)
-        if group_match:
-            return "ru" if int(group_match.group(1)) > 0 else "en"
+        output = subprocess.check_output(["setxkbmap", "-query"], stderr=subprocess.DEVNULL, text=True, timeout=2)
+        match = re.search(r"^layout:\s*(\S+)", output, re.MULTILINE)
+        if match:
+            return match.group(1).split(",")
+    except Exception:
+        pass
+    return []
+
 
+def _poll_group_index() -> Optional[int]:
+    """Reads the active group index through `xset -q` (fallback when XKB events are unavailable)."""
+    try:
+        result = subprocess.check_output(["xset", "-q"], stderr=subprocess.STDOUT, text=True, timeout=2)
     except FileNotFoundError:
         print("Error: 'xset' command not found. Cannot detect keyboard layout.")
+        return None
     except Exception as e:
         print(f"An error occurred while detecting keyboard layout: {e}")
-    
-    print("Warning: Keyboard layout detection failed. Defaulting to 'ru'.")
-    return "ru" 
\ No newline at end of file
+        return None
+
+    # Primary Method: Check for "Group 2: on/off"
+    indicator_match = re.search(r"Group 2:\s+(on|off)", result)
+    if indicator_match:
+        return 1 if indicator_match.group(1) == "on" else 0
+
+    # Fallback Method: Check for "effective" group index
+    group_match = re.search(r"group\s(\d+):\s+.*\(effective\)", result)
+    if group_match:
+        return int(group_match.group(1))
+    return None
+
+
+class LayoutTracker:
+    """
+    Keeps the current keyboard layout's language in memory.
+
+    A background thread follows XKB group changes through XkbStateNotify events
+    when libX11 is available, and otherwise polls `xset -q` every
+    `layout.poll_interval` seconds. Reading the language never blocks.
+    """
+    def __init__(self):
+        self._language = settings.layout.default_language
+        self._group: Optional[int] = None
+        self._layouts: List[str] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread = None
+        self._stopped = threading.Event()
+        self._pinned = False
+
+    def current_language(self) -> str:
+        """Returns the language of the active layout (a memory read)."""
+        if self._thread is None and not self._pinned:
+            self.start()
+        return self._language
+
+    def start(self):
+        """Reads the layout once and starts following changes in the background."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._layouts = _query_layout_names()
+            x11 = self._open_xkb()
+            if x11 is not None:
+                target, args, mode = self._watch_xkb, x11, "XKB events"
+            elif shutil.which("xset"):
+                self._set_group(_poll_group_index())
+                target, args, mode = self._poll_loop, (), f"polling every {settings.layout.poll_interval}s"
+            else:
+                print("Error: 'xset' command not found. Cannot detect keyboard layout.")
+                target, args, mode = self._stopped.wait, (), "unavailable"
+            self._thread = threading.Thread(target=target, args=args, name="layout-tracker", daemon=True)
+            self._thread.start()
+        print(f"Keyboard layout tracker started ({mode}), layouts: {self._layouts or 'unknown'}, "
+              f"current: {self._language}")
+
+    def stop(self):
+        self._stopped.set()
+
+    def pin(self, language: str):
+        """Fixes the output language and disables tracking (headless tools, benchmarks)."""
+        self._pinned = True
+        self._language = language
+
+    def _set_group(self, group: Optional[int]):
+        """Maps a group index to a language code through the configured layout table."""
+        if self._pinned:
+            return
+        if group is None:
+            if self._group is None:
+                print(f"Warning: Keyboard layout detection failed. Defaulting to '{self._language}'.")
+            return
+        if group >= len(self._layouts):
+            # Layouts may have been reconfigured since startup
+            self._layouts = _query_layout_names() or self._layouts
+        self._group = group
+        if group < len(self._layouts):
+            layout = self._layouts[group]
+            self._language = settings.layout.languages.get(layout, layout)
+        else:
+            # Layout names unknown: assume the historical en/ru group order
+            self._language = "en" if group == 0 else "ru"
+
+    def _open_xkb(self):
+        """Opens an X display with XKB group-change events selected, or returns None."""
+        library = ctypes.util.find_library("X11")
+        if not library:
+            return None
+        try:
+            xlib = ctypes.cdll.LoadLibrary(library)
+            xlib.XOpenDisplay.restype = ctypes.c_void_p
+            xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+            display = xlib.XOpenDisplay(None)
+            if not display:
+                return None
+
+            xlib.XkbQueryExtension.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_int)] * 5
+            opcode, event_base, error_base, major, minor = (ctypes.c_int() for _ in range(5))
+            major.value, minor.value = 1, 0
+            if not xlib.XkbQueryExtension(display, ctypes.byref(opcode), ctypes.byref(event_base),
+                                          ctypes.byref(error_base), ctypes.byref(major), ctypes.byref(minor)):
+                return None
+
+            xlib.XkbSelectEventDetails.argtypes = [
+                ctypes.c_void_p, ctypes.c_uint, ctypes.c_uint, ctypes.c_ulong, ctypes.c_ulong
+            ]
+            xlib.XkbSelectEventDetails(display, XKB_USE_CORE_KBD, XKB_STATE_NOTIFY,
+                                       XKB_GROUP_STATE_MASK, XKB_GROUP_STATE_MASK)
+
+            # XkbStateRec starts with the effective group as an unsigned char
+            state = (ctypes.c_ubyte * 32)()
+            xlib.XkbGetState.argtypes = [ctypes.c_void_p, ctypes.c_uint, ctypes.c_void_p]
+            if xlib.XkbGetState(display, XKB_USE_CORE_KBD, state) == 0:
+                self._set_group(state[0])
+            return xlib, display, event_base.value
+        except Exception as e:
+            print(f"XKB events unavailable ({e}), falling back to polling.")
+            return None
+
+    def _watch_xkb(self, xlib, display, event_base: int):
+        """Blocks on X events and updates the group on every XkbStateNotify."""
+        xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XEvent)]
+        event = _XEvent()
+        while not self._stopped.is_set():
+            xlib.XNextEvent(display, ctypes.byref(event))
+            state = event.state
+            if state.type == event_base and state.xkb_type == XKB_STATE_NOTIFY:
+                self._set_group(state.group)
+
+    def _poll_loop(self):
+        while not self._stopped.wait(settings.layout.poll_interval):
+            self._set_group(_poll_group_index())
+
+
+# Singleton instance
+layout_tracker = LayoutTracker()
+
+
+def get_keyboard_layout() -> str:
+    """Returns the language of the current keyboard layout, e.g. 'en' or 'ru'."""
+    return layout_tracker.current_language()
@@ -0,0 +1,72 @@
+import threading
+from typing import Callable, Dict, List, Optional
+
+from whisper_flow.services.transcription.streaming import Word
+
+# Words this far before a cut are still taken from the later chunk (timestamps
+# of the same word differ a little between the two decodes of the overlap);
+# the repeat check below drops them when the earlier chunk already had them.
+BOUNDARY_SLACK = 0.3
+# Longest run of words compared when dropping repeats across a cut
+MAX_REPEATED_WORDS = 6
+
+
+class LongFormSession:
+    """
+    Stitches the chunks of one long-form recording back together.
+
+    Chunks may finish decoding in any order. Each keeps the words centred in
+    its own span of the recording, words repeated across a cut are dropped,
+    and text is emitted strictly in chunk order as soon as every earlier chunk
+    is done. Only words of chunks waiting for an earlier one are held.
+    """
+    def __init__(self, language: str, overlap: float):
+        self.language = language
+        self.overlap = overlap
+        # Guards task resolution on the first decoded chunk
+        self.lock = threading.Lock()
+        self.task: Optional[str] = None
+        self.target_lang: Optional[str] = None
+        self._emit_lock = threading.Lock()
+        self._done: Dict[int, tuple] = {}
+        self._next = 0
+        self._tail: List[Word] = []
+        self._emitted_text = False
+
+    def complete(self, index: int, words: List[Word], keep_from: float, keep_until: float, final: bool,
+                 emit: Callable[[str, bool], None]):
+        """
+        Stores a decoded chunk and emits the text of every chunk now in order.
+
+        `emit(text, last)` is called under the session's lock, so pieces arrive
+        in order; text after the first piece starts with a space. The final
+        chunk is always emitted, with empty text if it had no words.
+        """
+        with self._emit_lock:
+            self._done[index] = (words, keep_from, keep_until, final)
+            while self._next in self._done:
+                words, keep_from, keep_until, final = self._done.pop(self._next)
+                self._next += 1
+                text = self._stitch(words, keep_from, keep_until)
+                if text and self._emitted_text:
+                    text = " " + text
+                self._emitted_text = self._emitted_text or bool(text)
+                if text or final:
+                    emit(text, final)
+
+    def _stitch(self, words: List[Word], keep_from: float, keep_until: float) -> str:
+        """Text of the words belonging to this chunk's span, without repeats of the text before it."""
+        own = [w for w in words if keep_from - BOUNDARY_SLACK <= (w.start + w.end) / 2 < keep_until]
+        own = self._drop_repeated(own, keep_from)
+        if own:
+            self._tail = (self._tail + own)[-MAX_REPEATED_WORDS:]
+        return "".join(w.text for w in own).strip()
+
+    def _drop_repeated(self, words: List[Word], keep_from: float) -> List[Word]:
+        """Drops leading words that repeat the end of the emitted text across the cut."""
+        for count in range(min(len(self._tail), len(words), MAX_REPEATED_WORDS), 0, -1):
+            if words[count - 1].start > keep_from + self.overlap:
+                continue  # Too far past the cut to be the overlap
+            if [w.key for w in self._tail[-count:]] == [w.key for w in words[:count]]:
+                return words[count:]
+        return words
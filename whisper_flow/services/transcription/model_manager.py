@@ -1,46 +1,298 @@
-from faster_whisper import WhisperModel
 import gc
-import torch
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+import numpy as np
 from whisper_flow.config.settings import settings
+from whisper_flow.core.events import SettingsChanged
+from whisper_flow.services.transcription.cpu_tuning import model_options, pinned_to
+from whisper_flow.services.transcription.remote import RemoteModel
+from whisper_flow.utils.lazy_import import timed_import
+
+if TYPE_CHECKING:
+    from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+# Settings that take a new model; everything else is read per decode
+MODEL_FIELDS = {
+    "performance.model_size", "performance.device", "performance.compute_type",
+    "performance.cpu_threads", "performance.num_workers", "performance.cpu_affinity",
+    "performance.tuning_file", "daemon.use_daemon", "daemon.socket_path",
+}
+DRAFT_FIELDS = {"draft.model", "draft.compute_type"}
 
 class ModelManager:
     """Loads and manages the Whisper model."""
     _instance = None
     _model = None
     _usage_count = 0
+    _lock = threading.RLock()
+    _preload_thread: threading.Thread = None
+    _pipeline = None
+    _pipeline_model = None
+    _pipeline_unavailable = False
+    _draft_model = None
+    # Separate from _lock so drafts are served while the main model is still loading
+    _draft_lock = threading.Lock()
+    # Background swaps: requests made while one runs are served by the same thread
+    _swapping = False
+    _swap_requests = 0
+    _draft_swapping = False
+    _draft_swap_requests = 0
+    # CTranslate2 intra-op threads overriding the settings; 0 keeps them. Set before the first load.
+    cpu_threads = 0
+    # WhisperModel options of the last local model built (after the CPU profile was applied)
+    built_with: Optional[dict] = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ModelManager, cls).__new__(cls)
         return cls._instance
 
-    def get_model(self) -> WhisperModel:
-        """Lazily loads the model on first request and returns it."""
-        if self._model is None:
-            self._load_model()
-        
-        self._usage_count += 1
-        
-        # Периодическая перезагрузка модели для предотвращения деградации
-        if self._usage_count >= settings.performance.model_reload_after_uses:
-            print(f"🔄 Reloading model after {self._usage_count} uses to prevent quality degradation...")
-            self._reload_model()
-        
-        # После _load_model() или _reload_model() _model гарантированно не None
-        assert self._model is not None, "Model should be loaded at this point"
-        return self._model
+    def get_model(self, count_use: bool = True) -> "WhisperModel":
+        """
+        Lazily loads the model on first request and returns it.
 
-    def _load_model(self):
-        """Loads the Whisper model."""
-        print("Loading Whisper model...")
-        try:
-            self._model = WhisperModel(
-                settings.performance.model_size,
+        Each call counts toward model_reload_after_uses unless `count_use` is
+        False; decodes that are only part of an utterance (streaming partials,
+        long-form chunks) pass False and the utterance calls count_use() once.
+        """
+        if self._preload_thread is not None and self._preload_thread.is_alive():
+            print("⏳ Model is still loading, transcription queued until it is ready...")
+
+        # Blocks while a background preload holds the lock
+        with self._lock:
+            if self._model is None:
+                self._load_model()
+            
+            if count_use:
+                self.count_use()
+            
+            # После _load_model() _model гарантированно не None
+            assert self._model is not None, "Model should be loaded at this point"
+            return self._model
+
+    def count_use(self):
+        """Counts one transcription toward the periodic reload."""
+        with self._lock:
+            self._usage_count += 1
+            
+            # Периодическая перезагрузка модели для предотвращения деградации
+            if self._usage_count < settings.performance.model_reload_after_uses or self._swapping:
+                return
+            # Reset now, so a reload that fails is retried after as many uses, not on every dictation
+            uses, self._usage_count = self._usage_count, 0
+            print(f"🔄 Reloading model after {uses} uses to prevent quality degradation...")
+            if settings.performance.device == "cuda":
+                # Two large models may not fit in VRAM at once: free the old one first
+                threading.Thread(target=self._reload_in_place, args=(f"after {uses} uses",),
+                                 name="model-reload", daemon=True).start()
+            else:
+                self.swap_model(f"after {uses} uses")
+
+    def _reload_in_place(self, reason: str):
+        """Frees the model and loads a new one; dictations wait for it, as with the first load."""
+        start = time.monotonic()
+        with self._lock:
+            try:
+                self._reload_model()
+                if settings.performance.warmup and not isinstance(self._model, RemoteModel):
+                    self._warmup()
+                print(f"🔄 Model reloaded in {time.monotonic() - start:.2f}s ({reason}).")
+            except Exception as e:
+                print(f"Error reloading the model: {e}. It will be loaded on next use.")
+
+    def get_batched_pipeline(self) -> Optional["BatchedInferencePipeline"]:
+        """
+        Returns a batched pipeline sharing the current model, or None if faster-whisper lacks one.
+
+        Not counted as a use: the caller counts each utterance of the batch.
+        """
+        model = self.get_model(count_use=False)
+        with self._lock:
+            # A daemon client sends requests one by one; the daemon queues them
+            if self._pipeline_unavailable or isinstance(model, RemoteModel):
+                return None
+            if self._pipeline is None or self._pipeline_model is not model:
+                try:
+                    faster_whisper = timed_import("faster_whisper")
+                    self._pipeline = faster_whisper.BatchedInferencePipeline(model=model)
+                except (ImportError, AttributeError) as e:
+                    print(f"Batched inference unavailable ({e}). Utterances will be decoded one by one.")
+                    self._pipeline_unavailable = True
+                    return None
+                self._pipeline_model = model
+            return self._pipeline
+
+    def get_draft_model(self) -> "WhisperModel":
+        """Lazily loads the small draft model of two-pass mode and returns it."""
+        with self._draft_lock:
+            if self._draft_model is None:
+                self._draft_model = self._create_draft_model()
+            return self._draft_model
+
+    def _create_draft_model(self) -> "WhisperModel":
+        start = time.monotonic()
+        faster_whisper = timed_import("faster_whisper")
+        options = model_options(self.cpu_threads)
+        with pinned_to(settings.performance.cpu_affinity):
+            model = faster_whisper.WhisperModel(
+                settings.draft.model,
                 device=settings.performance.device,
-                compute_type=settings.performance.compute_type
+                compute_type=settings.draft.compute_type,
+                cpu_threads=options["cpu_threads"],
+                num_workers=options["num_workers"]
             )
-            print("Model loaded successfully.")
-            self._usage_count = 0
+        print(f"Draft model '{settings.draft.model}' loaded in {time.monotonic() - start:.2f}s.")
+        return model
+
+    def on_settings_changed(self, event: SettingsChanged):
+        """Rebuilds the models affected by a configuration reload, in the background."""
+        changed = set(event.changed)
+        # A model not loaded yet picks up the new settings when it loads
+        if changed & MODEL_FIELDS and (self._model is not None or self._preload_thread is not None):
+            self.swap_model("configuration changed")
+        if changed & DRAFT_FIELDS and (self._draft_model is not None or settings.draft.model):
+            self.swap_draft_model()
+
+    def swap_model(self, reason: str):
+        """
+        Builds a model from the current settings on a background thread and swaps it in.
+
+        Dictations keep using the current model meanwhile; decodes already
+        running hold their own reference and finish on it.
+        """
+        with self._lock:
+            self._swap_requests += 1
+            if self._swapping:
+                return  # The running swap builds again once it is done
+            self._swapping = True
+        threading.Thread(target=self._swap_task, args=(reason,), name="model-swap", daemon=True).start()
+
+    def _swap_task(self, reason: str):
+        while True:
+            with self._lock:
+                request = self._swap_requests
+            start = time.monotonic()
+            try:
+                model = self._create_model()
+                if settings.performance.warmup and not isinstance(model, RemoteModel):
+                    self._warmup(model)
+            except Exception as e:
+                print(f"Error loading the new model: {e}. Keeping the current one.")
+                model = None
+            with self._lock:
+                if model is not None:
+                    self._model = model
+                    self._usage_count = 0
+                    self._pipeline = None
+                    self._pipeline_model = None
+                    print(f"🔄 New model swapped in after {time.monotonic() - start:.2f}s ({reason}).")
+                done = request == self._swap_requests
+                if done:
+                    self._swapping = False
+            # The old model is freed once its last in-flight decode drops it
+            model = None
+            self.release_gpu_memory()
+            gc.collect()
+            if done:
+                return
+
+    def swap_draft_model(self):
+        """Swaps the draft model for one built from the current settings, in the background."""
+        with self._draft_lock:
+            self._draft_swap_requests += 1
+            if self._draft_swapping:
+                return
+            self._draft_swapping = True
+        threading.Thread(target=self._draft_swap_task, name="draft-swap", daemon=True).start()
+
+    def _draft_swap_task(self):
+        while True:
+            with self._draft_lock:
+                request = self._draft_swap_requests
+            model = None
+            if settings.draft.model:
+                try:
+                    model = self._create_draft_model()
+                except Exception as e:
+                    print(f"Error loading the new draft model: {e}. Keeping the current one.")
+                    model = self._draft_model
+            with self._draft_lock:
+                self._draft_model = model
+                done = request == self._draft_swap_requests
+                if done:
+                    self._draft_swapping = False
+            model = None
+            if done:
+                return
+
+    def preload(self):
+        """Loads and warms up the model on a background thread."""
+        if self._preload_thread is not None:
+            return
+        self._preload_thread = threading.Thread(target=self._preload_task, daemon=True)
+        self._preload_thread.start()
+
+    def _preload_task(self):
+        """Background preload: model load followed by a short warm-up decode."""
+        # The draft model is small and gives the first text, so it goes first
+        if settings.draft.model:
+            try:
+                self.get_draft_model()
+            except Exception as e:
+                print(f"Error preloading the draft model: {e}")
+        with self._lock:
+            try:
+                if self._model is None:
+                    start = time.monotonic()
+                    self._load_model()
+                    print(f"⏱️ Startup: model load took {time.monotonic() - start:.2f}s")
+                if settings.performance.warmup and not isinstance(self._model, RemoteModel):
+                    self._warmup()
+            except Exception as e:
+                print(f"Error preloading Whisper model: {e}. It will be loaded on first use.")
+
+    def _warmup(self, model=None):
+        """Runs a decode on one second of synthetic noise to initialize the runtime."""
+        start = time.monotonic()
+        rng = np.random.default_rng(0)
+        audio = (rng.standard_normal(16000) * 0.01).astype(np.float32)
+        segments, _ = (model or self._model).transcribe(audio, beam_size=1, language="en", temperature=0)
+        # Segments are lazy; consume them so the decoder actually runs
+        for _ in segments:
+            pass
+        print(f"⏱️ Startup: warm-up decode took {time.monotonic() - start:.2f}s")
+
+    def _load_model(self):
+        """Loads the Whisper model, or connects to the daemon that holds it."""
+        self._model = self._create_model()
+        self._usage_count = 0
+
+    def _create_model(self):
+        """Builds a Whisper model (or a daemon client) from the current settings."""
+        if settings.daemon.use_daemon:
+            remote = RemoteModel.connect(settings.daemon.socket_path, "hotkey", settings.daemon.connect_timeout)
+            if remote is not None:
+                print(f"Using the transcription daemon at {settings.daemon.socket_path}.")
+                return remote
+            print(f"Transcription daemon not reachable at {settings.daemon.socket_path}. Loading the model locally.")
+        print(f"Loading Whisper model '{settings.performance.model_size}'...")
+        try:
+            faster_whisper = timed_import("faster_whisper")
+            options = model_options(self.cpu_threads)
+            # Inference threads are created with the model and inherit its affinity
+            with pinned_to(settings.performance.cpu_affinity):
+                model = faster_whisper.WhisperModel(
+                    settings.performance.model_size,
+                    device=settings.performance.device,
+                    **options
+                )
+            self.built_with = dict(options)
+            threads = options["cpu_threads"] or "default"
+            print(f"Model loaded successfully ({options['compute_type']}, {threads} threads, "
+                  f"{options['num_workers']} worker(s)).")
+            return model
         except Exception as e:
             print(f"Error loading Whisper model: {e}")
             raise
@@ -55,20 +307,31 @@ class ModelManager:
         if self._model is not None:
             del self._model
             self._model = None
+        self._pipeline = None
+        self._pipeline_model = None
         
         # Принудительная очистка GPU памяти
-        if torch.cuda.is_available():
-            torch.cuda.empty_cache()
-            torch.cuda.synchronize()
+        self.release_gpu_memory()
         
         # Принудительная сборка мусора
         gc.collect()
         print("Model cleanup completed.")
 
+    def release_gpu_memory(self):
+        """Empties the torch CUDA cache, only if torch was already loaded by someone."""
+        if not settings.performance.force_gpu_cleanup or settings.performance.device != "cuda":
+            return
+        # CTranslate2 does not use the torch allocator, so never import torch just for this
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+            torch.cuda.synchronize()
+
     def force_reload(self):
         """Manually force model reload."""
         print("Force reloading model...")
-        self._reload_model()
+        with self._lock:
+            self._reload_model()
 
 # Singleton instance
 model_manager = ModelManager() 
\ No newline at end of file
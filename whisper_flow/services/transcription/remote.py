@@ -0,0 +1,116 @@
+import json
+import os
+import socket
+import struct
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Frame: 4-byte big-endian header length, JSON header, then `payload_bytes` of raw data
+_LENGTH = struct.Struct(">I")
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b""):
+    """Sends one framed message."""
+    header = dict(header, payload_bytes=len(payload))
+    data = json.dumps(header).encode()
+    sock.sendall(_LENGTH.pack(len(data)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Tuple[dict, bytes]:
+    """Receives one framed message as (header, payload)."""
+    (length,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    header = json.loads(_recv_exactly(sock, length))
+    payload = _recv_exactly(sock, header.get("payload_bytes", 0))
+    return header, payload
+
+
+def request(socket_path: str, header: dict, payload: bytes = b"", timeout: Optional[float] = None) -> dict:
+    """Sends one request to the daemon on a fresh connection and returns its response header."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        send_message(sock, header, payload)
+        response, _ = recv_message(sock)
+        return response
+
+
+@dataclass
+class RemoteWord:
+    word: str
+    start: float
+    end: float
+    probability: float = 0.0
+
+
+@dataclass
+class RemoteSegment:
+    text: str
+    start: float
+    end: float
+    avg_logprob: float = 0.0
+    no_speech_prob: float = 0.0
+    words: Optional[List[RemoteWord]] = None
+
+
+@dataclass
+class RemoteInfo:
+    language: str
+    language_probability: float
+    duration: float = 0.0
+    # Daemon-side timings of this request
+    queue_seconds: float = 0.0
+    decode_seconds: float = 0.0
+
+
+@dataclass
+class RemoteModel:
+    """
+    Stands in for a WhisperModel by forwarding transcribe() to the daemon.
+
+    Segments are decoded fully on the daemon and returned as a list, so the
+    lazy-generator contract of faster-whisper holds trivially.
+    """
+    socket_path: str
+    client: str = field(default_factory=lambda: f"client-{os.getpid()}")
+
+    @classmethod
+    def connect(cls, socket_path: str, client: str, timeout: float = 2.0) -> Optional["RemoteModel"]:
+        """Returns a client if the daemon answers a ping, else None."""
+        try:
+            response = request(socket_path, {"type": "ping", "client": client}, timeout=timeout)
+        except OSError:
+            return None
+        return cls(socket_path, client) if response.get("ok") else None
+
+    def transcribe(self, audio: np.ndarray, **options) -> Tuple[Iterator[RemoteSegment], RemoteInfo]:
+        audio = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+        header = {"type": "transcribe", "client": self.client, "options": options,
+                  "dtype": "float32", "samples": int(audio.size)}
+        response = request(self.socket_path, header, audio.tobytes())
+        if "error" in response:
+            raise RuntimeError(f"transcription daemon: {response['error']}")
+        segments = [
+            RemoteSegment(
+                text=s["text"], start=s["start"], end=s["end"],
+                avg_logprob=s.get("avg_logprob", 0.0), no_speech_prob=s.get("no_speech_prob", 0.0),
+                words=[RemoteWord(**w) for w in s["words"]] if s.get("words") is not None else None
+            )
+            for s in response["segments"]
+        ]
+        info = RemoteInfo(**response["info"])
+        return iter(segments), info
@@ -0,0 +1,47 @@
+import unicodedata
+
+# Attach to the text before them without a space
+_CLOSING = set(".,!?;:…%)]}»”’、。，！？；：）」』")
+# Attach to the text after them without a space
+_OPENING = set("([{«“‘¿¡（「『")
+# Full-width punctuation of the scripts below
+_UNSPACED_PUNCTUATION = set("、。，！？；：（）「」『』")
+
+
+def _unspaced(char: str) -> bool:
+    """Whether `char` belongs to a script written without spaces between words (CJK, kana, Thai, ...)."""
+    if char in _UNSPACED_PUNCTUATION:
+        return True
+    name = unicodedata.name(char, "")
+    return name.startswith(("CJK", "HIRAGANA", "KATAKANA", "THAI", "LAO", "KHMER", "MYANMAR", "TIBETAN"))
+
+
+class SegmentJoiner:
+    """
+    Joins Whisper segments into one text as they are decoded.
+
+    Segment texts come with their own leading space (" Hello there.") or
+    none at all, depending on the language and on what the model felt like,
+    and a segment may start mid-sentence with punctuation. Each segment is
+    stripped and given exactly the separator it needs, so the pieces can be
+    inserted one by one and add up to the finished text.
+    """
+    def __init__(self):
+        self.text = ""
+        self.count = 0
+
+    def add(self, segment_text: str) -> str:
+        """Appends a segment; returns the piece to insert after the previous ones ("" if it had no text)."""
+        text = segment_text.strip()
+        if not text:
+            return ""
+        piece = text if not self.text or not self._needs_space(self.text[-1], text[0]) else " " + text
+        self.text += piece
+        self.count += 1
+        return piece
+
+    @staticmethod
+    def _needs_space(before: str, after: str) -> bool:
+        if after in _CLOSING or before in _OPENING or before in "-—/":
+            return False
+        return not (_unspaced(before) and _unspaced(after))
@@ -0,0 +1,74 @@
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class Word:
+    """A decoded word with absolute timestamps (seconds from recording start)."""
+    text: str
+    start: float
+    end: float
+
+    @property
+    def key(self) -> str:
+        """Normalized form used to compare hypotheses between decodes."""
+        return self.text.strip().lower().strip(".,!?;:…\"'«»")
+
+
+class StreamingSession:
+    """
+    Incremental transcription state for one utterance (LocalAgreement-2 policy).
+
+    Every partial decode covers only the audio after the committed offset. Words
+    on which two consecutive decodes agree are committed and the offset moves to
+    the end of the last committed word, so the final decode on key release only
+    has to process the unfinished tail.
+    """
+    def __init__(self, language: str, samplerate: int, max_window: float):
+        self.language = language
+        self.samplerate = samplerate
+        self.max_window = max_window
+        self.lock = threading.Lock()
+        self.task: Optional[str] = None
+        self.target_lang: Optional[str] = None
+        self._committed: List[Word] = []
+        self._hypothesis: List[Word] = []
+        self._committed_time = 0.0
+
+    @property
+    def committed_samples(self) -> int:
+        """Sample offset up to which audio has been committed."""
+        return int(self._committed_time * self.samplerate)
+
+    @property
+    def committed_text(self) -> str:
+        return "".join(word.text for word in self._committed)
+
+    def update(self, words: List[Word], window_end: float) -> str:
+        """
+        Feeds the words of a partial decode and commits the stable prefix.
+
+        Returns the newly committed text (empty if nothing became stable).
+        """
+        stable = 0
+        for old, new in zip(self._hypothesis, words):
+            if old.key != new.key:
+                break
+            stable += 1
+
+        # Force progress when the uncommitted window grows too long, so the tail
+        # decoded on release stays bounded no matter how long the utterance is.
+        if window_end - self._committed_time > self.max_window:
+            horizon = window_end - 1.0
+            while stable < len(words) and words[stable].end <= horizon:
+                stable += 1
+
+        newly_committed = words[:stable]
+        self._hypothesis = words[stable:]
+        if not newly_committed:
+            return ""
+
+        self._committed.extend(newly_committed)
+        self._committed_time = newly_committed[-1].end
+        return "".join(word.text for word in newly_committed)
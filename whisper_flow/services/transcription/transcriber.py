@@ -1,93 +1,664 @@
-import numpy as np
-import os
-from scipy.io.wavfile import write
+import bisect
+import concurrent.futures
 import gc
-import torch
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
 
 from whisper_flow.config.settings import settings
 from whisper_flow.core.event_bus import event_bus
-from whisper_flow.core.events import AudioChunkReady, TranscriptionReady, RecordingStartRequested
+from whisper_flow.core.events import (
+    AudioChunkReady,
+    AudioPartialReady,
+    LongFormChunkReady,
+    TranscriptionReady,
+    TranscriptionRefined,
+    TranscriptionSegment,
+    CancelRequested,
+    AppShutdown
+)
+from whisper_flow.core.metrics import metrics
+from whisper_flow.services.transcription.batching import BatchScheduler
+from whisper_flow.services.transcription.jobs import JobCancelled, JobScheduler
+from whisper_flow.services.transcription.long_form import LongFormSession
 from whisper_flow.services.transcription.model_manager import model_manager
 from whisper_flow.services.transcription.language import get_keyboard_layout
+from whisper_flow.services.transcription.segments import SegmentJoiner
+from whisper_flow.services.transcription.streaming import StreamingSession, Word
+from whisper_flow.services.audio.vad import trim_silence
+from whisper_flow.utils.audio import to_model_input, dump_wav
+
+# Longest utterance sent through the batched pipeline: one Whisper window
+BATCH_MAX_SECONDS = 30
+
+@dataclass
+class _Utterance:
+    """A finished recording waiting for the batch scheduler."""
+    audio: np.ndarray
+    language: str
+    task: str
+    target_lang: str
+    trace_id: str = ""
+    # Already dumped and trimmed (by the draft pass)
+    prepared: bool = False
+    # Publish segments as they are decoded (output.stream_segments); never for a refinement
+    stream: bool = False
 
 class Transcriber:
     """Handles the audio transcription process."""
     def __init__(self, executor):
         self.executor = executor
-        self._input_language = 'ru'  # Default
+        # Streaming and long-form sessions of recordings not released yet, by trace id.
+        # Keyed rather than "current" so the next recording can start before one is released.
+        self._sessions: Dict[str, StreamingSession] = {}
+        self._long_forms: Dict[str, LongFormSession] = {}
+        self._scheduler: BatchScheduler = None
+        if settings.performance.batching:
+            self._scheduler = BatchScheduler(
+                self._transcribe_batch,
+                window=settings.performance.batch_window_ms / 1000,
+                max_size=settings.performance.batch_max_size
+            )
+        # Drafts run on their own thread so they never queue behind a refinement.
+        # Both pools start threads on first use, so the modes can be enabled live.
+        self._draft_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="draft")
+        # Long-form chunks decode while recording continues, several at a time
+        self._chunk_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(settings.long_form.parallel_chunks, 1), thread_name_prefix="chunk")
+        # Traces whose text went out segment by segment; their final event only closes them
+        self._streamed = set()
+        self._jobs = JobScheduler()
         self._setup_subscriptions()
 
     def _setup_subscriptions(self):
         """Subscribes to relevant events."""
         event_bus.subscribe(AudioChunkReady, self.on_audio_chunk_ready)
-        event_bus.subscribe(RecordingStartRequested, self.on_recording_start)
+        event_bus.subscribe(AudioPartialReady, self.on_audio_partial_ready)
+        event_bus.subscribe(LongFormChunkReady, self.on_long_form_chunk_ready)
+        event_bus.subscribe(CancelRequested, self.on_cancel)
+        event_bus.subscribe(AppShutdown, self.stop)
+
+    @staticmethod
+    def _language(event) -> str:
+        return event.language or settings.layout.default_language
+
+    def _streaming_session(self, trace_id: str, language: str) -> StreamingSession:
+        """The streaming session of a recording, created by its first partial."""
+        session = self._sessions.get(trace_id)
+        if session is None:
+            session = self._sessions[trace_id] = StreamingSession(
+                language,
+                settings.audio.samplerate,
+                settings.transcription.streaming_max_window
+            )
+        return session
+
+    def on_cancel(self, event: CancelRequested):
+        """Abort hotkey: drops queued transcriptions and stops the running ones at their next segment."""
+        # Only the cancelled recording's sessions are still here; released ones were taken out
+        self._sessions.clear()
+        self._long_forms.clear()
+        count = self._jobs.cancel_all("cancelled by the abort hotkey")
+        if count:
+            print(f"Cancelled {count} pending transcription(s).")
 
-    def on_recording_start(self, event: RecordingStartRequested):
-        """Captures the input language when recording starts."""
-        self._input_language = event.language
+    def on_audio_partial_ready(self, event: AudioPartialReady):
+        """Decodes a partial window in the background unless a decode is already running."""
+        if not settings.audio.streaming:
+            return
+        session = self._streaming_session(event.trace_id, self._language(event))
+        if session.lock.locked():
+            # The next partial window will include this audio anyway.
+            return
+        job = self._jobs.job(event.trace_id)
+        future = self.executor.submit(self._partial_task, session, event.audio_data, event.trace_id)
+        if job is not None:
+            job.attach(future)
+
+    def on_long_form_chunk_ready(self, event: LongFormChunkReady):
+        """Decodes a long-form chunk in the background."""
+        session = self._long_forms.get(event.trace_id)
+        if session is None:
+            session = self._long_forms[event.trace_id] = LongFormSession(
+                self._language(event), settings.long_form.overlap_seconds)
+        if event.final:
+            # Running chunk tasks hold their own reference
+            del self._long_forms[event.trace_id]
+        job = self._jobs.release(event.trace_id) if event.final else self._jobs.job(event.trace_id)
+        future = self._chunk_executor.submit(self._chunk_task, session, event)
+        if job is not None:
+            job.attach(future)
 
     def on_audio_chunk_ready(self, event: AudioChunkReady):
         """Submits the audio data for transcription in a background thread."""
-        future = self.executor.submit(self._transcribe_task, event.audio_data)
-        future.add_done_callback(self._on_transcription_complete)
+        trace_id = event.trace_id
+        language = self._language(event)
+        session: Optional[StreamingSession] = self._sessions.pop(trace_id, None)
+        if session is None and settings.audio.streaming:
+            # Released before its first partial: the whole recording is the tail
+            session = StreamingSession(language, settings.audio.samplerate,
+                                       settings.transcription.streaming_max_window)
+        # Applies the supersede/preempt policy to older utterances and starts the deadline
+        job = self._jobs.release(trace_id)
+        if settings.draft.model and session is None:
+            task, target_lang = self._resolve_task(language, trace_id)
+            utterance = _Utterance(event.audio_data, language, task, target_lang, trace_id)
+            future = self._draft_executor.submit(self._draft_task, utterance)
+            if job is not None:
+                job.attach(future)
+            return
+        if self._scheduler is not None and session is None:
+            # The layout is read at release, not when the batch eventually runs
+            task, target_lang = self._resolve_task(language, trace_id)
+            utterance = _Utterance(event.audio_data, language, task, target_lang, trace_id, stream=True)
+            future = self._scheduler.submit(utterance)
+        else:
+            future = self.executor.submit(self._transcribe_task, event.audio_data, language, session, trace_id)
+        if job is not None:
+            job.attach(future)
+        future.add_done_callback(lambda f: self._on_transcription_complete(f, trace_id))
+
+    def _resolve_task(self, input_language: str, trace_id: str = "") -> tuple[str, str]:
+        """Chooses between transcribe and translate based on the keyboard layout."""
+        with metrics.stage(trace_id, "layout_detection"):
+            target_lang = get_keyboard_layout()
+        task = "transcribe"
+        if input_language != target_lang:
+            task = "translate"
+        return task, target_lang
+
+    def _run_model(self, audio, task: str, input_language: str, target_lang: str,
+                   initial_prompt: str = None, word_timestamps: bool = False,
+                   trace_id: str = "", stage: str = "decode", draft: bool = False,
+                   count_use: bool = True):
+        """
+        Runs the Whisper model (or the draft model) on a 1-D float32 array.
+
+        Begins the `stage` timing; segments are lazy, so the caller ends it
+        once they are consumed. Decodes of part of an utterance pass
+        `count_use=False` so only whole utterances count toward the reload. Raises JobCancelled, here or while the
+        segments are consumed, once the utterance's job is cancelled.
+        """
+        job = self._jobs.job(trace_id)
+        if job is not None:
+            job.check()
+            job.started = job.released_at is not None
+        if draft:
+            with metrics.stage(trace_id, "draft_model_acquisition"):
+                model = model_manager.get_draft_model()
+        else:
+            with metrics.stage(trace_id, "model_acquisition"):
+                model = model_manager.get_model(count_use=count_use)
+        metrics.begin(trace_id, stage)
+        segments, info = model.transcribe(
+            audio,
+            beam_size=settings.performance.beam_size,
+            task=task,
+            language=input_language if task == "transcribe" else None,
+            initial_prompt=initial_prompt or settings.transcription.prompts.get(target_lang),
+            temperature=0,
+            condition_on_previous_text=False,
+            no_speech_threshold=settings.performance.no_speech_threshold,
+            log_prob_threshold=settings.performance.log_prob_threshold,
+            word_timestamps=word_timestamps
+        )
+        # Leaving the lazy generator early is what stops the decode
+        return self._jobs.guard(job, segments), info
+
+    def _trim_silence(self, audio_data: np.ndarray, trace_id: str = "") -> np.ndarray:
+        """Applies the VAD pre-stage; returns an empty array when there is no speech."""
+        if not settings.audio.vad_enabled:
+            return audio_data
+        with metrics.stage(trace_id, "vad"):
+            result = trim_silence(audio_data, settings.audio.samplerate, settings.audio)
+        if not result.has_speech:
+            print("VAD: no speech detected, skipping the model.")
+        elif result.seconds_saved > 0:
+            total = audio_data.size / settings.audio.samplerate
+            print(f"VAD: trimmed {result.seconds_saved:.2f}s of {total:.2f}s of silence.")
+        return result.audio
+
+    def _streaming_prompt(self, session: StreamingSession) -> str:
+        """Configured prompt followed by the tail of the committed text for continuity."""
+        prompt = settings.transcription.prompts.get(session.target_lang) or ""
+        return (prompt + session.committed_text[-200:]).strip() or None
+
+    def _partial_task(self, session: StreamingSession, audio_data: np.ndarray, trace_id: str = ""):
+        """Decodes the uncommitted part of a partial window and commits its stable prefix."""
+        if not session.lock.acquire(blocking=False):
+            return
+        try:
+            if session.task is None:
+                session.task, session.target_lang = self._resolve_task(session.language, trace_id)
+
+            offset = session.committed_samples
+            window = to_model_input(audio_data[offset:])
+            if window.size < session.samplerate:
+                return
+            # Word timestamps must map back to recording time, so partial windows
+            # are only checked for speech, never trimmed.
+            if settings.audio.vad_enabled and not trim_silence(
+                    window, session.samplerate, settings.audio).has_speech:
+                return
 
-    def _transcribe_task(self, audio_data: np.ndarray) -> str:
+            segments, _ = self._run_model(
+                window,
+                session.task,
+                session.language,
+                session.target_lang,
+                initial_prompt=self._streaming_prompt(session),
+                word_timestamps=True,
+                trace_id=trace_id,
+                stage="partial_decode",
+                count_use=False
+            )
+            base = offset / session.samplerate
+            words = [
+                Word(text=w.word, start=base + w.start, end=base + w.end)
+                for segment in segments
+                for w in (segment.words or [])
+            ]
+            metrics.end(trace_id, "partial_decode")
+            committed = session.update(words, base + window.size / session.samplerate)
+            if committed:
+                print(f"Committed: {committed.strip()}")
+        except JobCancelled:
+            pass
+        except Exception as e:
+            print(f"Error during partial transcription: {e}")
+        finally:
+            session.lock.release()
+
+    def _finish_streaming(self, session: StreamingSession, audio_data: np.ndarray, trace_id: str = "") -> str:
+        """Decodes only the tail that was not committed while recording."""
+        # Waits for an in-flight partial decode so the committed offset is final.
+        with metrics.stage(trace_id, "partial_wait"):
+            session.lock.acquire()
+        try:
+            # The partials and the tail together are one use of the model
+            model_manager.count_use()
+            if session.task is None:
+                session.task, session.target_lang = self._resolve_task(session.language, trace_id)
+            tail = self._trim_silence(audio_data[session.committed_samples:], trace_id)
+            tail = to_model_input(tail)
+            print(f"Streaming: {session.committed_samples / session.samplerate:.1f}s committed, "
+                  f"decoding {tail.size / session.samplerate:.1f}s tail")
+
+            tail_text = ""
+            if tail.size > 0:
+                segments, _ = self._run_model(
+                    tail,
+                    session.task,
+                    session.language,
+                    session.target_lang,
+                    initial_prompt=self._streaming_prompt(session),
+                    trace_id=trace_id,
+                    count_use=False
+                )
+                tail_text = "".join(segment.text for segment in segments)
+                metrics.end(trace_id, "decode")
+            return (session.committed_text + tail_text).strip()
+        finally:
+            session.lock.release()
+
+    def _chunk_task(self, session: LongFormSession, chunk: LongFormChunkReady):
+        """Decodes one long-form chunk and hands its words to the session for stitching."""
+        trace_id = chunk.trace_id
+        # Only the final chunk is waited for after release
+        stage = "decode" if chunk.final else "chunk_decode"
+        if chunk.final:
+            metrics.end(trace_id, "dispatch")
+            metrics.annotate(trace_id, chunks=chunk.index + 1)
+            # All chunks of a dictation are one use of the model
+            model_manager.count_use()
+        words = []
+        try:
+            with session.lock:
+                if session.task is None:
+                    session.task, session.target_lang = self._resolve_task(session.language, trace_id)
+            audio = to_model_input(chunk.audio_data)
+            # Word timestamps must map back to recording time, so chunks are only
+            # checked for speech, never trimmed.
+            if not settings.audio.vad_enabled or trim_silence(
+                    audio, settings.audio.samplerate, settings.audio).has_speech:
+                segments, _ = self._run_model(
+                    audio,
+                    session.task,
+                    session.language,
+                    session.target_lang,
+                    word_timestamps=True,
+                    trace_id=trace_id,
+                    stage=stage,
+                    count_use=False
+                )
+                words = [
+                    Word(text=w.word, start=chunk.start + w.start, end=chunk.start + w.end)
+                    for segment in segments
+                    for w in (segment.words or [])
+                ]
+                metrics.end(trace_id, stage)
+        except JobCancelled as e:
+            print(f"Long-form chunk {chunk.index} dropped ({e.reason}).")
+        except Exception as e:
+            print(f"Error transcribing long-form chunk {chunk.index}: {e}")
+        finally:
+            model_manager.release_gpu_memory()
+        session.complete(chunk.index, words, chunk.keep_from, chunk.keep_until, chunk.final,
+                         emit=lambda text, last: self._publish_long_form(text, last, trace_id))
+
+    def _publish_long_form(self, text: str, last: bool, trace_id: str):
+        """Publishes the stitched text of long-form chunks in order."""
+        job = self._jobs.job(trace_id)
+        reason = self._jobs.close(trace_id) if last else job and job.cancel_reason
+        if reason:
+            if last:
+                self._drop(trace_id, reason)
+            return
+        if text:
+            print(f"Long-form Output: {text.strip()}")
+        event_bus.publish(TranscriptionReady(text=text, trace_id=trace_id, partial=not last))
+
+    def _prepare(self, audio_data: np.ndarray, trace_id: str = "") -> np.ndarray:
+        """Dumps the recording if configured and trims its silence."""
+        if settings.audio.debug_dump_path:
+            dump_wav(settings.audio.debug_dump_path, audio_data, settings.audio.samplerate)
+        return self._trim_silence(audio_data, trace_id)
+
+    def _decode(self, audio_data: np.ndarray, task: str, input_language: str, target_lang: str,
+                trace_id: str = "", stream: bool = False) -> str:
+        """Transcribes one utterance; with `stream`, publishes its segments as they are decoded."""
+        metrics.annotate(trace_id, task=task, input_language=input_language, output_language=target_lang)
+        print(f"Task: {task.capitalize():<10} | Input: {input_language} | Output: {target_lang}")
+
+        # The recording goes to the model as-is: no temp file, no extra copy
+        segments, info = self._run_model(
+            to_model_input(audio_data),
+            task,
+            input_language,
+            target_lang,
+            trace_id=trace_id
+        )
+
+        print(f"Model detected source as '{info.language}' with probability {info.language_probability:.4f}")
+        if stream and settings.output.stream_segments:
+            return self._stream_segments(segments, trace_id)
+        transcribed_text = "".join(segment.text for segment in segments)
+        metrics.end(trace_id, "decode")
+        return transcribed_text.strip()
+
+    def _stream_segments(self, segments, trace_id: str = "") -> str:
+        """Publishes each segment as the lazy generator yields it; returns the joined text."""
+        joiner = SegmentJoiner()
+        # Ended by the output service once the first segment is inserted
+        metrics.begin(trace_id, "first_segment")
+        for segment in segments:
+            piece = joiner.add(segment.text)
+            if not piece:
+                continue
+            if joiner.count == 1:
+                self._streamed.add(trace_id)
+            print(f"Segment {joiner.count}: {piece.strip()}")
+            event_bus.publish(TranscriptionSegment(text=piece, index=joiner.count - 1, trace_id=trace_id))
+        metrics.end(trace_id, "decode")
+        metrics.annotate(trace_id, segments=joiner.count)
+        return joiner.text
+
+    def _decode_or_drop(self, u: _Utterance) -> str:
+        """Decodes one utterance of a batch on its own; "" if its job is cancelled meanwhile."""
+        try:
+            return self._decode(u.audio, u.task, u.language, u.target_lang, u.trace_id, stream=u.stream)
+        except JobCancelled:
+            return ""  # Dropped when its result is published
+
+    def _decode_batch(self, group: List[_Utterance]) -> List[str]:
+        """
+        Transcribes utterances sharing task and languages in one batched call.
+
+        The recordings are concatenated and each becomes one clip of the batched
+        pipeline, so every clip is decoded as its own batch item.
+        """
+        start = time.monotonic()
+        pipeline = model_manager.get_batched_pipeline()
+        for utterance in group:
+            metrics.begin(utterance.trace_id, "model_acquisition", at=start)
+            metrics.end(utterance.trace_id, "model_acquisition")
+        if pipeline is None:
+            return [self._decode_or_drop(u) for u in group]
+        # One decode, but each utterance is one use of the model
+        for _ in group:
+            model_manager.count_use()
+        jobs = [self._jobs.job(u.trace_id) for u in group]
+        for job in jobs:
+            if job is not None:
+                # Decoding now: "supersede" must leave it alone
+                job.started = job.released_at is not None
+
+        samplerate = settings.audio.samplerate
+        first = group[0]
+        offsets, clips, position = [], [], 0
+        for utterance in group:
+            offsets.append(position / samplerate)
+            clips.append({"start": position / samplerate, "end": (position + utterance.audio.size) / samplerate})
+            position += utterance.audio.size
+            metrics.annotate(utterance.trace_id, task=utterance.task, input_language=utterance.language,
+                             output_language=utterance.target_lang, batch_size=len(group))
+            metrics.begin(utterance.trace_id, "decode")
+        print(f"Task: {first.task.capitalize():<10} | Input: {first.language} | Output: {first.target_lang} "
+              f"| Batch of {len(group)}")
+
+        segments, _ = pipeline.transcribe(
+            np.concatenate([to_model_input(u.audio) for u in group]),
+            beam_size=settings.performance.beam_size,
+            task=first.task,
+            language=first.language if first.task == "transcribe" else None,
+            initial_prompt=settings.transcription.prompts.get(first.target_lang),
+            temperature=0,
+            no_speech_threshold=settings.performance.no_speech_threshold,
+            log_prob_threshold=settings.performance.log_prob_threshold,
+            vad_filter=False,
+            clip_timestamps=clips,
+            batch_size=settings.performance.batch_max_size
+        )
+        texts = [""] * len(group)
+        # Stops early only once every utterance of the batch is cancelled; single dead ones are dropped on publish
+        for segment in self._jobs.guard_group(jobs, segments):
+            # Segment times are relative to the concatenation; map back by clip offset
+            index = max(bisect.bisect_right(offsets, segment.start + 1e-3) - 1, 0)
+            texts[index] += segment.text
+        for utterance in group:
+            metrics.end(utterance.trace_id, "decode")
+        return [text.strip() for text in texts]
+
+    def _transcribe_batch(self, utterances: List[_Utterance]) -> List[str]:
+        """Runs on the batch scheduler: transcribes the utterances, returning texts in order."""
+        print(f"\n--- Audio Processing ({len(utterances)} queued) ---")
+        try:
+            texts = [""] * len(utterances)
+            max_samples = BATCH_MAX_SECONDS * settings.audio.samplerate
+            groups: Dict[tuple, List[int]] = {}
+            for i, utterance in enumerate(utterances):
+                metrics.end(utterance.trace_id, "dispatch")
+                job = self._jobs.job(utterance.trace_id)
+                if job is not None and job.cancel_reason:
+                    continue  # Cancelled after the batch picked it up: skip it
+                if not utterance.prepared:
+                    utterance.audio = self._prepare(utterance.audio, utterance.trace_id)
+                if utterance.audio.size == 0:
+                    continue
+                if utterance.audio.size > max_samples:
+                    key = ("single", i)  # Longer than one window: decode on its own
+                else:
+                    key = (utterance.task, utterance.language, utterance.target_lang)
+                groups.setdefault(key, []).append(i)
+
+            for indices in groups.values():
+                if len(indices) == 1:
+                    texts[indices[0]] = self._decode_or_drop(utterances[indices[0]])
+                    continue
+                try:
+                    for i, text in zip(indices, self._decode_batch([utterances[i] for i in indices])):
+                        texts[i] = text
+                except JobCancelled:
+                    pass  # Every utterance of the batch was cancelled
+            return texts
+        finally:
+            model_manager.release_gpu_memory()
+            gc.collect()
+            print("--- Processing Finished ---")
+
+    def _transcribe_task(self, audio_data: np.ndarray, language: str, session: StreamingSession = None,
+                         trace_id: str = "") -> str:
         """The actual transcription logic that runs in a worker thread."""
+        metrics.end(trace_id, "dispatch")
         print("\n--- Audio Processing ---")
         try:
             if audio_data.size == 0:
                 print("No audio data to process.")
                 return ""
 
-            target_lang = get_keyboard_layout()
-            task = "transcribe"
-            if self._input_language != target_lang:
-                task = "translate"
+            if session is not None:
+                if settings.audio.debug_dump_path:
+                    dump_wav(settings.audio.debug_dump_path, audio_data, settings.audio.samplerate)
+                return self._finish_streaming(session, audio_data, trace_id)
 
-            print(f"Task: {task.capitalize():<10} | Input: {self._input_language} | Output: {target_lang}")
-            
-            # Write audio to a temporary file for stable processing
-            write(settings.audio.temp_filename, settings.audio.samplerate, audio_data)
-
-            model = model_manager.get_model()
-            segments, info = model.transcribe(
-                settings.audio.temp_filename,
-                beam_size=settings.performance.beam_size,
-                task=task,
-                language=self._input_language if task == "transcribe" else None,
-                initial_prompt=settings.transcription.prompts.get(target_lang),
-                temperature=0,
-                condition_on_previous_text=False,
-                no_speech_threshold=0.6,
-                log_prob_threshold=-1.0
-            )
-            
-            print(f"Model detected source as '{info.language}' with probability {info.language_probability:.4f}")
-            transcribed_text = "".join(segment.text for segment in segments)
-            
-            return transcribed_text.strip()
+            audio_data = self._prepare(audio_data, trace_id)
+            if audio_data.size == 0:
+                return ""
+
+            task, target_lang = self._resolve_task(language, trace_id)
+            return self._decode(audio_data, task, language, target_lang, trace_id, stream=True)
         
         finally:
-            # Clean up the audio file and run garbage collection
-            if os.path.exists(settings.audio.temp_filename):
-                os.remove(settings.audio.temp_filename)
-            
             # Принудительная очистка GPU памяти после каждой транскрипции
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-                torch.cuda.synchronize()
+            model_manager.release_gpu_memory()
             
             gc.collect()
             print("--- Processing Finished ---")
 
-    def _on_transcription_complete(self, future):
+    def _draft_task(self, utterance: _Utterance):
+        """Two-pass mode: publishes the draft model's text, then queues the refinement."""
+        trace_id = utterance.trace_id
+        metrics.end(trace_id, "dispatch")
+        print("\n--- Draft Processing ---")
+        try:
+            utterance.audio = self._prepare(utterance.audio, trace_id)
+            utterance.prepared = True
+            if utterance.audio.size == 0:
+                print("Transcription produced no text.")
+                metrics.finish(trace_id)
+                return
+
+            segments, _ = self._run_model(
+                to_model_input(utterance.audio),
+                utterance.task,
+                utterance.language,
+                utterance.target_lang,
+                trace_id=trace_id,
+                stage="draft_decode",
+                draft=True
+            )
+            segments = list(segments)
+            metrics.end(trace_id, "draft_decode")
+            draft = "".join(segment.text for segment in segments).strip()
+            refine = self._needs_refinement(utterance, segments)
+            job = self._jobs.job(trace_id)
+            if job is not None:
+                job.check()  # Cancelled while the last segment was decoded
+            if not refine:
+                self._jobs.close(trace_id)
+            if draft:
+                print(f"Draft Output: {draft}")
+                event_bus.publish(TranscriptionReady(text=draft, trace_id=trace_id, final=not refine))
+            if not refine:
+                if not draft:
+                    print("Transcription produced no text.")
+                    metrics.finish(trace_id)
+                return
+
+            if self._scheduler is not None:
+                future = self._scheduler.submit(utterance)
+            else:
+                future = self.executor.submit(self._decode, utterance.audio, utterance.task, utterance.language,
+                                              utterance.target_lang, trace_id)
+            if job is not None:
+                job.attach(future)
+            future.add_done_callback(lambda f: self._on_refinement_complete(f, draft, trace_id))
+        except JobCancelled as e:
+            self._drop(trace_id, e.reason)
+        except Exception as e:
+            print(f"An error occurred during draft transcription: {e}")
+            metrics.finish(trace_id)
+        finally:
+            print("--- Draft Finished ---")
+
+    def _needs_refinement(self, utterance: _Utterance, segments) -> bool:
+        """Whether the main model should re-transcribe a drafted utterance."""
+        config = settings.draft
+        if not config.refine:
+            return False
+        seconds = utterance.audio.size / settings.audio.samplerate
+        if seconds < config.short_utterance_seconds:
+            print(f"Short utterance ({seconds:.1f}s): keeping the draft.")
+            return False
+        if config.good_enough_logprob is not None and segments:
+            confidence = sum(s.avg_logprob for s in segments) / len(segments)
+            if confidence >= config.good_enough_logprob:
+                print(f"Draft confidence {confidence:.2f} is good enough: keeping the draft.")
+                return False
+        return True
+
+    def _on_refinement_complete(self, future, draft: str, trace_id: str = ""):
+        """Publishes the main model's text for a drafted utterance."""
+        if draft:
+            reason = self._jobs.close(trace_id)
+            if reason or future.cancelled():
+                print("Keeping the draft.")
+                self._drop(trace_id, reason or "cancelled")
+                return
+        try:
+            text = future.result()
+        except Exception as e:
+            print(f"An error occurred during refinement: {e}")
+            metrics.finish(trace_id)
+            return
+        if draft:
+            print(f"Refined Output: {text}")
+            event_bus.publish(TranscriptionRefined(draft=draft, text=text, trace_id=trace_id))
+            return
+        # Nothing was inserted for the draft: this is the first text
+        self._on_transcription_complete(future, trace_id)
+
+    def _on_transcription_complete(self, future, trace_id: str = ""):
         """Callback that fires when transcription is done."""
+        streamed = trace_id in self._streamed
+        self._streamed.discard(trace_id)
+        reason = self._jobs.close(trace_id)
+        if reason or future.cancelled():
+            self._drop(trace_id, reason or "cancelled")
+            return
         try:
             text = future.result()
             if text:
                 print(f"Final Output: {text}")
-                event_bus.publish(TranscriptionReady(text=text))
-            else:
-                print("Transcription produced no text.")
+                event_bus.publish(TranscriptionReady(text=text, trace_id=trace_id, streamed=streamed))
+                return
+            print("Transcription produced no text.")
         except Exception as e:
-            print(f"An error occurred during transcription task: {e}") 
\ No newline at end of file
+            print(f"An error occurred during transcription task: {e}")
+        # Nothing will be inserted, so the trace ends here
+        metrics.finish(trace_id) 
+
+    def _drop(self, trace_id: str, reason: str):
+        """Ends the trace of an utterance whose text is not inserted because its job was cancelled."""
+        print(f"Transcription dropped ({reason}).")
+        metrics.annotate(trace_id, cancelled=reason)
+        metrics.finish(trace_id)
+
+    def stop(self, event: AppShutdown = None):
+        """Finishes queued utterances and stops the batch scheduler."""
+        self._draft_executor.shutdown(wait=True)
+        self._chunk_executor.shutdown(wait=True)
+        if self._scheduler is not None:
+            self._scheduler.shutdown()
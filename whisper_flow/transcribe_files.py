@@ -0,0 +1,275 @@
+"""
+Headless bulk transcription of audio files with the configured model and prompts.
+
+Files are sharded across worker processes. Each worker holds its own model with
+a share of the CPU threads, and decodes the next file while the current one is
+transcribed. Results stream to a JSONL file that doubles as the checkpoint:
+files already transcribed there are skipped when the command is run again.
+
+    python -m whisper_flow.transcribe_files ~/notes -o notes.jsonl
+    python -m whisper_flow.transcribe_files "archive/**/*.ogg" --workers 4 --language ru
+"""
+import argparse
+import functools
+import glob
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+print = functools.partial(print, flush=True)
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".ogg", ".opus", ".oga", ".m4a", ".aac", ".flac", ".webm", ".mp4", ".wma"}
+
+# Decoded files waiting per worker; bounds memory while keeping the model busy
+PREFETCH = 2
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe audio files in bulk with WhisperFlow's model and settings")
+    parser.add_argument("inputs", nargs="+", help="Audio files, directories (searched recursively) or glob patterns")
+    parser.add_argument("-o", "--output", default="transcripts.jsonl", help="JSONL output, also used to resume")
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: derived from cores)")
+    parser.add_argument("--threads", type=int, default=0, help="Model threads per worker (default: cores / workers)")
+    parser.add_argument("--language", help="Source language; detected per file when omitted")
+    parser.add_argument("--task", choices=["transcribe", "translate"], default="transcribe")
+    return parser.parse_args(argv)
+
+
+def find_audio_files(inputs: List[str]) -> List[str]:
+    """Expands files, directories and glob patterns into a sorted list of audio files."""
+    found: Set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                found.update(os.path.join(root, n) for n in names
+                             if os.path.splitext(n)[1].lower() in AUDIO_EXTENSIONS)
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(p for p in glob.glob(os.path.expanduser(item), recursive=True) if os.path.isfile(p))
+    return sorted(os.path.abspath(p) for p in found)
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """Returns the files already transcribed in an existing output file."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Line cut short by an interruption
+            if "text" in record:
+                done.add(record["path"])
+    return done
+
+
+def plan_workers(requested_workers: int, requested_threads: int, device: str) -> tuple[int, int]:
+    """
+    Chooses worker and thread counts.
+
+    CTranslate2 scales poorly past ~4 threads per decode, so CPU runs use one
+    worker per 4 cores. A GPU is shared by a single worker.
+    """
+    cores = os.cpu_count() or 1
+    if requested_workers > 0:
+        workers = requested_workers
+    else:
+        workers = 1 if device == "cuda" else max(1, cores // 4)
+    threads = requested_threads if requested_threads > 0 else max(1, cores // workers)
+    return workers, threads
+
+
+# --- Worker process ---
+
+def _decode_files(paths: List[str], samplerate: int, decoded: "queue.Queue"):
+    """Decoder thread: reads and resamples files ahead of the model."""
+    from whisper_flow.utils.lazy_import import timed_import
+    faster_whisper = timed_import("faster_whisper")
+    for path in paths:
+        start = time.monotonic()
+        try:
+            audio = faster_whisper.decode_audio(path, sampling_rate=samplerate)
+            decoded.put((path, audio, time.monotonic() - start, None))
+        except Exception as e:
+            decoded.put((path, None, time.monotonic() - start, e))
+    decoded.put(None)
+
+
+def _worker(worker_id: int, paths: List[str], threads: int, args: dict, results):
+    """Transcribes one shard of files, putting one result dict per file on the queue."""
+    # Ctrl+C is handled by the main process, which terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    from whisper_flow.config.settings import settings
+    from whisper_flow.services.audio.vad import trim_silence
+    from whisper_flow.services.transcription.model_manager import model_manager
+
+    # Periodic reloads guard long interactive sessions; in a batch they only cost time
+    settings.performance.model_reload_after_uses = sys.maxsize
+    model_manager.cpu_threads = threads
+    try:
+        model = model_manager.get_model()
+    except Exception as e:
+        for path in paths:
+            results.put({"path": path, "error": f"model load failed: {e}", "worker": worker_id})
+        results.put(None)
+        return
+
+    samplerate = settings.audio.samplerate
+    decoded = queue.Queue(maxsize=PREFETCH)
+    threading.Thread(target=_decode_files, args=(paths, samplerate, decoded), daemon=True).start()
+
+    while True:
+        item = decoded.get()
+        if item is None:
+            break
+        path, audio, decode_seconds, error = item
+        record = {"path": path, "worker": worker_id, "decode_seconds": round(decode_seconds, 3)}
+        if error is not None:
+            record["error"] = f"decode failed: {error}"
+            results.put(record)
+            continue
+        duration = audio.size / samplerate
+        try:
+            start = time.monotonic()
+            if settings.audio.vad_enabled:
+                audio = trim_silence(audio, samplerate, settings.audio).audio
+            text, language, probability = "", args["language"], None
+            if audio.size:
+                segments, info = model.transcribe(
+                    audio,
+                    beam_size=settings.performance.beam_size,
+                    task=args["task"],
+                    language=args["language"],
+                    initial_prompt=settings.transcription.prompts.get(args["language"] or ""),
+                    temperature=0,
+                    condition_on_previous_text=False,
+                    no_speech_threshold=settings.performance.no_speech_threshold,
+                    log_prob_threshold=settings.performance.log_prob_threshold
+                )
+                text = "".join(segment.text for segment in segments).strip()
+                language, probability = info.language, round(info.language_probability, 4)
+            elapsed = time.monotonic() - start
+            record.update({
+                "text": text,
+                "language": language,
+                "language_probability": probability,
+                "duration": round(duration, 3),
+                "transcribe_seconds": round(elapsed, 3),
+                "rtf": round(elapsed / duration, 4) if duration else None,
+            })
+        except Exception as e:
+            record["error"] = f"transcription failed: {e}"
+        results.put(record)
+    results.put(None)
+
+
+# --- Main process ---
+
+class BulkTranscriber:
+    """Shards files across worker processes and streams their results to JSONL."""
+    def __init__(self, args):
+        self.args = args
+
+    def run(self) -> int:
+        args = self.args
+        files = find_audio_files(args.inputs)
+        done = load_checkpoint(args.output)
+        pending = [p for p in files if p not in done]
+        print(f"Found {len(files)} audio files; {len(done & set(files))} already in {args.output}, "
+              f"{len(pending)} to transcribe.")
+        if not pending:
+            return 0
+
+        from whisper_flow.config.settings import settings
+        workers, threads = plan_workers(args.workers, args.threads, settings.performance.device)
+        workers = min(workers, len(pending))
+        print(f"Using {workers} worker(s) x {threads} thread(s), model {settings.performance.model_size} "
+              f"on {settings.performance.device}.")
+
+        # Spawned workers start clean: no inherited CUDA context or model threads
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        worker_args = {"language": args.language, "task": args.task}
+        processes = [
+            context.Process(target=_worker, args=(i, pending[i::workers], threads, worker_args, results), daemon=True)
+            for i in range(workers)
+        ]
+        start = time.monotonic()
+        for process in processes:
+            process.start()
+
+        stats = {"files": 0, "errors": 0, "audio": 0.0, "model": 0.0}
+        try:
+            with open(args.output, "a") as out:
+                running = workers
+                while running:
+                    record = self._next_result(results, processes)
+                    if record is None:
+                        running -= 1
+                        continue
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    self._report(record, stats, len(pending), start)
+        except KeyboardInterrupt:
+            print(f"\nInterrupted. Progress is saved in {args.output}; run again to resume.")
+            for process in processes:
+                process.terminate()
+            return 130
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+
+        self._summary(stats, time.monotonic() - start)
+        return 1 if stats["errors"] else 0
+
+    @staticmethod
+    def _next_result(results, processes) -> Optional[Dict]:
+        """Waits for the next result; treats a worker that died without finishing as done."""
+        while True:
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes):
+                    print("Error: all workers exited before finishing.")
+                    return None
+
+    @staticmethod
+    def _report(record: Dict, stats: Dict, total: int, start: float):
+        stats["files"] += 1
+        position = f"[{stats['files']}/{total}]"
+        if "error" in record:
+            stats["errors"] += 1
+            print(f"{position} {record['path']}: {record['error']}")
+            return
+        stats["audio"] += record["duration"]
+        stats["model"] += record["transcribe_seconds"]
+        rate = stats["files"] / (time.monotonic() - start)
+        print(f"{position} {record['path']} ({record['duration']:.1f}s audio, rtf {record['rtf'] or 0:.2f}, "
+              f"{rate:.2f} files/s)")
+
+    @staticmethod
+    def _summary(stats: Dict, wall: float):
+        transcribed = stats["files"] - stats["errors"]
+        print(f"Done: {transcribed} transcribed, {stats['errors']} failed in {wall:.1f}s "
+              f"({stats['files'] / wall:.2f} files/s).")
+        if stats["audio"]:
+            print(f"Audio: {stats['audio']:.1f}s | real-time factor: {wall / stats['audio']:.3f} overall, "
+                  f"{stats['model'] / stats['audio']:.3f} per worker")
+
+
+def main(argv=None):
+    sys.exit(BulkTranscriber(_parse_args(argv)).run())
+
+
+if __name__ == "__main__":
+    main()
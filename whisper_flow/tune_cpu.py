@@ -0,0 +1,153 @@
+"""
+Measures CPU decode speed across thread counts, worker counts and int8 variants
+and stores the best configuration for the configured model.
+
+    python -m whisper_flow.tune_cpu
+    python -m whisper_flow.tune_cpu --wav sample.wav --threads 2,4,6,8 --objective throughput
+
+The profile is used whenever performance.cpu_threads is 0.
+"""
+import argparse
+import functools
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+print = functools.partial(print, flush=True)
+
+
+def _default_threads() -> str:
+    cores = os.cpu_count() or 1
+    counts = {1, cores}
+    n = 2
+    while n < cores:
+        counts.add(n)
+        n *= 2
+    return ",".join(str(c) for c in sorted(counts))
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tune CPU inference settings for this machine")
+    parser.add_argument("--model", help="Model size (default: performance.model_size)")
+    parser.add_argument("--wav", help="16-bit mono WAV at the configured rate; a real recording gives the best result")
+    parser.add_argument("--seconds", type=float, default=8.0, help="Length of the synthetic clip without --wav")
+    parser.add_argument("--threads", default=_default_threads(), help="Comma-separated cpu_threads to try")
+    parser.add_argument("--workers", default="1,2", help="Comma-separated num_workers to try")
+    parser.add_argument("--compute-types", default="int8,int8_float32", help="Comma-separated CPU compute types")
+    parser.add_argument("--runs", type=int, default=3, help="Timed decodes per configuration")
+    parser.add_argument("--objective", choices=["latency", "throughput"], default="latency",
+                        help="latency for dictation; throughput for the daemon or bulk transcription")
+    parser.add_argument("--no-save", action="store_true", help="Only print the measurements")
+    return parser.parse_args(argv)
+
+
+def _ints(text: str) -> List[int]:
+    return [int(x) for x in text.split(",") if x]
+
+
+def _load_clip(args, samplerate: int) -> np.ndarray:
+    if args.wav:
+        from whisper_flow.benchmark.fakes import load_wav
+        audio = load_wav(args.wav, samplerate)
+    else:
+        from whisper_flow.benchmark.fakes import synthetic_speech
+        audio = synthetic_speech(args.seconds, samplerate)
+    return audio.astype(np.float32) / 32768.0
+
+
+def _decode(model, audio: np.ndarray, beam_size: int):
+    segments, _ = model.transcribe(audio, beam_size=beam_size, language="en", temperature=0,
+                                   condition_on_previous_text=False)
+    for _ in segments:
+        pass
+
+
+def measure(model, audio: np.ndarray, workers: int, runs: int, beam_size: int, samplerate: int) -> tuple[float, float]:
+    """Returns (median single-decode latency, audio seconds per second with `workers` parallel decodes)."""
+    _decode(model, audio, beam_size)  # Warm-up
+    latencies = []
+    for _ in range(runs):
+        start = time.monotonic()
+        _decode(model, audio, beam_size)
+        latencies.append(time.monotonic() - start)
+    latency = statistics.median(latencies)
+
+    seconds = audio.size / samplerate
+    if workers == 1:
+        return latency, seconds / latency
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.monotonic()
+        list(pool.map(lambda _: _decode(model, audio, beam_size), range(workers * runs)))
+        wall = time.monotonic() - start
+    return latency, workers * runs * seconds / wall
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    from whisper_flow.config.settings import settings
+    from whisper_flow.services.transcription.cpu_tuning import CpuProfile, pinned_to, save_profile
+    from whisper_flow.utils.lazy_import import timed_import
+
+    faster_whisper = timed_import("faster_whisper")
+    model_size = args.model or settings.performance.model_size
+    samplerate = settings.audio.samplerate
+    audio = _load_clip(args, samplerate)
+    beam_size = settings.performance.beam_size
+    print(f"Tuning {model_size} on {os.cpu_count()} cores with a {audio.size / samplerate:.1f}s clip, "
+          f"beam_size={beam_size}, objective={args.objective}.")
+    if settings.performance.cpu_affinity:
+        print(f"Inference pinned to cores {settings.performance.cpu_affinity}.")
+
+    results = []
+    for compute_type in args.compute_types.split(","):
+        for workers in _ints(args.workers):
+            for threads in _ints(args.threads):
+                try:
+                    with pinned_to(settings.performance.cpu_affinity):
+                        model = faster_whisper.WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                                            cpu_threads=threads, num_workers=workers)
+                    latency, throughput = measure(model, audio, workers, args.runs, beam_size, samplerate)
+                except Exception as e:
+                    print(f"  {compute_type:<14} threads={threads:<3} workers={workers}: failed ({e})")
+                    continue
+                finally:
+                    model = None
+                results.append((compute_type, threads, workers, latency, throughput))
+                print(f"  {compute_type:<14} threads={threads:<3} workers={workers}: "
+                      f"latency {latency * 1000:7.0f} ms | {throughput:5.2f}x real time")
+
+    if not results:
+        print("No configuration could be measured.")
+        return
+    # Within 5% of the best objective the difference is noise: prefer the other metric
+    if args.objective == "latency":
+        fastest = min(r[3] for r in results)
+        best = max((r for r in results if r[3] <= fastest * 1.05), key=lambda r: r[4])
+    else:
+        highest = max(r[4] for r in results)
+        best = min((r for r in results if r[4] >= highest * 0.95), key=lambda r: r[3])
+    compute_type, threads, workers, latency, throughput = best
+    print(f"Best: compute_type={compute_type}, cpu_threads={threads}, num_workers={workers} "
+          f"({latency * 1000:.0f} ms, {throughput:.2f}x real time)")
+
+    if args.no_save:
+        return
+    save_profile(CpuProfile(
+        model_size=model_size,
+        compute_type=compute_type,
+        cpu_threads=threads,
+        num_workers=workers,
+        latency=latency,
+        throughput=throughput,
+        cores=os.cpu_count(),
+        tuned_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+    ))
+    print(f"Saved to {settings.performance.tuning_file}; used while performance.cpu_threads is 0.")
+
+
+if __name__ == "__main__":
+    main()
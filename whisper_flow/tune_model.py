@@ -0,0 +1,287 @@
+"""
+Measures accuracy and speed of model and decode settings on your own recordings
+and writes the chosen combination back into the config.
+
+The corpus is a directory of audio files, each with a reference transcript in a
+.txt file of the same name, or a JSONL manifest with one
+{"audio": path, "text": reference, "language": "en"} object per line. Every
+combination is run through the app's own ModelManager and Transcriber, so VAD
+trimming and prompts apply as in dictation. The CPU profile of tune_cpu is not
+applied while measuring, so each compute type is the one actually built.
+
+    python -m whisper_flow.tune_model ~/dictation-samples --language en
+    python -m whisper_flow.tune_model corpus.jsonl --models small,medium,large-v3 --beam-sizes 1,3,5
+
+Word and character error rates are corpus-level (edits over reference length)
+after lowercasing and removing punctuation. The real-time factor is processing
+time over audio time.
+"""
+import argparse
+import contextlib
+import functools
+import glob
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import numpy as np
+
+print = functools.partial(print, flush=True)
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".mp3", ".ogg", ".opus", ".m4a", ".webm")
+# Settings written back to performance.*
+TUNED_FIELDS = ("model_size", "compute_type", "beam_size", "no_speech_threshold", "log_prob_threshold")
+
+
+@dataclass
+class Sample:
+    path: str
+    reference: str
+    language: Optional[str]
+    audio: np.ndarray = None
+
+
+@dataclass
+class Result:
+    model_size: str
+    # As the model was built; 0 threads is CTranslate2's default
+    compute_type: str
+    cpu_threads: int
+    num_workers: int
+    beam_size: int
+    no_speech_threshold: float
+    log_prob_threshold: float
+    wer: float
+    cer: float
+    rtf: float
+    # Slowest single utterance, in seconds
+    max_latency: float
+    pareto: bool = False
+
+
+def _parse_args(argv=None):
+    from whisper_flow.config.settings import settings
+    performance = settings.performance
+    parser = argparse.ArgumentParser(description="Tune model and decode settings on a corpus with references")
+    parser.add_argument("corpus", help="Directory of audio files with .txt references, or a JSONL manifest")
+    parser.add_argument("--language", help="Language of samples that do not set one (default: detected)")
+    parser.add_argument("--models", default=performance.model_size, help="Comma-separated model sizes")
+    parser.add_argument("--compute-types", default=performance.compute_type, help="Comma-separated compute types")
+    parser.add_argument("--beam-sizes", default="1,2,5", help="Comma-separated beam sizes")
+    parser.add_argument("--no-speech-thresholds", default=str(performance.no_speech_threshold),
+                        help="Comma-separated no_speech_threshold values")
+    parser.add_argument("--log-prob-thresholds", default=str(performance.log_prob_threshold),
+                        help="Comma-separated log_prob_threshold values")
+    parser.add_argument("--max-rtf", type=float, help="Only choose combinations at most this slow")
+    parser.add_argument("--wer-tolerance", type=float, default=0.005,
+                        help="Choose the fastest combination within this WER of the most accurate one")
+    parser.add_argument("--report", help="Also write all measurements to this JSON file")
+    parser.add_argument("--no-save", action="store_true", help="Only print the measurements")
+    return parser.parse_args(argv)
+
+
+def _floats(text: str) -> List[float]:
+    return [float(x) for x in text.split(",") if x]
+
+
+# --- Corpus ---
+
+def load_corpus(source: str, language: Optional[str]) -> List[Sample]:
+    """Reads the samples of a corpus directory or JSONL manifest (without audio)."""
+    if os.path.isdir(source):
+        samples = []
+        for path in sorted(glob.glob(os.path.join(source, "**", "*"), recursive=True)):
+            reference = os.path.splitext(path)[0] + ".txt"
+            if path.lower().endswith(AUDIO_EXTENSIONS) and os.path.exists(reference):
+                with open(reference, encoding="utf-8") as f:
+                    samples.append(Sample(path, f.read().strip(), language))
+        return samples
+    base = os.path.dirname(os.path.abspath(source))
+    samples = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                samples.append(Sample(os.path.join(base, item["audio"]), item["text"],
+                                      item.get("language", language)))
+    return samples
+
+
+# --- Accuracy ---
+
+def normalize(text: str) -> str:
+    """Lowercases, drops punctuation and collapses whitespace, so only the words are compared."""
+    text = unicodedata.normalize("NFKC", text).lower().replace("ё", "е")
+    text = "".join(" " if unicodedata.category(c).startswith("P") else c for c in text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def edit_distance(reference, hypothesis) -> int:
+    """Levenshtein distance between two sequences (of words or characters)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp)))
+        previous = current
+    return previous[-1]
+
+
+def error_counts(reference: str, hypothesis: str) -> tuple:
+    """Returns (word edits, reference words, character edits, reference characters)."""
+    reference, hypothesis = normalize(reference), normalize(hypothesis)
+    ref_words, hyp_words = reference.split(), hypothesis.split()
+    # Characters without spaces, so scripts written without them are scored the same way
+    ref_chars, hyp_chars = reference.replace(" ", ""), hypothesis.replace(" ", "")
+    return (edit_distance(ref_words, hyp_words), len(ref_words),
+            edit_distance(ref_chars, hyp_chars), len(ref_chars))
+
+
+def pareto_front(results: List[Result]) -> List[Result]:
+    """Marks and returns the combinations no other one beats on both WER and speed, fastest first."""
+    front, best_wer = [], float("inf")
+    for result in sorted(results, key=lambda r: (r.rtf, r.wer)):
+        if result.wer < best_wer:
+            result.pareto = True
+            front.append(result)
+            best_wer = result.wer
+    return front
+
+
+def choose(front: List[Result], wer_tolerance: float, max_rtf: Optional[float]) -> Optional[Result]:
+    """The fastest combination on the front within `wer_tolerance` of the best WER allowed by `max_rtf`."""
+    allowed = [r for r in front if max_rtf is None or r.rtf <= max_rtf]
+    if not allowed:
+        return None
+    best_wer = min(r.wer for r in allowed)
+    return next(r for r in allowed if r.wer <= best_wer + wer_tolerance)
+
+
+# --- Measurement ---
+
+def _run(transcriber, samples: List[Sample], samplerate: int) -> tuple:
+    """Transcribes every sample as a dictation would; returns (WER, CER, RTF, max latency)."""
+    words = word_edits = chars = char_edits = 0
+    busy = audio_seconds = max_latency = 0.0
+    for sample in samples:
+        start = time.monotonic()
+        # The transcriber logs every step; only the summary lines matter here
+        with contextlib.redirect_stdout(io.StringIO()):
+            audio = transcriber._prepare(sample.audio)
+            text = ""
+            if audio.size:
+                text = transcriber._decode(audio, "transcribe", sample.language, sample.language)
+        elapsed = time.monotonic() - start
+        busy += elapsed
+        audio_seconds += sample.audio.size / samplerate
+        max_latency = max(max_latency, elapsed)
+        we, w, ce, c = error_counts(sample.reference, text)
+        word_edits, words, char_edits, chars = word_edits + we, words + w, char_edits + ce, chars + c
+    return word_edits / max(words, 1), char_edits / max(chars, 1), busy / audio_seconds, max_latency
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    from whisper_flow.config.settings import CONFIG_PATH, settings, update_config
+    from whisper_flow.services.transcription.model_manager import model_manager
+    from whisper_flow.services.transcription.transcriber import Transcriber
+    from whisper_flow.utils.lazy_import import timed_import
+
+    samples = load_corpus(args.corpus, args.language)
+    if not samples:
+        print(f"No audio files with reference transcripts found in {args.corpus}.")
+        sys.exit(1)
+    faster_whisper = timed_import("faster_whisper")
+    samplerate = settings.audio.samplerate
+    for sample in samples:
+        sample.audio = faster_whisper.decode_audio(sample.path, sampling_rate=samplerate)
+    total = sum(s.audio.size for s in samples) / samplerate
+    print(f"Corpus: {len(samples)} utterances, {total:.1f}s of audio.")
+
+    # Each combination is measured on a local model, loaded once per size and compute type.
+    # The tuned CPU profile would replace the compute type being measured, so it is left out.
+    settings.daemon.use_daemon = False
+    settings.performance.model_reload_after_uses = sys.maxsize
+    settings.performance.batching = False
+    settings.performance.tuning_file = ""
+    transcriber = Transcriber(executor=None)
+    original = {field: getattr(settings.performance, field) for field in TUNED_FIELDS}
+
+    results: List[Result] = []
+    for model_size, compute_type in itertools.product(args.models.split(","), args.compute_types.split(",")):
+        settings.performance.model_size = model_size
+        settings.performance.compute_type = compute_type
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                model_manager.force_reload()
+                model_manager._warmup()
+        except Exception as e:
+            print(f"  {model_size:<10} {compute_type:<14} failed to load ({e})")
+            continue
+        built = model_manager.built_with or {}
+        if built.get("compute_type", compute_type) != compute_type:
+            print(f"  {model_size:<10} {compute_type:<14} was built as {built['compute_type']}")
+        compute_type = built.get("compute_type", compute_type)
+        threads, workers = built.get("cpu_threads", 0), built.get("num_workers", 1)
+        decode_options = itertools.product(
+            [int(x) for x in _floats(args.beam_sizes)],
+            _floats(args.no_speech_thresholds),
+            _floats(args.log_prob_thresholds)
+        )
+        for beam_size, no_speech, log_prob in decode_options:
+            settings.performance.beam_size = beam_size
+            settings.performance.no_speech_threshold = no_speech
+            settings.performance.log_prob_threshold = log_prob
+            wer, cer, rtf, max_latency = _run(transcriber, samples, samplerate)
+            result = Result(model_size, compute_type, threads, workers, beam_size, no_speech, log_prob,
+                            wer, cer, rtf, max_latency)
+            results.append(result)
+            print(f"  {model_size:<10} {compute_type:<14} beam={beam_size} no_speech={no_speech:g} "
+                  f"log_prob={log_prob:g}: WER {wer:6.1%}  CER {cer:6.1%}  RTF {rtf:.3f}  "
+                  f"max {max_latency:.2f}s")
+    transcriber.stop()
+    for field, value in original.items():
+        setattr(settings.performance, field, value)
+
+    if not results:
+        print("No combination could be measured.")
+        sys.exit(1)
+    front = pareto_front(results)
+    print("\nPareto front (no other combination is both faster and more accurate):")
+    for r in front:
+        print(f"  RTF {r.rtf:.3f}  WER {r.wer:6.1%}  CER {r.cer:6.1%}  {r.model_size} {r.compute_type} "
+              f"beam={r.beam_size} no_speech={r.no_speech_threshold:g} log_prob={r.log_prob_threshold:g}")
+    best = choose(front, args.wer_tolerance, args.max_rtf)
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({
+                "corpus": args.corpus,
+                "utterances": len(samples),
+                "audio_seconds": total,
+                "device": settings.performance.device,
+                "results": [asdict(r) for r in results],
+                "chosen": asdict(best) if best else None,
+            }, f, indent=2)
+        print(f"Report written to {args.report}.")
+    if best is None:
+        print(f"No combination is within --max-rtf {args.max_rtf}; nothing chosen.")
+        return
+    chosen = {field: getattr(best, field) for field in TUNED_FIELDS}
+    print(f"Chosen: {', '.join(f'{k}={v}' for k, v in chosen.items())} "
+          f"(WER {best.wer:.1%}, RTF {best.rtf:.3f})")
+    if args.no_save:
+        return
+    update_config("performance", chosen)
+    print(f"Written to {CONFIG_PATH}; a running app picks it up on its next config check.")
+
+
+if __name__ == "__main__":
+    main()
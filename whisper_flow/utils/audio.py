@@ -0,0 +1,26 @@
+import numpy as np
+
+
+def to_model_input(audio: np.ndarray) -> np.ndarray:
+    """
+    Returns the audio as the 1-D float32 array faster-whisper expects.
+
+    Float32 recordings are returned as a view; only other dtypes are converted.
+    """
+    audio = audio.reshape(-1)
+    if audio.dtype == np.float32:
+        return audio
+    if audio.dtype == np.int16:
+        return audio.astype(np.float32) / 32768.0
+    return audio.astype(np.float32)
+
+
+def dump_wav(path: str, audio: np.ndarray, samplerate: int):
+    """Writes the audio to a WAV file for debugging."""
+    from scipy.io.wavfile import write
+
+    try:
+        write(path, samplerate, audio)
+        print(f"Audio dumped to {path}")
+    except Exception as e:
+        print(f"Error dumping audio to {path}: {e}")
@@ -0,0 +1,31 @@
+import importlib
+import sys
+import time
+from typing import Dict
+
+# First-import durations in seconds, in the order modules were loaded
+_import_times: Dict[str, float] = {}
+
+
+def timed_import(module_name: str):
+    """Imports a module on first use and records how long the import took."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    elapsed = time.perf_counter() - start
+    _import_times[module_name] = elapsed
+    print(f"⏱️ Import: {module_name} loaded in {elapsed * 1000:.0f} ms")
+    return module
+
+
+def print_import_summary():
+    """Prints the import-time breakdown recorded so far."""
+    if not _import_times:
+        return
+    total = sum(_import_times.values())
+    print(f"⏱️ Import breakdown ({total * 1000:.0f} ms total):")
+    for name, elapsed in _import_times.items():
+        print(f"    {name:<40} {elapsed * 1000:>7.0f} ms")